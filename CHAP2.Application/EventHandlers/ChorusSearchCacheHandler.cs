@@ -0,0 +1,63 @@
+using CHAP2.Application.Interfaces;
+using CHAP2.Domain.Events;
+using CHAP2.Shared.Configuration;
+using Microsoft.Extensions.Logging;
+using Microsoft.Extensions.Options;
+
+namespace CHAP2.Application.EventHandlers;
+
+/// <summary>
+/// On chorus create / update / delete: tell the LangChain search service
+/// which chorus changed so it evicts just the cached results built from
+/// it, instead of the whole cache. Failures are logged but swallowed --
+/// the edit has already been saved and stale results expire by TTL.
+/// </summary>
+public sealed class ChorusSearchCacheHandler :
+    IDomainEventHandler<ChorusCreatedEvent>,
+    IDomainEventHandler<ChorusUpdatedEvent>,
+    IDomainEventHandler<ChorusDeletedEvent>
+{
+    private readonly ISearchCacheInvalidator _invalidator;
+    private readonly SearchCacheSyncOptions _options;
+    private readonly ILogger<ChorusSearchCacheHandler> _logger;
+
+    public ChorusSearchCacheHandler(
+        ISearchCacheInvalidator invalidator,
+        IOptions<SearchCacheSyncOptions> options,
+        ILogger<ChorusSearchCacheHandler> logger)
+    {
+        _invalidator = invalidator ?? throw new ArgumentNullException(nameof(invalidator));
+        _options = options?.Value ?? throw new ArgumentNullException(nameof(options));
+        _logger = logger ?? throw new ArgumentNullException(nameof(logger));
+    }
+
+    public Task HandleAsync(ChorusCreatedEvent domainEvent, CancellationToken cancellationToken = default)
+        => NotifyAsync(domainEvent.ChorusId, "created", cancellationToken);
+
+    public Task HandleAsync(ChorusUpdatedEvent domainEvent, CancellationToken cancellationToken = default)
+        => NotifyAsync(domainEvent.ChorusId, "updated", cancellationToken);
+
+    public Task HandleAsync(ChorusDeletedEvent domainEvent, CancellationToken cancellationToken = default)
+        => NotifyAsync(domainEvent.ChorusId, "deleted", cancellationToken);
+
+    private async Task NotifyAsync(Guid chorusId, string change, CancellationToken cancellationToken)
+    {
+        if (!_options.Enabled) return;
+
+        try
+        {
+            if (!await _invalidator.InvalidateAsync(new[] { chorusId }, change, cancellationToken))
+            {
+                _logger.LogWarning(
+                    "Search cache not invalidated for {Change} chorus {Id}; its cached results expire by TTL.",
+                    change, chorusId);
+            }
+        }
+        catch (Exception ex) when (ex is not OperationCanceledException)
+        {
+            _logger.LogWarning(
+                ex, "Search cache invalidation for {Change} chorus {Id} threw; its cached results expire by TTL.",
+                change, chorusId);
+        }
+    }
+}
@@ -0,0 +1,19 @@
+namespace CHAP2.Application.Interfaces;
+
+/// <summary>
+/// Tells the LangChain search service that choruses changed, so cached
+/// search results that include them are evicted.
+/// </summary>
+public interface ISearchCacheInvalidator
+{
+    /// <summary>
+    /// Notify the search service that <paramref name="chorusIds"/> were
+    /// created, updated or deleted (<paramref name="change"/>). Returns
+    /// false if the service could not be reached or rejected the call;
+    /// never throws for transport failures.
+    /// </summary>
+    Task<bool> InvalidateAsync(
+        IReadOnlyCollection<Guid> chorusIds,
+        string change,
+        CancellationToken cancellationToken = default);
+}
@@ -11,6 +11,7 @@ using CHAP2.Infrastructure.GitHub;
 using CHAP2.Infrastructure.Identity;
 using CHAP2.Infrastructure.Repositories;
 using CHAP2.Infrastructure.Repositories.Bible;
+using CHAP2.Infrastructure.SearchService;
 using CHAP2.Shared.Configuration;
 using Microsoft.AspNetCore.Authorization;
 using Microsoft.AspNetCore.DataProtection;
@@ -53,6 +54,8 @@ builder.Services.Configure<SlideConversionSettings>(
     builder.Configuration.GetSection("SlideConversionSettings"));
 builder.Services.Configure<GitSyncOptions>(
     builder.Configuration.GetSection("GitSync"));
+builder.Services.Configure<SearchCacheSyncOptions>(
+    builder.Configuration.GetSection("SearchCacheSync"));
 
 builder.Services.AddSingleton<DiskChorusRepository>(provider =>
 {
@@ -118,6 +121,25 @@ builder.Services.AddScoped<IDomainEventHandler<ChorusCreatedEvent>, ChorusCreate
 builder.Services.AddScoped<IDomainEventHandler<ChorusUpdatedEvent>, ChorusUpdatedGitPushHandler>();
 builder.Services.AddScoped<IDomainEventHandler<ChorusDeletedEvent>, ChorusDeletedGitPushHandler>();
 
+// Search cache handlers: evict only the LangChain service's cached
+// results that reference the changed chorus. One handler class serves
+// all three events.
+builder.Services.AddHttpClient(nameof(LangChainSearchCacheInvalidator), (provider, client) =>
+{
+    var opts = provider.GetRequiredService<Microsoft.Extensions.Options.IOptions<SearchCacheSyncOptions>>().Value;
+    client.Timeout = TimeSpan.FromSeconds(opts.TimeoutSeconds);
+});
+builder.Services.AddSingleton<ISearchCacheInvalidator>(provider =>
+{
+    var http = provider.GetRequiredService<IHttpClientFactory>().CreateClient(nameof(LangChainSearchCacheInvalidator));
+    var opts = provider.GetRequiredService<Microsoft.Extensions.Options.IOptions<SearchCacheSyncOptions>>().Value;
+    var logger = provider.GetRequiredService<ILogger<LangChainSearchCacheInvalidator>>();
+    return new LangChainSearchCacheInvalidator(http, opts.ServiceUrl, logger);
+});
+builder.Services.AddScoped<IDomainEventHandler<ChorusCreatedEvent>, ChorusSearchCacheHandler>();
+builder.Services.AddScoped<IDomainEventHandler<ChorusUpdatedEvent>, ChorusSearchCacheHandler>();
+builder.Services.AddScoped<IDomainEventHandler<ChorusDeletedEvent>, ChorusSearchCacheHandler>();
+
 builder.Services.AddScoped<ISetlistOwnershipPolicy, SetlistOwnershipPolicy>();
 builder.Services.AddScoped<ISetlistQueryService, SetlistQueryService>();
 builder.Services.AddScoped<ISetlistCommandService, SetlistCommandService>();
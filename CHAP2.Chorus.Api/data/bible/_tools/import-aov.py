@@ -1,22 +1,39 @@
 #!/usr/bin/env python3
 """
-One-shot importer: turns the raw getBible.net AOV JSON into the
-per-chapter file layout used by CHAP2's DiskBibleRepository.
+Importer: turns a raw getBible.net translation JSON into the per-chapter
+file layout used by CHAP2's DiskBibleRepository.
 
 Input  : /tmp/aov-raw.json (download from https://api.getbible.net/v2/aov.json)
 Output : data/bible/aov/_books.json + data/bible/aov/{ordinal:02d}-{slug}/{chapter:03d}.json
+         data/bible/aov/_verses.pack (packed, mmap-able copy; see packed_bible.py)
+         data/bible/aov/_verses.idx  (folded inverted index; see verse_index.py)
+
+The raw dump is stream-parsed one book at a time and chapters are written
+in parallel. Files whose content is unchanged are left alone (mtimes and
+git blobs stay stable), and chapter files or book directories the dump no
+longer produces are removed.
 
 Run from anywhere:
     python3 data/bible/_tools/import-aov.py
+    python3 data/bible/_tools/import-aov.py --translation kjv   # /tmp/kjv-raw.json -> data/bible/kjv
 """
+import argparse
+import hashlib
 import json
+import os
+import re
 import sys
-import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from packed_bible import PACK_FILE, PackWriter
+from verse_index import INDEX_FILE, IndexWriter, fold
+
 REPO_ROOT = Path(__file__).resolve().parents[3]
 RAW_PATH = Path("/tmp/aov-raw.json")
 OUT_DIR = REPO_ROOT / "data" / "bible" / "aov"
+READ_CHUNK = 1 << 20
+BOOK_DIR_PATTERN = re.compile(r"^\d{2}-")
 
 AFRIKAANS_BOOKS = [
     (1, "Genesis", "Genesis", "Old"),
@@ -89,75 +106,239 @@ AFRIKAANS_BOOKS = [
 
 
 def slugify(name: str) -> str:
-    norm = unicodedata.normalize("NFKD", name)
-    ascii_only = "".join(c for c in norm if not unicodedata.combining(c))
-    return ascii_only.lower().replace(" ", "-")
+    return fold(name).replace(" ", "-")
+
+
+def iter_raw_books(path: Path, chunk_size: int = READ_CHUNK):
+    """Yield the entries of the top-level "books" array one at a time.
+
+    Only the book being decoded is held in memory; other top-level values
+    (translation metadata) are decoded and discarded.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def peek() -> str:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not fill():
+                    raise ValueError(f"unexpected end of {path}")
+
+        def expect(char: str) -> None:
+            nonlocal pos
+            if peek() != char:
+                raise ValueError(f"expected {char!r} in {path}, got {buf[pos]!r}")
+            pos += 1
+
+        def value():
+            nonlocal pos
+            peek()
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if fill():
+                        continue
+                    raise
+                # A number at the end of the buffer may be cut short
+                if end == len(buf) and fill():
+                    continue
+                pos = end
+                return obj
+
+        expect("{")
+        if peek() == "}":
+            return
+        while True:
+            key = value()
+            expect(":")
+            if key == "books":
+                expect("[")
+                if peek() == "]":
+                    pos += 1
+                else:
+                    while True:
+                        yield value()
+                        if peek() == ",":
+                            pos += 1
+                            continue
+                        expect("]")
+                        break
+            else:
+                value()
+            if peek() == ",":
+                pos += 1
+                continue
+            expect("}")
+            return
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Atomically write `data` unless the file already has that content"""
+    digest = hashlib.sha256(data).digest()
+    try:
+        if hashlib.sha256(path.read_bytes()).digest() == digest:
+            return False
+    except FileNotFoundError:
+        pass
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+
+def json_bytes(doc) -> bytes:
+    return (json.dumps(doc, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+
+
+def book_catalog(translation: str):
+    """(ordinal, name, englishName, testament) per book, or None to use raw names"""
+    return AFRIKAANS_BOOKS if translation == "aov" else None
+
+
+def remove_stale(out_dir: Path, expected: set) -> int:
+    """Delete chapter files and book directories not produced by this import"""
+    removed = 0
+    for book_dir in sorted(p for p in out_dir.iterdir() if p.is_dir() and BOOK_DIR_PATTERN.match(p.name)):
+        for chapter_file in sorted(book_dir.glob("*.json")):
+            if chapter_file not in expected:
+                chapter_file.unlink()
+                removed += 1
+        if not any(book_dir.iterdir()):
+            book_dir.rmdir()
+    return removed
 
 
 def main() -> int:
-    if not RAW_PATH.exists():
-        print(f"missing {RAW_PATH} - download with:", file=sys.stderr)
-        print("  curl -sSfL -o /tmp/aov-raw.json https://api.getbible.net/v2/aov.json", file=sys.stderr)
-        return 1
+    parser = argparse.ArgumentParser(description="Import a getBible.net translation into data/bible/<translation>")
+    parser.add_argument("--translation", default="aov", help="Translation code (default: aov)")
+    parser.add_argument("--raw", default=None, help="Raw getBible JSON (default: /tmp/<translation>-raw.json)")
+    parser.add_argument("--out-dir", default=None, help="Output directory (default: data/bible/<translation>)")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel chapter writers")
+    args = parser.parse_args()
 
-    raw = json.loads(RAW_PATH.read_text(encoding="utf-8"))
-    raw_books = raw["books"]
-    if len(raw_books) != 66:
-        print(f"expected 66 books, got {len(raw_books)}", file=sys.stderr)
+    raw_path = Path(args.raw) if args.raw else RAW_PATH.with_name(f"{args.translation}-raw.json")
+    out_dir = Path(args.out_dir) if args.out_dir else OUT_DIR.with_name(args.translation)
+    if not raw_path.exists():
+        print(f"missing {raw_path} - download with:", file=sys.stderr)
+        print(f"  curl -sSfL -o {raw_path} https://api.getbible.net/v2/{args.translation}.json", file=sys.stderr)
         return 1
 
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    catalog = book_catalog(args.translation)
 
     books_index = []
+    packed = PackWriter()
+    index = IndexWriter()
+    expected = set()
+    written = 0
+    unchanged = 0
     total_chapters = 0
     total_verses = 0
 
-    for ordinal, af_name, en_name, testament in AFRIKAANS_BOOKS:
-        raw_book = raw_books[ordinal - 1]
-        chapters = raw_book["chapters"]
-        slug = slugify(af_name)
-        book_id = slug
-        book_dir_name = f"{ordinal:02d}-{slug}"
-        book_dir = OUT_DIR / book_dir_name
-        book_dir.mkdir(parents=True, exist_ok=True)
-
-        for ch in chapters:
-            ch_num = int(ch["chapter"])
-            # Preserve original formatting verbatim (trailing spaces, embedded
-            # newlines, etc.) so the chapter renders the way the source set it.
-            verses = [
-                {"verse": int(v["verse"]), "text": v["text"]}
-                for v in ch["verses"]
-            ]
-            chapter_doc = {
-                "bookId": book_id,
-                "bookName": af_name,
-                "chapter": ch_num,
-                "verses": verses,
-            }
-            (book_dir / f"{ch_num:03d}.json").write_text(
-                json.dumps(chapter_doc, ensure_ascii=False, indent=2) + "\n",
-                encoding="utf-8",
-            )
-            total_verses += len(verses)
-        total_chapters += len(chapters)
-
-        books_index.append({
-            "id": book_id,
-            "name": af_name,
-            "englishName": en_name,
-            "ordinal": ordinal,
-            "testament": testament,
-            "chapterCount": len(chapters),
-            "directory": book_dir_name,
-        })
-
-    (OUT_DIR / "_books.json").write_text(
-        json.dumps(books_index, ensure_ascii=False, indent=2) + "\n",
-        encoding="utf-8",
-    )
-
-    print(f"wrote {len(books_index)} books, {total_chapters} chapters, {total_verses} verses to {OUT_DIR}")
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        pending = []
+        for position, raw_book in enumerate(iter_raw_books(raw_path), start=1):
+            if catalog is not None:
+                if position > len(catalog):
+                    print(f"expected {len(catalog)} books, got more", file=sys.stderr)
+                    return 1
+                ordinal, name, en_name, testament = catalog[position - 1]
+            else:
+                # Other translations take their book names from the dump and
+                # share the canonical English names and testaments
+                ordinal = int(raw_book.get("nr", position))
+                canonical = AFRIKAANS_BOOKS[ordinal - 1] if 1 <= ordinal <= len(AFRIKAANS_BOOKS) else None
+                en_name = canonical[2] if canonical else f"Book {ordinal}"
+                name = raw_book.get("name") or en_name
+                testament = canonical[3] if canonical else "New"
+            chapters = raw_book["chapters"]
+            slug = slugify(name)
+            book_id = slug
+            book_dir_name = f"{ordinal:02d}-{slug}"
+            book_dir = out_dir / book_dir_name
+            book_dir.mkdir(parents=True, exist_ok=True)
+
+            # Let the previous book's writes drain while this one is queued,
+            # so at most two books are in memory at once
+            previous, pending = pending, []
+            for ch in chapters:
+                ch_num = int(ch["chapter"])
+                # Preserve original formatting verbatim (trailing spaces, embedded
+                # newlines, etc.) so the chapter renders the way the source set it.
+                verses = [
+                    {"verse": int(v["verse"]), "text": v["text"]}
+                    for v in ch["verses"]
+                ]
+                chapter_doc = {
+                    "bookId": book_id,
+                    "bookName": name,
+                    "chapter": ch_num,
+                    "verses": verses,
+                }
+                chapter_path = book_dir / f"{ch_num:03d}.json"
+                expected.add(chapter_path)
+                pending.append(executor.submit(write_if_changed, chapter_path, json_bytes(chapter_doc)))
+                packed.add_chapter(ordinal, ch_num, verses)
+                for v in verses:
+                    index.add_verse(ordinal, ch_num, v["verse"], v["text"])
+                total_verses += len(verses)
+            total_chapters += len(chapters)
+            for future in previous:
+                if future.result():
+                    written += 1
+                else:
+                    unchanged += 1
+
+            books_index.append({
+                "id": book_id,
+                "name": name,
+                "englishName": en_name,
+                "ordinal": ordinal,
+                "testament": testament,
+                "chapterCount": len(chapters),
+                "directory": book_dir_name,
+            })
+        for future in pending:
+            if future.result():
+                written += 1
+            else:
+                unchanged += 1
+
+    if catalog is not None and len(books_index) != len(catalog):
+        print(f"expected {len(catalog)} books, got {len(books_index)}", file=sys.stderr)
+        return 1
+
+    for path, data in ((out_dir / "_books.json", json_bytes(books_index)),
+                       (out_dir / PACK_FILE, packed.pack()),
+                       (out_dir / INDEX_FILE, index.pack())):
+        if write_if_changed(path, data):
+            written += 1
+        else:
+            unchanged += 1
+    removed = remove_stale(out_dir, expected)
+
+    print(f"imported {len(books_index)} books, {total_chapters} chapters, {total_verses} verses into {out_dir}")
+    print(f"files: {written} written, {unchanged} unchanged, {removed} removed")
     return 0
 
 
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Packed, memory-mappable form of a per-chapter Bible translation.
+
+The per-chapter JSON written by import-aov.py stays the canonical format;
+this is a derived single-file artifact (`_verses.pack`) that a reader can
+mmap and slice without opening or parsing anything else:
+
+    header          struct HEADER (magic, version, counts, sha256 of the rest)
+    book table      book_count    x <II  first chapter index, chapter count
+    chapter table   chapter_count x <II  first verse index, verse count
+    verse offsets   (verse_count + 1) x <I  byte offsets into the text blob
+    text blob       UTF-8 verse text, verbatim, in canonical order
+
+Books are indexed by ordinal - 1, chapters and verses by number - 1, so a
+verse lookup is three table reads. Missing chapter or verse numbers are
+stored as empty slots to keep that arithmetic exact. Because the blob is in
+canonical order, any verse or chapter range is one contiguous byte slice.
+
+Rebuild from the JSON files:
+    python3 data/bible/_tools/packed_bible.py data/bible/aov
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+PACK_FILE = "_verses.pack"
+MAGIC = b"CHAP2BBL"
+VERSION = 1
+
+HEADER = struct.Struct("<8sHHIIIQ32s")
+BOOK_ENTRY = struct.Struct("<II")
+CHAPTER_ENTRY = struct.Struct("<II")
+OFFSET = struct.Struct("<I")
+
+
+class PackWriter:
+    """Accumulates chapters in canonical order and writes the packed file"""
+
+    def __init__(self):
+        self._books = []      # [first chapter index, chapter count] per ordinal
+        self._chapters = []   # [first verse index, verse count] per chapter
+        self._offsets = [0]
+        self._blob = bytearray()
+
+    def add_chapter(self, ordinal: int, chapter: int, verses) -> None:
+        """Append one chapter; `verses` is a list of {"verse", "text"} dicts"""
+        if ordinal < len(self._books):
+            raise ValueError(f"book {ordinal} added after book {len(self._books)}")
+        while len(self._books) < ordinal:
+            self._books.append([len(self._chapters), 0])
+        book = self._books[ordinal - 1]
+        if chapter <= book[1]:
+            raise ValueError(f"book {ordinal} chapter {chapter} added out of order")
+        while book[1] < chapter:
+            self._chapters.append([len(self._offsets) - 1, 0])
+            book[1] += 1
+        entry = self._chapters[-1]
+        for v in sorted(verses, key=lambda v: int(v["verse"])):
+            number = int(v["verse"])
+            if number <= entry[1]:
+                raise ValueError(f"book {ordinal} chapter {chapter} has duplicate verse {number}")
+            while entry[1] < number - 1:
+                self._offsets.append(len(self._blob))
+                entry[1] += 1
+            self._blob += v["text"].encode("utf-8")
+            self._offsets.append(len(self._blob))
+            entry[1] += 1
+
+    def counts(self) -> dict:
+        return {
+            "books": len(self._books),
+            "chapters": len(self._chapters),
+            "verses": len(self._offsets) - 1,
+            "textBytes": len(self._blob),
+        }
+
+    def pack(self) -> bytes:
+        """The complete packed file: header followed by tables and text"""
+        if len(self._blob) > 0xFFFFFFFF:
+            raise ValueError("text blob exceeds 4 GiB")
+        body = b"".join((
+            b"".join(BOOK_ENTRY.pack(*b) for b in self._books),
+            b"".join(CHAPTER_ENTRY.pack(*c) for c in self._chapters),
+            b"".join(OFFSET.pack(o) for o in self._offsets),
+            bytes(self._blob),
+        ))
+        header = HEADER.pack(
+            MAGIC, VERSION, 0,
+            len(self._books), len(self._chapters), len(self._offsets) - 1,
+            len(self._blob), hashlib.sha256(body).digest(),
+        )
+        return header + body
+
+    def write(self, path) -> dict:
+        """Write atomically to `path`; returns the header counts"""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(self.pack())
+        os.replace(tmp, path)
+        return self.counts()
+
+
+class PackedBible:
+    """Read-only, memory-mapped view of a packed Bible file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size:
+            raise ValueError(f"{self.path} is too short to be a packed Bible")
+        (magic, version, _flags, self.book_count, self.chapter_count,
+         self.verse_count, self.text_bytes, self.checksum) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a packed Bible")
+        if version != VERSION:
+            raise ValueError(f"{self.path} is pack version {version}, expected {VERSION}")
+        self._books_at = HEADER.size
+        self._chapters_at = self._books_at + self.book_count * BOOK_ENTRY.size
+        self._offsets_at = self._chapters_at + self.chapter_count * CHAPTER_ENTRY.size
+        self._text_at = self._offsets_at + (self.verse_count + 1) * OFFSET.size
+        if len(self._mm) != self._text_at + self.text_bytes:
+            raise ValueError(f"{self.path} is truncated or has trailing data")
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def verify(self) -> bool:
+        """Recompute the checksum over everything after the header"""
+        return hashlib.sha256(self._mm[HEADER.size:]).digest() == self.checksum
+
+    def chapter_count_of(self, ordinal: int) -> int:
+        if not 1 <= ordinal <= self.book_count:
+            return 0
+        return BOOK_ENTRY.unpack_from(self._mm, self._books_at + (ordinal - 1) * BOOK_ENTRY.size)[1]
+
+    def _chapter(self, ordinal: int, chapter: int):
+        """(first verse index, verse count) of a chapter, or None"""
+        if not 1 <= ordinal <= self.book_count:
+            return None
+        first, count = BOOK_ENTRY.unpack_from(self._mm, self._books_at + (ordinal - 1) * BOOK_ENTRY.size)
+        if not 1 <= chapter <= count:
+            return None
+        return CHAPTER_ENTRY.unpack_from(self._mm, self._chapters_at + (first + chapter - 1) * CHAPTER_ENTRY.size)
+
+    def _offset(self, index: int) -> int:
+        return OFFSET.unpack_from(self._mm, self._offsets_at + index * OFFSET.size)[0]
+
+    def _text(self, start_index: int, end_index: int) -> bytes:
+        """Raw blob bytes spanning verse indices [start_index, end_index)"""
+        return self._mm[self._text_at + self._offset(start_index):self._text_at + self._offset(end_index)]
+
+    def verse(self, ordinal: int, chapter: int, verse: int):
+        """Text of one verse, or None when the reference does not exist"""
+        entry = self._chapter(ordinal, chapter)
+        if entry is None or not 1 <= verse <= entry[1]:
+            return None
+        index = entry[0] + verse - 1
+        return self._text(index, index + 1).decode("utf-8")
+
+    def _slice(self, start_index: int, end_index: int):
+        """Texts of verse indices [start_index, end_index), read as one slice"""
+        base = self._offset(start_index)
+        blob = self._text(start_index, end_index)
+        bounds = [self._offset(i) - base for i in range(start_index, end_index + 1)]
+        return [blob[lo:hi].decode("utf-8") for lo, hi in zip(bounds, bounds[1:])]
+
+    def verses(self, ordinal: int, chapter: int, start: int = 1, end=None):
+        """[(verse number, text)] for a verse range of one chapter"""
+        entry = self._chapter(ordinal, chapter)
+        if entry is None:
+            return []
+        first, count = entry
+        start = max(start, 1)
+        end = count if end is None else min(end, count)
+        if start > end:
+            return []
+        texts = self._slice(first + start - 1, first + end)
+        return list(zip(range(start, end + 1), texts))
+
+    def chapter_range(self, ordinal: int, first_chapter: int, last_chapter: int):
+        """[(chapter, verse, text)] for consecutive chapters of one book"""
+        first_chapter = max(first_chapter, 1)
+        last_chapter = min(last_chapter, self.chapter_count_of(ordinal))
+        if first_chapter > last_chapter:
+            return []
+        spans = [(chapter, *self._chapter(ordinal, chapter)) for chapter in range(first_chapter, last_chapter + 1)]
+        texts = iter(self._slice(spans[0][1], spans[-1][1] + spans[-1][2]))
+        return [(chapter, verse, next(texts)) for chapter, _, count in spans for verse in range(1, count + 1)]
+
+
+def pack_directory(translation_dir) -> dict:
+    """Rebuild the packed file of a translation from its canonical JSON"""
+    translation_dir = Path(translation_dir)
+    books = json.loads((translation_dir / "_books.json").read_text(encoding="utf-8"))
+    writer = PackWriter()
+    for book in sorted(books, key=lambda b: b["ordinal"]):
+        for chapter_file in sorted((translation_dir / book["directory"]).glob("*.json")):
+            chapter_doc = json.loads(chapter_file.read_text(encoding="utf-8"))
+            writer.add_chapter(book["ordinal"], int(chapter_doc["chapter"]), chapter_doc["verses"])
+    return writer.write(translation_dir / PACK_FILE)
+
+
+def main() -> int:
+    if len(sys.argv) != 2:
+        print(f"usage: {sys.argv[0]} <translation dir>", file=sys.stderr)
+        return 1
+    counts = pack_directory(sys.argv[1])
+    print(f"packed {counts['books']} books, {counts['chapters']} chapters, "
+          f"{counts['verses']} verses ({counts['textBytes']} text bytes) into {Path(sys.argv[1]) / PACK_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
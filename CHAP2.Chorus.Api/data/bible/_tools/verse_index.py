@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Diacritic-folded inverted index over a Bible translation's verses.
+
+Written by import-aov.py next to the chapter files as `_verses.idx`, so
+keyword and phrase lookups never scan the verses themselves. Tokens are
+NFKD-folded and lowercased ("wêreld" -> "wereld", "Daniël" -> "daniel").
+
+    header          struct HEADER (magic, version, counts, sha256 of the rest)
+    verse table     verse_count x <BHH  book ordinal, chapter, verse
+    term table      term_count x <IIII  term offset, postings offset,
+                    postings length, document frequency (sorted by term)
+    term blob       UTF-8 terms, concatenated
+    postings blob   per term, varints: a skip table (entry count, then per
+                    block of SKIP_INTERVAL verses the preceding verse number and
+                    byte offset, both delta-coded), then for each verse the
+                    verse-number delta, the position count and position deltas
+
+AND and phrase queries decode the rarest term's postings and probe the
+others through their skip tables, so a common word like "die" costs one
+block per candidate verse rather than its whole posting list.
+
+Query from the shell:
+    python3 data/bible/_tools/verse_index.py data/bible/aov "die Here is my herder"
+    python3 data/bible/_tools/verse_index.py data/bible/aov --all wereld liefde
+
+Compare AND and phrase results with a scan of the chapter JSON, for the
+given query or for queries that probe the edges of skip blocks:
+    python3 data/bible/_tools/verse_index.py data/bible/aov --check
+"""
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+
+INDEX_FILE = "_verses.idx"
+MAGIC = b"CHAP2BIX"
+VERSION = 1
+SKIP_INTERVAL = 64
+
+HEADER = struct.Struct("<8sHHIIII32s")
+VERSE_ENTRY = struct.Struct("<BHH")
+TERM_ENTRY = struct.Struct("<IIII")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class _FoldTable(dict):
+    """str.translate table that folds each character on first sight"""
+
+    def __missing__(self, codepoint):
+        norm = unicodedata.normalize("NFKD", chr(codepoint))
+        folded = "".join(c for c in norm if not unicodedata.combining(c))
+        self[codepoint] = folded
+        return folded
+
+
+_FOLD = _FoldTable()
+
+
+def fold(text: str) -> str:
+    """NFKD-decompose, drop combining marks and lowercase"""
+    return text.translate(_FOLD).lower()
+
+
+def tokenize(text: str):
+    return _TOKEN.findall(fold(text))
+
+
+def _varint(value: int, out: bytearray) -> None:
+    if value < 0x80:
+        out.append(value)
+        return
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, offset: int):
+    """(value, next offset) of the LEB128 varint at offset"""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _read_postings(data: bytes, offset: int, number: int, limit: int, result: dict) -> None:
+    """Decode up to `limit` postings from data[offset:] into result"""
+    end = len(data)
+    while offset < end and limit:
+        # Nearly every delta fits in one byte; only fall back for the rest
+        delta = data[offset]
+        if delta < 0x80:
+            offset += 1
+        else:
+            delta, offset = _read_varint(data, offset)
+        number += delta
+        count = data[offset]
+        if count < 0x80:
+            offset += 1
+        else:
+            count, offset = _read_varint(data, offset)
+        positions = []
+        position = 0
+        for _ in range(count):
+            delta = data[offset]
+            if delta < 0x80:
+                offset += 1
+            else:
+                delta, offset = _read_varint(data, offset)
+            position += delta
+            positions.append(position)
+        result[number] = tuple(positions)
+        limit -= 1
+
+
+class _TermPostings:
+    """Postings of one term, varint-encoded as verses are added"""
+
+    __slots__ = ("encoded", "skips", "skip_count", "skip_number", "skip_offset", "previous", "df")
+
+    def __init__(self):
+        self.encoded = bytearray()
+        self.skips = bytearray()
+        self.skip_count = 0
+        self.skip_number = 0
+        self.skip_offset = 0
+        self.previous = 0
+        self.df = 0
+
+    def add(self, number: int, positions) -> None:
+        if self.df and self.df % SKIP_INTERVAL == 0:
+            _varint(self.previous - self.skip_number, self.skips)
+            _varint(len(self.encoded) - self.skip_offset, self.skips)
+            self.skip_number, self.skip_offset = self.previous, len(self.encoded)
+            self.skip_count += 1
+        _varint(number - self.previous, self.encoded)
+        self.previous = number
+        _varint(len(positions), self.encoded)
+        last = 0
+        for position in positions:
+            _varint(position - last, self.encoded)
+            last = position
+        self.df += 1
+
+
+class IndexWriter:
+    """Accumulates verses in canonical order and serializes the index"""
+
+    def __init__(self):
+        self._refs = bytearray()
+        self._verse_count = 0
+        self._postings = {}
+
+    def add_verse(self, ordinal: int, chapter: int, verse: int, text: str) -> None:
+        number = self._verse_count
+        self._verse_count += 1
+        self._refs += VERSE_ENTRY.pack(ordinal, chapter, verse)
+        positions = defaultdict(list)
+        for position, token in enumerate(tokenize(text)):
+            positions[token].append(position)
+        for token, token_positions in positions.items():
+            entry = self._postings.get(token)
+            if entry is None:
+                entry = self._postings[token] = _TermPostings()
+            entry.add(number, token_positions)
+
+    def counts(self) -> dict:
+        return {"verses": self._verse_count, "terms": len(self._postings)}
+
+    def pack(self) -> bytes:
+        """The complete index file: header followed by tables and blobs"""
+        terms = sorted(self._postings)
+        term_blob = bytearray()
+        postings_blob = bytearray()
+        term_table = bytearray()
+        for term in terms:
+            entry = self._postings[term]
+            term_offset = len(term_blob)
+            term_blob += term.encode("utf-8")
+            postings_offset = len(postings_blob)
+            _varint(entry.skip_count, postings_blob)
+            postings_blob += entry.skips
+            postings_blob += entry.encoded
+            term_table += TERM_ENTRY.pack(term_offset, postings_offset, len(postings_blob) - postings_offset, entry.df)
+        body = b"".join((bytes(self._refs), bytes(term_table), bytes(term_blob), bytes(postings_blob)))
+        header = HEADER.pack(
+            MAGIC, VERSION, 0, self._verse_count, len(terms),
+            len(term_blob), len(postings_blob), hashlib.sha256(body).digest(),
+        )
+        return header + body
+
+    def write(self, path) -> dict:
+        """Write atomically to `path`; returns the counts"""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(self.pack())
+        os.replace(tmp, path)
+        return self.counts()
+
+
+class VerseIndex:
+    """Read-only, memory-mapped view of a verse index with AND and phrase queries"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size:
+            raise ValueError(f"{self.path} is too short to be a verse index")
+        (magic, version, _flags, self.verse_count, self.term_count,
+         term_bytes, postings_bytes, self.checksum) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a verse index")
+        if version != VERSION:
+            raise ValueError(f"{self.path} is index version {version}, expected {VERSION}")
+        self._verses_at = HEADER.size
+        self._terms_at = self._verses_at + self.verse_count * VERSE_ENTRY.size
+        self._term_blob_at = self._terms_at + self.term_count * TERM_ENTRY.size
+        self._postings_at = self._term_blob_at + term_bytes
+        if len(self._mm) != self._postings_at + postings_bytes:
+            raise ValueError(f"{self.path} is truncated or has trailing data")
+        # The vocabulary is small (tens of thousands of words); keep it as a
+        # sorted list for bisect rather than re-reading the term blob per lookup
+        entries = [TERM_ENTRY.unpack_from(self._mm, self._terms_at + i * TERM_ENTRY.size) for i in range(self.term_count)]
+        blob = self._mm[self._term_blob_at:self._postings_at]
+        bounds = [entry[0] for entry in entries] + [term_bytes]
+        self._terms = [blob[lo:hi].decode("utf-8") for lo, hi in zip(bounds, bounds[1:])]
+        self._entries = entries
+        self.postings = lru_cache(maxsize=256)(self._postings)
+
+    def close(self) -> None:
+        self.postings.cache_clear()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def verify(self) -> bool:
+        """Recompute the checksum over everything after the header"""
+        return hashlib.sha256(self._mm[HEADER.size:]).digest() == self.checksum
+
+    def reference(self, number: int):
+        """(book ordinal, chapter, verse) of a verse number"""
+        return VERSE_ENTRY.unpack_from(self._mm, self._verses_at + number * VERSE_ENTRY.size)
+
+    def document_frequency(self, term: str) -> int:
+        i = bisect.bisect_left(self._terms, term)
+        if i < len(self._terms) and self._terms[i] == term:
+            return self._entries[i][3]
+        return 0
+
+    def _region(self, term: str):
+        """(skip numbers, skip offsets, postings bytes, document frequency) of a term"""
+        i = bisect.bisect_left(self._terms, term)
+        if i == len(self._terms) or self._terms[i] != term:
+            return None
+        _, offset, length, df = self._entries[i]
+        start = self._postings_at + offset
+        count, offset = _read_varint(self._mm, start)
+        numbers, offsets = [0], [0]
+        for _ in range(count):
+            number_delta, offset = _read_varint(self._mm, offset)
+            offset_delta, offset = _read_varint(self._mm, offset)
+            numbers.append(numbers[-1] + number_delta)
+            offsets.append(offsets[-1] + offset_delta)
+        return numbers, offsets, self._mm[offset:start + length], df
+
+    def _postings(self, term: str):
+        """{verse number: (positions...)} for one folded term"""
+        region = self._region(term)
+        if region is None:
+            return {}
+        _, _, data, df = region
+        result = {}
+        _read_postings(data, 0, 0, df, result)
+        return result
+
+    def _probe(self, term: str, numbers):
+        """{verse number: positions} for those of `numbers` that contain term"""
+        region = self._region(term)
+        if region is None:
+            return {}
+        skip_numbers, skip_offsets, data, df = region
+        if df <= len(numbers) * SKIP_INTERVAL:
+            postings = self.postings(term)
+            return {n: postings[n] for n in numbers if n in postings}
+        decoded = {}
+        seen_blocks = set()
+        for number in numbers:
+            # A block's skip number is the last verse of the block before it, so a verse
+            # equal to it belongs to that earlier block; verse 0 can only be in block 0
+            block = max(0, bisect.bisect_left(skip_numbers, number) - 1)
+            if block not in seen_blocks:
+                seen_blocks.add(block)
+                _read_postings(data, skip_offsets[block], skip_numbers[block], SKIP_INTERVAL, decoded)
+        return {n: decoded[n] for n in numbers if n in decoded}
+
+    def _match(self, tokens):
+        """{verse number: {term: positions}} for verses containing every token"""
+        terms = sorted(set(tokens), key=self.document_frequency)
+        if not terms or not self.document_frequency(terms[0]):
+            return {}
+        matches = {n: {terms[0]: positions} for n, positions in self.postings(terms[0]).items()}
+        for term in terms[1:]:
+            found = self._probe(term, sorted(matches))
+            matches = {n: dict(matches[n], **{term: found[n]}) for n in found}
+            if not matches:
+                break
+        return matches
+
+    def search_all(self, query: str):
+        """Verse numbers containing every query token, in canonical order"""
+        return sorted(self._match(tokenize(query)))
+
+    def search_phrase(self, query: str):
+        """Verse numbers containing the query tokens consecutively"""
+        tokens = tokenize(query)
+        results = []
+        for number, positions in sorted(self._match(tokens).items()):
+            starts = set(positions[tokens[0]])
+            for offset, token in enumerate(tokens[1:], start=1):
+                starts.intersection_update(p - offset for p in positions[token])
+                if not starts:
+                    break
+            if starts:
+                results.append(number)
+        return results
+
+
+def iter_verses(translation_dir):
+    """(book ordinal, chapter, verse, text) in canonical order, as the index numbers them"""
+    translation_dir = Path(translation_dir)
+    books = json.loads((translation_dir / "_books.json").read_text(encoding="utf-8"))
+    for book in sorted(books, key=lambda b: b["ordinal"]):
+        for chapter_file in sorted((translation_dir / book["directory"]).glob("*.json")):
+            chapter_doc = json.loads(chapter_file.read_text(encoding="utf-8"))
+            for v in chapter_doc["verses"]:
+                yield book["ordinal"], int(chapter_doc["chapter"]), int(v["verse"]), v["text"]
+
+
+def index_directory(translation_dir, path=None) -> dict:
+    """Rebuild the verse index of a translation from its canonical JSON"""
+    writer = IndexWriter()
+    for ordinal, chapter, verse, text in iter_verses(translation_dir):
+        writer.add_verse(ordinal, chapter, verse, text)
+    return writer.write(path or Path(translation_dir) / INDEX_FILE)
+
+
+def scan(verse_tokens, tokens):
+    """(AND matches, phrase matches) for tokens by brute force over every verse"""
+    matches = [n for n, verse in enumerate(verse_tokens) if set(tokens) <= set(verse)]
+    phrases = [
+        n for n in matches
+        if any(verse_tokens[n][i:i + len(tokens)] == tokens for i in range(len(verse_tokens[n])))
+    ]
+    return matches, phrases
+
+
+def boundary_queries(index: VerseIndex, verse_tokens):
+    """Queries that make the commonest term be probed through its skip table
+    at verse 0 and at the last verse of its first blocks"""
+    common = max(index._terms, key=index.document_frequency)
+    skip_numbers = index._region(common)[0]
+    queries = []
+    for number in [0] + skip_numbers[1:4]:
+        tokens = verse_tokens[number]
+        # Paired with a rarer term, only a few candidates are probed for the common one
+        queries.extend(f"{token} {common}" for token in dict.fromkeys(tokens) if token != common)
+    queries.extend(" ".join(verse_tokens[0][:length]) for length in range(2, len(verse_tokens[0]) + 1))
+    return queries
+
+
+def check(index: VerseIndex, verse_tokens, queries):
+    """Queries whose search_all or search_phrase results differ from a scan"""
+    mismatches = []
+    for query in queries:
+        expected_all, expected_phrase = scan(verse_tokens, tokenize(query))
+        if index.search_all(query) != expected_all or index.search_phrase(query) != expected_phrase:
+            mismatches.append(query)
+    return mismatches
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    if not args:
+        print(f"usage: {sys.argv[0]} <translation dir> [--all | --check] [query]", file=sys.stderr)
+        return 1
+    translation_dir = Path(args[0])
+    if len(args) == 1:
+        counts = index_directory(translation_dir)
+        print(f"indexed {counts['verses']} verses, {counts['terms']} terms into {translation_dir / INDEX_FILE}")
+        return 0
+    if args[1] == "--check":
+        verse_tokens = [tokenize(text) for _, _, _, text in iter_verses(translation_dir)]
+        with VerseIndex(translation_dir / INDEX_FILE) as index:
+            queries = [" ".join(args[2:])] if args[2:] else boundary_queries(index, verse_tokens)
+            mismatches = check(index, verse_tokens, queries)
+        for query in mismatches:
+            print(f"mismatch: {query}")
+        print(f"{len(queries) - len(mismatches)}/{len(queries)} queries match a scan", file=sys.stderr)
+        return 1 if mismatches else 0
+    match_all = args[1] == "--all"
+    query = " ".join(args[2:] if match_all else args[1:])
+    books = {b["ordinal"]: b["name"] for b in json.loads((translation_dir / "_books.json").read_text(encoding="utf-8"))}
+    with VerseIndex(translation_dir / INDEX_FILE) as index:
+        numbers = index.search_all(query) if match_all else index.search_phrase(query)
+        for number in numbers:
+            ordinal, chapter, verse = index.reference(number)
+            print(f"{books.get(ordinal, ordinal)} {chapter}:{verse}")
+    print(f"{len(numbers)} verses", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
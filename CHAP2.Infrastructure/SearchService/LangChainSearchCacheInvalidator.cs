@@ -0,0 +1,65 @@
+using System.Net.Http.Json;
+using CHAP2.Application.Interfaces;
+using Microsoft.Extensions.Logging;
+
+namespace CHAP2.Infrastructure.SearchService;
+
+/// <summary>
+/// Posts chorus change notifications to the LangChain search service's
+/// POST /invalidate_cache, which evicts only the cached results that
+/// reference the changed choruses (and re-runs the popular ones).
+///
+/// Fail-soft: a slow or unreachable search service is logged and
+/// reported as false, never thrown -- it must not fail the chorus edit.
+/// </summary>
+public sealed class LangChainSearchCacheInvalidator : ISearchCacheInvalidator
+{
+    private readonly HttpClient _http;
+    private readonly string _serviceUrl;
+    private readonly ILogger<LangChainSearchCacheInvalidator> _logger;
+
+    public LangChainSearchCacheInvalidator(
+        HttpClient httpClient,
+        string serviceUrl,
+        ILogger<LangChainSearchCacheInvalidator> logger)
+    {
+        _http = httpClient ?? throw new ArgumentNullException(nameof(httpClient));
+        _serviceUrl = !string.IsNullOrWhiteSpace(serviceUrl)
+            ? serviceUrl.TrimEnd('/')
+            : throw new ArgumentException("serviceUrl required", nameof(serviceUrl));
+        _logger = logger ?? throw new ArgumentNullException(nameof(logger));
+    }
+
+    public async Task<bool> InvalidateAsync(
+        IReadOnlyCollection<Guid> chorusIds,
+        string change,
+        CancellationToken cancellationToken = default)
+    {
+        if (chorusIds.Count == 0) return true;
+
+        var payload = new
+        {
+            chorus_ids = chorusIds.Select(id => id.ToString("D")).ToArray(),
+            change,
+        };
+
+        try
+        {
+            using var resp = await _http.PostAsync(
+                $"{_serviceUrl}/invalidate_cache", JsonContent.Create(payload), cancellationToken);
+            if (resp.IsSuccessStatusCode) return true;
+
+            _logger.LogWarning(
+                "Search cache invalidation for {Count} chorus(es) returned {Status}",
+                chorusIds.Count, (int)resp.StatusCode);
+            return false;
+        }
+        catch (Exception ex) when ((ex is HttpRequestException or TaskCanceledException) && !cancellationToken.IsCancellationRequested)
+        {
+            _logger.LogWarning(
+                ex, "Search cache invalidation for {Count} chorus(es) failed; cached results expire by TTL",
+                chorusIds.Count);
+            return false;
+        }
+    }
+}
@@ -0,0 +1,25 @@
+namespace CHAP2.Shared.Configuration;
+
+/// <summary>
+/// Bound to the "SearchCacheSync" config section. When enabled, chorus
+/// create / update / delete events tell the LangChain search service
+/// which choruses changed so it evicts only the cached results built
+/// from them.
+///
+/// Default Enabled=false so a run without the search service never
+/// waits on it -- docker-compose turns it on.
+/// </summary>
+public sealed class SearchCacheSyncOptions
+{
+    public bool Enabled { get; set; } = false;
+
+    /// <summary>Base URL of the LangChain search service (e.g. "http://langchain-service:8000").</summary>
+    public string ServiceUrl { get; set; } = "http://localhost:8000";
+
+    /// <summary>
+    /// Per-notification timeout. Handlers run inside the chorus request,
+    /// so this is kept short; a missed notification only leaves results
+    /// cached until their TTL.
+    /// </summary>
+    public int TimeoutSeconds { get; set; } = 5;
+}
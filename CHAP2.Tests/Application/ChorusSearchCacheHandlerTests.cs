@@ -0,0 +1,77 @@
+using CHAP2.Application.EventHandlers;
+using CHAP2.Application.Interfaces;
+using CHAP2.Domain.Events;
+using CHAP2.Shared.Configuration;
+using FluentAssertions;
+using Microsoft.Extensions.Logging.Abstractions;
+using Microsoft.Extensions.Options;
+using NSubstitute;
+using NSubstitute.ExceptionExtensions;
+
+namespace CHAP2.Tests.Application;
+
+[TestFixture]
+public class ChorusSearchCacheHandlerTests
+{
+    private ISearchCacheInvalidator _invalidator = null!;
+    private ChorusSearchCacheHandler _sut = null!;
+
+    [SetUp]
+    public void SetUp()
+    {
+        _invalidator = Substitute.For<ISearchCacheInvalidator>();
+        _invalidator.InvalidateAsync(Arg.Any<IReadOnlyCollection<Guid>>(), Arg.Any<string>(), Arg.Any<CancellationToken>())
+            .Returns(true);
+        _sut = CreateHandler(enabled: true);
+    }
+
+    private ChorusSearchCacheHandler CreateHandler(bool enabled) =>
+        new(_invalidator, Options.Create(new SearchCacheSyncOptions { Enabled = enabled }),
+            NullLogger<ChorusSearchCacheHandler>.Instance);
+
+    [Test]
+    public async Task HandleAsync_Updated_InvalidatesOnlyThatChorus()
+    {
+        var id = Guid.NewGuid();
+
+        await _sut.HandleAsync(new ChorusUpdatedEvent(id, "Amazing Grace"));
+
+        await _invalidator.Received(1).InvalidateAsync(
+            Arg.Is<IReadOnlyCollection<Guid>>(ids => ids.Count == 1 && ids.Contains(id)),
+            "updated",
+            Arg.Any<CancellationToken>());
+    }
+
+    [Test]
+    public async Task HandleAsync_CreatedAndDeleted_ReportTheirChange()
+    {
+        var id = Guid.NewGuid();
+
+        await _sut.HandleAsync(new ChorusCreatedEvent(id, "New"));
+        await _sut.HandleAsync(new ChorusDeletedEvent(id, "New"));
+
+        await _invalidator.Received(1).InvalidateAsync(Arg.Any<IReadOnlyCollection<Guid>>(), "created", Arg.Any<CancellationToken>());
+        await _invalidator.Received(1).InvalidateAsync(Arg.Any<IReadOnlyCollection<Guid>>(), "deleted", Arg.Any<CancellationToken>());
+    }
+
+    [Test]
+    public async Task HandleAsync_Disabled_DoesNotNotify()
+    {
+        var sut = CreateHandler(enabled: false);
+
+        await sut.HandleAsync(new ChorusUpdatedEvent(Guid.NewGuid(), "Amazing Grace"));
+
+        await _invalidator.DidNotReceiveWithAnyArgs().InvalidateAsync(default!, default!, default);
+    }
+
+    [Test]
+    public async Task HandleAsync_InvalidatorThrows_DoesNotFailTheEdit()
+    {
+        _invalidator.InvalidateAsync(Arg.Any<IReadOnlyCollection<Guid>>(), Arg.Any<string>(), Arg.Any<CancellationToken>())
+            .ThrowsAsync(new InvalidOperationException("boom"));
+
+        Func<Task> act = async () => await _sut.HandleAsync(new ChorusUpdatedEvent(Guid.NewGuid(), "Amazing Grace"));
+
+        await act.Should().NotThrowAsync();
+    }
+}
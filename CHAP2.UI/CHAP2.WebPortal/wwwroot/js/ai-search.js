@@ -1179,6 +1179,19 @@ class AiSearch {
                                         this.updateAiStatus('💭 Analyzing why each chorus matches...', 'thinking');
                                         break;
                                         
+                                    case 'analysisStart':
+                                        debug('AI Search: Analysis stream started');
+                                        this.updateAiStatus('✍️ Writing AI analysis...', 'thinking');
+                                        break;
+                                        
+                                    case 'analysisTiming':
+                                        debug('AI Search: Analysis time to first token (ms):', data.timeToFirstTokenMs);
+                                        break;
+                                        
+                                    case 'analysisChunk':
+                                        this.appendAiAnalysisChunk(data.chunk);
+                                        break;
+                                        
                                     case 'aiAnalysis':
                                         debug('AI Search: Displaying AI analysis');
                                         this.displayAiAnalysis(data.analysis);
@@ -1306,6 +1319,16 @@ class AiSearch {
         this.addSparkleEffect(this.aiAnalysisContainer);
     }
 
+    appendAiAnalysisChunk(chunk) {
+        if (!this.aiAnalysisContainer || !this.analysisContent || !chunk) return;
+
+        if (this.aiAnalysisContainer.style.display !== 'block') {
+            this.analysisContent.textContent = '';
+            this.aiAnalysisContainer.style.display = 'block';
+        }
+        this.analysisContent.textContent += chunk;
+    }
+
     celebrateAndFadeStatus() {
         const statusIndicator = document.getElementById('aiStatusIndicator');
         if (statusIndicator) {
@@ -0,0 +1,211 @@
+"""
+Deterministic stand-in for the Ollama HTTP API.
+
+Serves /api/embed, /api/embeddings, /api/generate (streamed NDJSON or a
+single response), /api/tags and /api/version on a local port with
+configurable latency, so the service and vectorize_data.py can be
+benchmarked without a GPU or network.
+
+Embeddings are feature-hashed bags of diacritic-folded words, so texts that
+share words land close together and every run produces the same vectors.
+Generation returns search terms for the search-term prompt and a fixed
+number of filler tokens otherwise.
+
+    python benchmarks/fake_ollama.py --port 11434 --embed-latency 0.02 --ttft 0.5
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+SEARCH_TERMS_MARKER = "single-word search terms"
+SEARCH_TERMS = "liefde,love, genade,grace, lof,praise"
+FILLER = ("These choruses share themes of grace, worship and praise, with simple "
+          "melodies suited to congregational singing and lyrics drawn from Scripture. ").split(" ")
+
+
+@dataclass
+class FakeOllamaConfig:
+    dimension: int = 768
+    embed_latency: float = 0.02      # seconds per /api/embed call
+    embed_item_latency: float = 0.002  # extra seconds per input text
+    ttft: float = 0.3                # seconds before the first generated token
+    token_latency: float = 0.02      # seconds between generated tokens
+    tokens: int = 60                 # tokens per non-search-term generation
+    parallel: int = 1                # embed calls served at once, like OLLAMA_NUM_PARALLEL
+
+
+def fake_embedding(text: str, dimension: int = 768) -> List[float]:
+    """Unit-length feature-hashed bag of folded words"""
+    norm = unicodedata.normalize("NFKD", text)
+    folded = "".join(c for c in norm if not unicodedata.combining(c)).lower()
+    vector = [0.0] * dimension
+    for token in _TOKEN.findall(folded) or [folded]:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dimension
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def generated_tokens(prompt: str, config: FakeOllamaConfig) -> List[str]:
+    if SEARCH_TERMS_MARKER in prompt:
+        return [SEARCH_TERMS]
+    words = [w for w in FILLER if w]
+    return [words[i % len(words)] + " " for i in range(config.tokens)]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40 ms
+    disable_nagle_algorithm = True
+    config = FakeOllamaConfig()
+    embed_slots = threading.Semaphore(config.parallel)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": "mistral:latest"}, {"name": "nomic-embed-text:latest"}]})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        body = self._body()
+        config = self.config
+        if self.path == "/api/embed":
+            inputs = body.get("input", "")
+            inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+            with self.embed_slots:
+                time.sleep(config.embed_latency + config.embed_item_latency * len(inputs))
+            self._send_json({
+                "model": body.get("model", ""),
+                "embeddings": [fake_embedding(text, config.dimension) for text in inputs]
+            })
+        elif self.path == "/api/embeddings":
+            with self.embed_slots:
+                time.sleep(config.embed_latency + config.embed_item_latency)
+            self._send_json({"embedding": fake_embedding(body.get("prompt", ""), config.dimension)})
+        elif self.path == "/api/generate":
+            self._generate(body)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _generate(self, body):
+        config = self.config
+        tokens = generated_tokens(body.get("prompt", ""), config)
+        model = body.get("model", "")
+        if not body.get("stream", True):
+            time.sleep(config.ttft + config.token_latency * (len(tokens) - 1))
+            self._send_json({"model": model, "response": "".join(tokens), "done": True})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            time.sleep(config.ttft)
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(config.token_latency)
+                self._send_chunk({"model": model, "response": token, "done": False})
+            self._send_chunk({"model": model, "response": "", "done": True, "done_reason": "stop"})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading (e.g. the SSE consumer went away)
+            self.close_connection = True
+
+
+class FakeOllama:
+    """Fake Ollama server running on a background thread"""
+
+    def __init__(self, config: FakeOllamaConfig, host: str = "127.0.0.1", port: int = 0):
+        handler = type("ConfiguredFakeOllamaHandler", (FakeOllamaHandler,), {
+            "config": config,
+            "embed_slots": threading.Semaphore(max(1, config.parallel))
+        })
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-ollama", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def add_latency_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeOllamaConfig()
+    parser.add_argument("--embed-latency", type=float, default=defaults.embed_latency, help="Seconds per embed call")
+    parser.add_argument("--embed-item-latency", type=float, default=defaults.embed_item_latency, help="Extra seconds per embedded text")
+    parser.add_argument("--ttft", type=float, default=defaults.ttft, help="Seconds to the first generated token")
+    parser.add_argument("--token-latency", type=float, default=defaults.token_latency, help="Seconds between generated tokens")
+    parser.add_argument("--tokens", type=int, default=defaults.tokens, help="Tokens per analysis generation")
+    parser.add_argument("--parallel", type=int, default=defaults.parallel, help="Embed calls served concurrently")
+
+
+def config_from_args(args) -> FakeOllamaConfig:
+    return FakeOllamaConfig(
+        embed_latency=args.embed_latency,
+        embed_item_latency=args.embed_item_latency,
+        ttft=args.ttft,
+        token_latency=args.token_latency,
+        tokens=args.tokens,
+        parallel=args.parallel
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a deterministic fake Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+    with FakeOllama(config_from_args(args), args.host, args.port) as fake:
+        print(f"Fake Ollama listening on {fake.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
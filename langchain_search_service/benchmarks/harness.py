@@ -0,0 +1,70 @@
+"""
+Shared plumbing for the benchmarks: percentiles, result tables and
+baseline comparison.
+"""
+
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+if str(SERVICE_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVICE_DIR))
+
+# Metrics where a larger value is better; every other metric is a latency
+HIGHER_IS_BETTER = ("throughput_rps", "docs_per_s", "points_per_s")
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile (p in 0-100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(latencies_s: List[float], prefix: str = "") -> Dict[str, Optional[float]]:
+    """p50/p95/p99/max in milliseconds"""
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+    return {
+        f"{prefix}p50_ms": ms(percentile(latencies_s, 50)),
+        f"{prefix}p95_ms": ms(percentile(latencies_s, 95)),
+        f"{prefix}p99_ms": ms(percentile(latencies_s, 99)),
+        f"{prefix}max_ms": ms(max(latencies_s) if latencies_s else None),
+    }
+
+
+def compare_to_baseline(results: Dict[str, Dict], baseline_path: str, max_regression: float) -> List[str]:
+    """Human-readable regressions beyond max_regression (e.g. 0.2 = 20%)"""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    regressions = []
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(scenario, {}).get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            if not (metric.endswith("_ms") or metric in HIGHER_IS_BETTER):
+                continue
+            change = (value - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > max_regression:
+                regressions.append(f"{scenario}.{metric}: {old} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def _cell(value) -> str:
+    return "-" if value is None else str(value)
+
+
+def print_table(results: Dict[str, Dict], columns: List[str]) -> None:
+    widths = [max(len("scenario"), *(len(name) for name in results))]
+    widths += [max(len(col), *(len(_cell(r.get(col))) for r in results.values())) for col in columns]
+    header = ["scenario"] + columns
+    print("  ".join(h.ljust(w) for h, w in zip(header, widths)))
+    for name, row in results.items():
+        cells = [name] + [_cell(row.get(col)) for col in columns]
+        print("  ".join(c.ljust(w) for c, w in zip(cells, widths)))
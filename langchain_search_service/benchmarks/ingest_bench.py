@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Offline ingestion benchmark for vectorize_data.py.
+
+Copies the repo's chorus files --scale times (fresh uuid5 ids per copy) into
+a temporary directory and syncs them into Qdrant (in-process by default) through the
+fake Ollama: a full sync, an incremental sync with nothing changed, and a
+sync after editing --change-percent of the choruses. Reports docs/sec per
+run and per pipeline stage.
+
+    python benchmarks/ingest_bench.py --scale 4 --batch-size 32
+    python benchmarks/ingest_bench.py --json ingest.json
+    python benchmarks/ingest_bench.py --baseline ingest.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+from fake_ollama import FakeOllama, add_latency_arguments, config_from_args
+from harness import SERVICE_DIR, compare_to_baseline, print_table
+
+COLUMNS = ["embedded", "payload_only", "unchanged", "deleted", "points", "wall_s", "docs_per_s", "batch_size"]
+
+
+def replicate(source: Path, target: Path, scale: int):
+    """Write `scale` copies of every chorus with distinct deterministic ids"""
+    written = []
+    for path in sorted(source.glob("*.json")):
+        chorus = json.loads(path.read_text(encoding="utf-8"))
+        for copy in range(scale):
+            if copy:
+                chorus = dict(chorus, id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{chorus['id']}/{copy}")),
+                              name=f"{chorus['name']} ({copy})")
+            out = target / f"{chorus['id']}.json"
+            out.write_text(json.dumps(chorus, ensure_ascii=False), encoding="utf-8")
+            written.append(out)
+    return written
+
+
+def edit(paths, percent: float, seed: int) -> int:
+    """Append a line to the lyrics of a sample of choruses so they re-embed"""
+    rng = random.Random(seed)
+    sample = rng.sample(paths, int(len(paths) * percent / 100))
+    for path in sample:
+        chorus = json.loads(path.read_text(encoding="utf-8"))
+        chorus["chorusText"] = (chorus.get("chorusText") or "") + "\nHalleluja, amen"
+        path.write_text(json.dumps(chorus, ensure_ascii=False), encoding="utf-8")
+    return len(sample)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline ingestion benchmark for vectorize_data.py")
+    parser.add_argument("--data-dir", default=str(SERVICE_DIR / "data"), help="Chorus JSON to replicate")
+    parser.add_argument("--scale", type=int, default=2, help="Copies of each chorus")
+    parser.add_argument("--qdrant-url", default=":memory:", help="Qdrant to sync into; use a scratch instance, chorus-vectors gets fake embeddings")
+    parser.add_argument("--change-percent", type=float, default=10.0, help="Choruses edited before the last sync")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--embed-workers", type=int, default=3)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --json file")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed relative regression vs --baseline")
+    parser.add_argument("--verbose", action="store_true", help="Keep vectorize_data.py's INFO logging")
+    add_latency_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    with FakeOllama(config_from_args(args)) as fake, tempfile.TemporaryDirectory() as work_dir:
+        os.environ["OLLAMA_URL"] = fake.url
+        import vectorize_data
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+
+        paths = replicate(Path(args.data_dir), Path(work_dir), args.scale)
+        print(f"{len(paths)} choruses; fake Ollama at {fake.url}")
+
+        def sync():
+            report = vectorize_data.vectorize_and_store(
+                work_dir,
+                qdrant_url=args.qdrant_url,
+                batch_size=args.batch_size,
+                max_batch_size=args.max_batch_size,
+                adaptive=args.adaptive,
+                embed_workers=args.embed_workers,
+                queue_size=args.queue_size
+            )
+            if not report:
+                raise SystemExit("sync failed")
+            processed = report["embedded"] + report["payload_only"] + report["unchanged"]
+            report["docs_per_s"] = round(processed / report["wall_s"], 1) if report["wall_s"] else None
+            return report
+
+        runs = {"full": sync(), "no_change": sync()}
+        changed = edit(paths, args.change_percent, args.seed)
+        runs[f"changed_{changed}"] = sync()
+
+    print()
+    print_table(runs, COLUMNS)
+    print()
+    print_table({stage["stage"]: stage for stage in runs["full"]["stages"]},
+                ["docs", "busy_s", "docs_per_s_busy", "docs_per_s_wall"])
+
+    results = {name: {k: v for k, v in report.items() if k != "stages"} for name, report in runs.items()}
+    if args.json:
+        Path(args.json).write_text(json.dumps(runs, indent=2) + "\n", encoding="utf-8")
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the search service.
+
+Starts the fake Ollama, seeds Qdrant (in-process by default) from the chorus data with
+vectorize_data.py, runs main.py under uvicorn on a local port and drives
+each endpoint with a closed-loop load generator at a fixed concurrency.
+Reports p50/p95/p99 latency, throughput and, for the SSE stream, time to
+first event and first analysis token. The head-of-line scenario measures
+/search latency while LLM streams are running, which should stay close to
+/search on an idle service since the LLM has its own thread pool.
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --concurrency 16 --requests 500 --json bench.json
+    python benchmarks/load_test.py --baseline bench.json --max-regression 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+from fake_ollama import FakeOllama, add_latency_arguments, config_from_args
+from harness import SERVICE_DIR, compare_to_baseline, latency_summary, print_table
+
+SCENARIOS = ("search", "search_batch", "intelligent", "stream", "head_of_line")
+COLUMNS = ["requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms",
+           "ttfe_p50_ms", "ttfe_p95_ms", "first_token_p50_ms", "slowdown"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def build_queries(data_dir: Path, count: int, seed: int):
+    """Deterministic mix of chorus titles and short lyric fragments"""
+    rng = random.Random(seed)
+    titles, fragments = [], []
+    for path in sorted(data_dir.glob("*.json")):
+        chorus = json.loads(path.read_text(encoding="utf-8"))
+        if chorus.get("name"):
+            titles.append(chorus["name"])
+        words = (chorus.get("chorusText") or "").split()
+        if len(words) >= 3:
+            start = rng.randrange(len(words) - 2)
+            fragments.append(" ".join(words[start:start + rng.choice((2, 3))]))
+    pool = titles + fragments
+    return [rng.choice(pool) for _ in range(count)]
+
+
+class LoadRunner:
+    def __init__(self, base_url: str, args):
+        self.base_url = base_url
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.queries = build_queries(Path(args.data_dir), max(args.distinct, 1), args.seed)
+        self.unique = 0
+
+    def query(self) -> str:
+        if self.args.distinct:
+            return self.rng.choice(self.queries)
+        # Cold run: make every query unique so nothing is served from cache
+        self.unique += 1
+        return f"{self.rng.choice(self.queries)} {self.unique}"
+
+    async def closed_loop(self, client, requests: int, concurrency: int, send):
+        """Run `requests` calls of send(client) over `concurrency` workers"""
+        latencies, extras, errors = [], [], []
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    extra = await send(client, started)
+                except Exception as e:
+                    errors.append(repr(e))
+                    continue
+                latencies.append(time.perf_counter() - started)
+                if extra:
+                    extras.append(extra)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+        if errors:
+            logging.getLogger(__name__).warning(f"{len(errors)} errors, first: {errors[0]}")
+        result = {
+            "requests": requests,
+            "errors": len(errors),
+            "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        }
+        result.update(latency_summary(latencies))
+        return result, extras
+
+    async def post(self, client, path, payload):
+        response = await client.post(path, json=payload)
+        response.raise_for_status()
+        return response
+
+    async def search(self, client, started):
+        await self.post(client, "/search", {"query": self.query(), "k": self.args.k})
+
+    async def search_batch(self, client, started):
+        queries = [{"query": self.query(), "k": self.args.k} for _ in range(self.args.batch_size)]
+        await self.post(client, "/search_batch", {"queries": queries})
+
+    async def intelligent(self, client, started):
+        await self.post(client, "/search_intelligent", {"query": self.query(), "k": self.args.k})
+
+    async def stream(self, client, started):
+        first_event = first_token = None
+        payload = {"query": self.query(), "k": self.args.k}
+        async with client.stream("POST", "/search_intelligent_stream", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                now = time.perf_counter()
+                # Events arrive as "data: data: {...}" followed by empty data lines
+                payload = line
+                while payload.startswith("data:"):
+                    payload = payload[5:].lstrip()
+                if not payload:
+                    continue
+                event = json.loads(payload).get("type")
+                if first_event is None:
+                    first_event = now - started
+                if first_token is None and event == "analysisChunk":
+                    first_token = now - started
+                if event in ("complete", "error"):
+                    break
+        return {"ttfe": first_event, "first_token": first_token}
+
+    async def run(self, scenario: str):
+        args = self.args
+        limits = httpx.Limits(max_connections=args.concurrency + args.hol_streams + 4)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=args.timeout, limits=limits) as client:
+            await client.post("/clear_cache")
+            if scenario == "search":
+                return (await self.closed_loop(client, args.requests, args.concurrency, self.search))[0]
+            if scenario == "search_batch":
+                paths = (await client.get("/openapi.json")).json()["paths"]
+                if "/search_batch" not in paths:
+                    return None
+                result, _ = await self.closed_loop(client, max(1, args.requests // args.batch_size), args.concurrency, self.search_batch)
+                result["queries_per_s"] = round(result["throughput_rps"] * args.batch_size, 2)
+                return result
+            if scenario == "intelligent":
+                return (await self.closed_loop(client, args.llm_requests, args.concurrency, self.intelligent))[0]
+            if scenario == "stream":
+                result, extras = await self.closed_loop(client, args.llm_requests, args.concurrency, self.stream)
+                result.update(latency_summary([e["ttfe"] for e in extras if e["ttfe"] is not None], "ttfe_"))
+                result.update(latency_summary([e["first_token"] for e in extras if e["first_token"] is not None], "first_token_"))
+                return result
+            if scenario == "head_of_line":
+                return await self.head_of_line(client)
+        raise ValueError(f"unknown scenario {scenario}")
+
+    async def head_of_line(self, client):
+        """/search latency alone versus while LLM streams occupy the LLM pool"""
+        args = self.args
+        saved = args.distinct
+        args.distinct = 0  # unique queries so every /search does real work
+        try:
+            alone, _ = await self.closed_loop(client, args.hol_searches, 1, self.search)
+            streams = [asyncio.create_task(self.stream(client, time.perf_counter())) for _ in range(args.hol_streams)]
+            # Let the streams reach the LLM before measuring
+            await asyncio.sleep(args.ttft / 2 + 0.05)
+            loaded, _ = await self.closed_loop(client, args.hol_searches, 1, self.search)
+            await asyncio.gather(*streams, return_exceptions=True)
+        finally:
+            args.distinct = saved
+        slowdown = None
+        if alone["p95_ms"] and loaded["p95_ms"]:
+            slowdown = round(loaded["p95_ms"] / alone["p95_ms"], 2)
+        return {
+            "requests": args.hol_searches,
+            "errors": loaded["errors"],
+            "p50_ms": loaded["p50_ms"],
+            "p95_ms": loaded["p95_ms"],
+            "p99_ms": loaded["p99_ms"],
+            "alone_p50_ms": alone["p50_ms"],
+            "alone_p95_ms": alone["p95_ms"],
+            "slowdown": slowdown,
+        }
+
+
+def start_service(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, name="service", daemon=True)
+    thread.start()
+    deadline = time.time() + 60
+    while not server.started:
+        if not thread.is_alive() or time.time() > deadline:
+            raise RuntimeError("search service failed to start")
+        time.sleep(0.05)
+    # Dependencies come up in the background; wait until /ready says so
+    while httpx.get(f"http://127.0.0.1:{port}/ready").status_code != 200:
+        if time.time() > deadline:
+            raise RuntimeError("search service did not become ready")
+        time.sleep(0.05)
+    return server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline load test for the LangChain search service")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients per scenario")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per /search scenario")
+    parser.add_argument("--llm-requests", type=int, default=20, help="Requests per LLM-backed scenario")
+    parser.add_argument("--batch-size", type=int, default=8, help="Queries per /search_batch request")
+    parser.add_argument("--distinct", type=int, default=50, help="Distinct queries to draw from (0 = every query unique, no cache hits)")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--hol-streams", type=int, default=4, help="Concurrent LLM streams in the head-of-line scenario")
+    parser.add_argument("--hol-searches", type=int, default=20, help="/search calls measured in the head-of-line scenario")
+    parser.add_argument("--data-dir", default=str(SERVICE_DIR / "data"), help="Chorus JSON used to seed Qdrant")
+    parser.add_argument("--qdrant-url", default=":memory:", help="Qdrant to seed and search; use a scratch instance, chorus-vectors gets fake embeddings")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --json file")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed relative regression vs --baseline")
+    parser.add_argument("--verbose", action="store_true", help="Keep the service's INFO logging")
+    add_latency_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    with FakeOllama(config_from_args(args)) as fake, tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["OLLAMA_URL"] = fake.url
+        os.environ["CACHE_DIR"] = cache_dir
+        # main.py and vectorize_data.py share one client per URL, so ":memory:" is one in-process Qdrant
+        os.environ["QDRANT_URL"] = args.qdrant_url
+        import main as service
+        import vectorize_data
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+
+        seeded = vectorize_data.vectorize_and_store(args.data_dir, qdrant_url=args.qdrant_url, batch_size=32)
+        if not seeded:
+            print("seeding Qdrant failed", file=sys.stderr)
+            return 1
+        print(f"Seeded {seeded['points']} choruses in {seeded['wall_s']}s; fake Ollama at {fake.url}")
+
+        server = start_service(service.app, free_port())
+        base_url = f"http://127.0.0.1:{server.config.port}"
+        runner = LoadRunner(base_url, args)
+        results = {}
+        try:
+            for scenario in scenarios:
+                result = asyncio.run(runner.run(scenario))
+                if result is not None:
+                    results[scenario] = result
+        finally:
+            server.should_exit = True
+
+    print()
+    print_table(results, COLUMNS)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
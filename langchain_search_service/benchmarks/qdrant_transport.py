@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+REST versus gRPC benchmark against a running Qdrant.
+
+Uses vectors and payloads already stored in --collection: the search phase
+issues the same top-k searches /search falls back to (with payloads) at a
+fixed concurrency, and the upsert phase writes copies of the stored points
+into a scratch collection in bulk batches, which is dropped afterwards.
+Both transports use the pool and timeout settings from qdrant_connection.py.
+
+    python benchmarks/qdrant_transport.py --url http://localhost:6333
+    python benchmarks/qdrant_transport.py --queries 2000 --concurrency 16 --json transport.json
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from qdrant_client import models
+
+from harness import compare_to_baseline, latency_summary, print_table
+from qdrant_connection import create_qdrant_client
+
+COLUMNS = ["requests", "throughput_rps", "points_per_s", "p50_ms", "p95_ms", "p99_ms"]
+
+
+def sample_points(client, collection: str, limit: int):
+    points, offset = [], None
+    while len(points) < limit:
+        batch, offset = client.scroll(collection_name=collection, limit=min(256, limit - len(points)),
+                                      offset=offset, with_payload=True, with_vectors=True)
+        points.extend(p for p in batch if p.vector is not None)
+        if offset is None:
+            break
+    if not points:
+        raise SystemExit(f"collection '{collection}' has no vectors to benchmark with")
+    return points
+
+
+def bench_search(client, collection: str, vectors, queries: int, concurrency: int, k: int):
+    def one(i):
+        started = time.perf_counter()
+        client.search(collection_name=collection, query_vector=vectors[i % len(vectors)], limit=k, with_payload=True)
+        return time.perf_counter() - started
+
+    # Warm the connection pool / channel before measuring
+    for i in range(min(concurrency, queries)):
+        one(i)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(queries)))
+    wall = time.perf_counter() - started
+    result = {"requests": queries, "throughput_rps": round(queries / wall, 1)}
+    result.update(latency_summary(latencies))
+    return result
+
+
+def bench_upsert(client, collection: str, points, total: int, batch_size: int):
+    info = client.get_collection(collection)
+    scratch = f"{collection}-transport-bench-{uuid.uuid4().hex[:8]}"
+    client.create_collection(collection_name=scratch, vectors_config=info.config.params.vectors)
+    try:
+        latencies = []
+        started = time.perf_counter()
+        for offset in range(0, total, batch_size):
+            batch = [
+                models.PointStruct(id=str(uuid.uuid4()), vector=points[i % len(points)].vector,
+                                   payload=points[i % len(points)].payload)
+                for i in range(offset, min(offset + batch_size, total))
+            ]
+            batch_started = time.perf_counter()
+            client.upsert(collection_name=scratch, points=batch, wait=True)
+            latencies.append(time.perf_counter() - batch_started)
+        wall = time.perf_counter() - started
+    finally:
+        client.delete_collection(scratch)
+    result = {"requests": len(latencies), "points_per_s": round(total / wall, 1)}
+    result.update(latency_summary(latencies))
+    return result
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare Qdrant REST and gRPC for search and bulk upsert")
+    parser.add_argument("--url", default="http://localhost:6333", help="Qdrant REST URL; gRPC uses --grpc-port on the same host")
+    parser.add_argument("--grpc-port", type=int, default=6334)
+    parser.add_argument("--collection", default="chorus-vectors")
+    parser.add_argument("--queries", type=int, default=1000, help="Searches per transport")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent searches, like SEARCH_WORKERS")
+    parser.add_argument("--k", type=int, default=10, help="Top-k per search (/search asks for max(2k, 10))")
+    parser.add_argument("--upsert-points", type=int, default=5000, help="Points written per transport")
+    parser.add_argument("--upsert-batch", type=int, default=64, help="Points per upsert call")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --json file")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed relative regression vs --baseline")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    results = {}
+    for transport in ("rest", "grpc"):
+        client = create_qdrant_client(args.url, prefer_grpc=transport == "grpc", grpc_port=args.grpc_port)
+        try:
+            points = sample_points(client, args.collection, max(args.queries, 1))
+            vectors = [point.vector for point in points]
+            results[f"{transport}_search"] = bench_search(client, args.collection, vectors, args.queries, args.concurrency, args.k)
+            results[f"{transport}_upsert"] = bench_upsert(client, args.collection, points, args.upsert_points, args.upsert_batch)
+        finally:
+            client.close()
+
+    print_table(results, COLUMNS)
+    rest, grpc = results["rest_search"], results["grpc_search"]
+    print(f"\ngRPC vs REST: search {grpc['throughput_rps'] / rest['throughput_rps']:.2f}x throughput, "
+          f"upsert {results['grpc_upsert']['points_per_s'] / results['rest_upsert']['points_per_s']:.2f}x points/s")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
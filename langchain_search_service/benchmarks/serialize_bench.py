@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Serialization CPU per request, before and after the fragment cache.
+
+Hits are drawn from the repo's choruses and rebuilt as fresh Documents for
+every request, as the Qdrant fallback returns them. "legacy" is the old path:
+a pydantic SearchResult per hit, FastAPI's response_model validation and
+jsonable_encoder, then JSONResponse (or json.dumps per SSE event). "fragments"
+is the current path in main.py: cached per-chorus JSON spliced with the
+scores. Only the serialization itself is timed, in CPU time. The *_cold rows
+clear the fragment cache before every request, which is the worst case.
+
+    python benchmarks/serialize_bench.py
+    python benchmarks/serialize_bench.py --requests 5000 --json serialize.json
+    python benchmarks/serialize_bench.py --baseline serialize.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from harness import SERVICE_DIR, compare_to_baseline, print_table
+
+COLUMNS = ["requests", "hits", "legacy_cpu_ms", "cpu_ms", "speedup", "bytes"]
+
+
+def load_payloads(data_dir: str):
+    """Stored payloads for every chorus, as vectorize_data.py writes them"""
+    import vectorize_data
+    from chorus_payload import document_to_payload
+    documents = vectorize_data.create_documents(vectorize_data.load_chorus_data(data_dir))
+    return [document_to_payload(doc) for doc in documents]
+
+
+def response_field(app, path: str):
+    for route in app.routes:
+        if getattr(route, "path", None) == path:
+            return route.response_field
+    raise SystemExit(f"no route {path}")
+
+
+def legacy_stream_body(main, hits) -> bytes:
+    """The searchResult/searchResults events as the stream encoded them before"""
+    results = []
+    for i, (doc, score) in enumerate(hits):
+        results.append({
+            "id": doc.metadata.get("id", "") or f"unknown_{i}",
+            "name": doc.metadata.get("name", ""),
+            "chorusText": doc.metadata.get("chorusText", ""),
+            "key": doc.metadata.get("key", 0),
+            "type": doc.metadata.get("type", 0),
+            "timeSignature": doc.metadata.get("timeSignature", 0),
+            "createdAt": doc.metadata.get("createdAt", ""),
+            "updatedAt": doc.metadata.get("updatedAt", ""),
+            "metadata": doc.metadata.get("extra", {}),
+            "domainEvents": doc.metadata.get("domainEvents", []),
+            "score": float(score)
+        })
+    events = [f"data: {json.dumps({'type': 'searchResult', 'index': i, 'searchResult': r})}\n\n" for i, r in enumerate(results)]
+    events.append(f"data: {json.dumps({'type': 'searchResults', 'searchResults': results})}\n\n")
+    return "".join(events).encode("utf-8")
+
+
+def fragment_stream_body(main, hits) -> bytes:
+    from result_fragments import Raw, close_object, json_array, open_object
+    results = [close_object(main.chorus_fragment(doc, i), score=float(score)) for i, (doc, score) in enumerate(hits)]
+    events = [main.sse_data(close_object(open_object({"type": "searchResult", "index": i}), searchResult=Raw(r)))
+              for i, r in enumerate(results)]
+    events.append(main.sse_data(close_object(open_object({"type": "searchResults"}), searchResults=Raw(json_array(results)))))
+    return "".join(events).encode("utf-8")
+
+
+def build_encoders(main):
+    """(legacy, fragments) encoders per scenario kind; each maps a list of hit lists to bytes"""
+    search_field = response_field(main.app, "/search")
+    batch_field = response_field(main.app, "/search_batch")
+    intelligent_field = response_field(main.app, "/search_intelligent")
+
+    async def legacy_json(field, content) -> bytes:
+        return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+    def legacy_results(hits):
+        return [main.build_search_result(doc, score, i) for i, (doc, score) in enumerate(hits)]
+
+    def intelligent(hits):
+        return main.IntelligentSearchResult(search_results=legacy_results(hits), ai_analysis="Analysis", query_understanding="query")
+
+    from result_fragments import close_object, json_array
+    return {
+        "search": (
+            lambda groups: legacy_json(search_field, legacy_results(groups[0])),
+            lambda groups: main.search_results_json(groups[0]),
+        ),
+        "search_batch": (
+            lambda groups: legacy_json(batch_field, [legacy_results(hits) for hits in groups]),
+            lambda groups: json_array(main.search_results_json(hits) for hits in groups),
+        ),
+        "intelligent": (
+            lambda groups: legacy_json(intelligent_field, intelligent(groups[0])),
+            lambda groups: close_object(b'{"search_results":' + main.search_results_json(groups[0]),
+                                        ai_analysis="Analysis", query_understanding="query"),
+        ),
+        "stream": (
+            lambda groups: legacy_stream_body(main, groups[0]),
+            lambda groups: fragment_stream_body(main, groups[0]),
+        ),
+    }
+
+
+async def measure(encode, requests, clear=None):
+    """Mean CPU milliseconds per encode() call and the size of the last body"""
+    cpu_ns, body = 0, b""
+    for make_groups in requests:
+        groups = make_groups()
+        if clear:
+            clear()
+        started = time.process_time_ns()
+        body = encode(groups)
+        if asyncio.iscoroutine(body):
+            body = await body
+        cpu_ns += time.process_time_ns() - started
+    return round(cpu_ns / len(requests) / 1e6, 4), len(body)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serialization CPU per request, legacy path vs cached fragments")
+    parser.add_argument("--data-dir", default=str(SERVICE_DIR / "data"), help="Chorus JSON to draw hits from")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--k", type=int, default=10, help="Hits per result list")
+    parser.add_argument("--batch", type=int, default=16, help="Queries per /search_batch request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --json file")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed relative regression vs --baseline")
+    return parser.parse_args()
+
+
+async def run(args):
+    import main
+    from chorus_payload import payload_to_document
+    logging.getLogger().setLevel(logging.WARNING)
+
+    payloads = load_payloads(args.data_dir)
+    print(f"{len(payloads)} choruses, {args.requests} requests per scenario, k={args.k}")
+    rng = random.Random(args.seed)
+
+    def plan(lists: int):
+        """Requests as factories of fresh (Document, score) lists, built outside the timed region"""
+        def factory(picks):
+            return lambda: [[(payload_to_document(payloads[i]), score) for i, score in pick] for pick in picks]
+        return [
+            factory([[(rng.randrange(len(payloads)), rng.random()) for _ in range(args.k)] for _ in range(lists)])
+            for _ in range(args.requests)
+        ]
+
+    results = {}
+    for name, (legacy, fragments) in build_encoders(main).items():
+        requests = plan(args.batch if name == "search_batch" else 1)
+        hits = args.k * (args.batch if name == "search_batch" else 1)
+        legacy_ms, _ = await measure(legacy, requests)
+        for suffix, clear in (("", None), ("_cold", main.fragment_cache.invalidate)):
+            main.fragment_cache.invalidate()
+            cpu_ms, size = await measure(fragments, requests, clear)
+            results[name + suffix] = {
+                "requests": args.requests,
+                "hits": hits,
+                "legacy_cpu_ms": legacy_ms,
+                "cpu_ms": cpu_ms,
+                "speedup": round(legacy_ms / cpu_ms, 1) if cpu_ms else None,
+                "bytes": size,
+            }
+    return results
+
+
+def main() -> int:
+    args = parse_args()
+    results = asyncio.run(run(args))
+    print()
+    print_table(results, COLUMNS)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
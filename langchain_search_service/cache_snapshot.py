@@ -0,0 +1,158 @@
+"""
+Search cache persistence across restarts.
+
+QueryLog keeps a rolling, exponentially decayed count of how often each
+cache key is requested. On shutdown the hottest cache entries are written
+to a JSON snapshot together with the query log and the generation of the
+chorus collection they were computed from. On startup the entries are
+restored only if the collection still has that generation; otherwise they
+are discarded and the most frequent searches are recomputed instead.
+
+The generation is a fingerprint of the stored points (ID, content hash and
+payload hash), so any sync, /add_documents call or migration changes it.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+class QueryLog:
+    """Decayed request counts per cache key, bounded to the most frequent keys"""
+
+    def __init__(self, max_entries: int = 5000, half_life: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.half_life = half_life
+        # key -> (score, wall-clock time the score was last updated)
+        self._scores: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "QueryLog":
+        return cls(
+            max_entries=int(os.getenv("QUERY_LOG_MAX_ENTRIES", "5000")),
+            half_life=float(os.getenv("QUERY_LOG_HALF_LIFE_HOURS", "24")) * 3600,
+        )
+
+    def _decayed(self, score: float, updated_at: float, now: float) -> float:
+        return score * math.pow(0.5, max(0.0, now - updated_at) / self.half_life)
+
+    def record(self, key: str) -> None:
+        now = time.time()
+        with self._lock:
+            score, updated_at = self._scores.get(key, (0.0, now))
+            self._scores[key] = (self._decayed(score, updated_at, now) + 1.0, now)
+            # Trim in bulk so the sort is paid once per max_entries/10 new keys
+            if len(self._scores) > self.max_entries * 1.1:
+                self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        ranked = sorted(self._scores.items(), key=lambda item: self._decayed(*item[1], now), reverse=True)
+        self._scores = dict(ranked[:self.max_entries])
+
+    def score(self, key: str) -> float:
+        now = time.time()
+        with self._lock:
+            entry = self._scores.get(key)
+            return self._decayed(*entry, now) if entry else 0.0
+
+    def top(self, n: int, prefix: str = "") -> List[str]:
+        """The n most frequent keys starting with prefix"""
+        now = time.time()
+        with self._lock:
+            scored = [(self._decayed(*entry, now), key) for key, entry in self._scores.items() if key.startswith(prefix)]
+        return [key for _, key in sorted(scored, reverse=True)[:n]]
+
+    def to_dict(self) -> Dict[str, List[float]]:
+        with self._lock:
+            return {key: [score, updated_at] for key, (score, updated_at) in self._scores.items()}
+
+    def load(self, data: Dict[str, List[float]]) -> None:
+        """Merge counts saved by to_dict() into this log"""
+        now = time.time()
+        with self._lock:
+            for key, (score, updated_at) in data.items():
+                current = self._scores.get(key)
+                if current:
+                    score = self._decayed(score, updated_at, now) + self._decayed(*current, now)
+                    updated_at = now
+                self._scores[key] = (score, updated_at)
+            if len(self._scores) > self.max_entries:
+                self._trim(now)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+def collection_fingerprint(client, collection_name: str) -> str:
+    """Generation of a collection: point count plus a digest of every point's hashes"""
+    lines = []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=1024,
+            offset=offset,
+            with_payload=["content_hash", "payload_hash"],
+            with_vectors=False
+        )
+        for point in points:
+            payload = point.payload or {}
+            lines.append(f"{point.id}:{payload.get('content_hash', '')}:{payload.get('payload_hash', '')}")
+        if offset is None:
+            break
+    digest = hashlib.sha256("\n".join(sorted(lines)).encode("utf-8")).hexdigest()
+    return f"{len(lines)}:{digest[:32]}"
+
+
+def save_snapshot(path: str, generation: Optional[str], entries: List[Dict[str, Any]], query_log: Dict[str, Any]) -> None:
+    """Write the snapshot atomically; bytes values are stored as UTF-8 text"""
+    serializable = []
+    for entry in entries:
+        value = entry["value"]
+        if isinstance(value, bytes):
+            entry = dict(entry, value=value.decode("utf-8"), bytes=True)
+        elif not isinstance(value, str):
+            continue
+        serializable.append(entry)
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "generation": generation,
+        "entries": serializable,
+        "query_log": query_log,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved {len(serializable)} cache entries and {len(query_log)} logged queries to {path}")
+
+
+def load_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """The snapshot at path with bytes values restored, or None if missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable cache snapshot {path}: {e}")
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.info(f"Ignoring cache snapshot {path} with version {snapshot.get('version')}")
+        return None
+    for entry in snapshot.get("entries", []):
+        if entry.pop("bytes", False):
+            entry["value"] = entry["value"].encode("utf-8")
+    return snapshot
@@ -0,0 +1,131 @@
+"""
+Versioned Qdrant payload schema for chorus points.
+
+Schema 1 (LangChain's layout) nested every field under "metadata", stored
+most of them twice (Id/id, Name/title, Key/key, Type/chorusType), kept the
+lyrics both as ChorusText and inside page_content, and wrote empty
+Metadata/DomainEvents blobs. Schema 2 is flat: each field once, under the
+name SearchResult uses, with empty values left out. page_content is not
+stored; it is rebuilt from the fields when a consumer needs prose.
+
+payload_to_document() reads either schema into the same Document, so the
+service keeps working while vectorize_data.py --migrate-payloads (or a
+normal incremental sync) rewrites old points in place.
+"""
+
+import hashlib
+import json
+import uuid
+from typing import Any, Dict, Optional
+
+from langchain.schema import Document
+
+SCHEMA_VERSION = 2
+
+# Fields a search hit needs; legacy keys are listed so unmigrated points still resolve
+SEARCH_FIELDS = [
+    "schema", "id", "name", "chorusText", "key", "type", "timeSignature",
+    "createdAt", "updatedAt", "composer", "extra", "domainEvents",
+    "page_content", "metadata",
+]
+
+_DEFAULTS = {"name": "", "chorusText": "", "key": 0, "type": 0, "timeSignature": 0}
+
+
+def point_id_for(chorus_id) -> str:
+    """Stable Qdrant point ID derived from the chorus GUID"""
+    try:
+        return str(uuid.UUID(str(chorus_id)))
+    except ValueError:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"chap2:chorus:{chorus_id}"))
+
+
+def compact(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop empty strings, containers and None; zero-valued enums are kept"""
+    return {k: v for k, v in fields.items() if v is not None and v != "" and v != {} and v != []}
+
+
+def fields_hash(fields: Dict[str, Any]) -> str:
+    """Hash of the stored fields; a changed hash means the payload needs rewriting"""
+    encoded = json.dumps(compact(fields), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def chorus_fields(chorus_id: str, data: Dict[str, Any], source: str = "json_file") -> Dict[str, Any]:
+    """Schema-2 fields for a chorus record as stored in data/*.json"""
+    return compact({
+        "id": chorus_id,
+        "name": data.get("name", data.get("title", "")),
+        "chorusText": data.get("chorusText", ""),
+        "key": data.get("key", 0),
+        "type": data.get("type", 0),
+        "timeSignature": data.get("timeSignature", 0),
+        "createdAt": data.get("createdAt", ""),
+        "updatedAt": data.get("updatedAt", ""),
+        "composer": data.get("composer", data.get("author", "")),
+        "extra": data.get("metadata") or {},
+        "domainEvents": data.get("domainEvents") or [],
+        "source": source,
+    })
+
+
+def fields_from_legacy(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema-2 fields from a schema-1 (LangChain) metadata dict"""
+    return compact({
+        "id": metadata.get("Id") or metadata.get("id"),
+        "name": metadata.get("Name") or metadata.get("title") or metadata.get("name", ""),
+        "chorusText": metadata.get("ChorusText", ""),
+        "key": metadata.get("Key", metadata.get("key", 0)),
+        "type": metadata.get("Type", metadata.get("chorusType", metadata.get("type", 0))),
+        "timeSignature": metadata.get("TimeSignature", metadata.get("timeSignature", 0)),
+        "createdAt": metadata.get("CreatedAt", ""),
+        "updatedAt": metadata.get("UpdatedAt", ""),
+        "composer": metadata.get("composer", ""),
+        "extra": metadata.get("Metadata") or {},
+        "domainEvents": metadata.get("DomainEvents") or [],
+        "source": metadata.get("source"),
+    })
+
+
+def document_text(fields: Dict[str, Any]) -> str:
+    """Readable text for a chorus, in the shape vectorize_data.py embeds"""
+    parts = [f"Title: {fields.get('name', '')}", f"Chorus: {fields.get('chorusText', '')}"]
+    if fields.get("composer"):
+        parts.append(f"Composer: {fields['composer']}")
+    parts.append(f"Key: {fields.get('key', 0)}")
+    parts.append(f"Time Signature: {fields.get('timeSignature', 0)}")
+    parts.append(f"Type: {fields.get('type', 0)}")
+    return " ".join(parts)
+
+
+def is_current(payload: Dict[str, Any]) -> bool:
+    return payload.get("schema") == SCHEMA_VERSION
+
+
+def payload_to_document(payload: Dict[str, Any], point_id: Any = None) -> Document:
+    """Document with schema-2 metadata from a payload in either schema"""
+    payload = payload or {}
+    if is_current(payload):
+        fields = {k: v for k, v in payload.items() if k not in ("schema", "content_hash", "payload_hash")}
+        page_content = document_text({**_DEFAULTS, **fields})
+    else:
+        fields = fields_from_legacy(payload.get("metadata") or {})
+        page_content = payload.get("page_content") or document_text({**_DEFAULTS, **fields})
+    if not fields.get("id") and point_id is not None:
+        fields["id"] = str(point_id)
+    return Document(page_content=page_content, metadata={**_DEFAULTS, **fields})
+
+
+def document_to_payload(doc: Document, content_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Schema-2 payload for a Document whose metadata holds schema-2 fields"""
+    payload = compact(dict(doc.metadata))
+    payload["schema"] = SCHEMA_VERSION
+    payload["payload_hash"] = fields_hash(doc.metadata)
+    if content_hash:
+        payload["content_hash"] = content_hash
+    return payload
+
+
+def migrate_payload(payload: Dict[str, Any], point_id: Any = None) -> Dict[str, Any]:
+    """Schema-2 payload for a stored point; its vector and content hash stay valid"""
+    return document_to_payload(payload_to_document(payload, point_id), payload.get("content_hash"))
@@ -0,0 +1,135 @@
+"""
+Micro-batching of concurrent query embeddings.
+
+Searches embed their query from search-pool threads, one Ollama call each.
+EmbeddingBatcher queues those calls and a dispatcher thread sends them to
+Ollama as one embed_documents batch, then hands each caller its vector.
+
+When nothing is in flight a query is dispatched immediately, so a lone
+request pays no batching delay. Once a batch is already running,
+the dispatcher waits up to the batch window for more queries to join the
+next one (or until it is full), so throughput grows with load instead of
+queueing single-text calls.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+_STOP = object()
+
+
+class EmbeddingBatcher(Embeddings):
+    """Embeddings wrapper that coalesces concurrent embed_query calls into batches"""
+
+    def __init__(self, base: Embeddings, max_batch: int = 32, window: float = 0.002,
+                 concurrency: int = 2, batch_size: Optional[Histogram] = None,
+                 queue_wait: Optional[Histogram] = None):
+        self.base = base
+        self.max_batch = max(1, max_batch)
+        self.window = max(0.0, window)
+        self.batch_size = batch_size
+        self.queue_wait = queue_wait
+        self.batches = 0
+        self.queries = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._slots = threading.Semaphore(max(1, concurrency))
+        self._running = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="embed-batch")
+        self._dispatcher = threading.Thread(target=self._dispatch, name="embed-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def embed_query(self, text: str) -> List[float]:
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future.result()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def _dispatch(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            # Blocks while `concurrency` batches are running; queries pile up meanwhile
+            self._slots.acquire()
+            with self._lock:
+                busy = self._running > 0
+                self._running += 1
+            deadline = time.perf_counter() + (self.window if busy else 0.0)
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._pool.submit(self._run, batch)
+            if stop:
+                return
+
+    def _run(self, batch: List[Tuple[str, Future, float]]) -> None:
+        started = time.perf_counter()
+        try:
+            if self.queue_wait is not None:
+                for _, _, queued in batch:
+                    self.queue_wait.observe(started - queued)
+            texts = list(dict.fromkeys(text for text, _, _ in batch))
+            if self.batch_size is not None:
+                self.batch_size.observe(len(texts))
+            try:
+                vectors = dict(zip(texts, self.base.embed_documents(texts)))
+            except Exception as e:
+                logger.warning(f"Batched embedding of {len(texts)} queries failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                return
+            for text, future, _ in batch:
+                future.set_result(vectors[text])
+            with self._lock:
+                self.batches += 1
+                self.queries += len(batch)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._slots.release()
+
+    def backlog(self) -> int:
+        """Queries waiting to be embedded plus batches being embedded"""
+        with self._lock:
+            return self._queue.qsize() + self._running
+
+    def close(self) -> None:
+        """Stop the dispatcher; queries already queued are still embedded"""
+        self._queue.put(_STOP)
+        self._dispatcher.join(timeout=5)
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            batches, queries = self.batches, self.queries
+        return {
+            "batches": batches,
+            "queries": queries,
+            "mean_batch_size": round(queries / batches, 2) if batches else 0.0,
+            "max_batch": self.max_batch,
+            "window_ms": round(self.window * 1000, 3),
+        }
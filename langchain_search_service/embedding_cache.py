@@ -0,0 +1,168 @@
+"""
+Persistent query-embedding cache.
+
+Query vectors are memoized in a small SQLite database keyed on a canonical
+form of the query text (case-folded, whitespace-collapsed, diacritics
+stripped), so "Wêreld " and "wereld" share one Ollama round-trip. The model
+itself is always sent the query as typed, since diacritics carry meaning in
+Afrikaans ("sê" is not "se") and choruses are embedded with theirs. The store
+records the embedding model and vector dimension and wipes itself when
+either changes.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a query: NFKD-folded, lowercased, single-spaced"""
+    norm = unicodedata.normalize("NFKD", text)
+    ascii_only = "".join(c for c in norm if not unicodedata.combining(c))
+    return _WHITESPACE.sub(" ", ascii_only.casefold()).strip()
+
+
+class EmbeddingStore:
+    """SQLite-backed map from canonical query text to its embedding vector"""
+
+    def __init__(self, path: str, model: str):
+        self.path = Path(path)
+        self.model = model
+        self.dimension: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (query TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+        self._check_model()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _check_model(self) -> None:
+        with self._lock:
+            stored_model = self._meta("model")
+            if stored_model != self.model:
+                if stored_model is not None:
+                    logger.info(f"Embedding model changed from {stored_model} to {self.model}, invalidating query embedding cache")
+                self._reset()
+            dimension = self._meta("dimension")
+            self.dimension = int(dimension) if dimension else None
+            count = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+            logger.info(f"Query embedding cache at {self.path}: {count} vectors, model={self.model}, dimension={self.dimension}")
+
+    def _reset(self) -> None:
+        self._conn.execute("DELETE FROM vectors")
+        self._conn.execute("DELETE FROM meta")
+        self._set_meta("model", self.model)
+        self._conn.commit()
+        self.dimension = None
+
+    def get(self, query: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM vectors WHERE query = ?", (query,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return array("f", row[0]).tolist()
+
+    def put(self, query: str, vector: List[float]) -> None:
+        with self._lock:
+            if self.dimension is not None and len(vector) != self.dimension:
+                logger.warning(f"Embedding dimension changed from {self.dimension} to {len(vector)}, invalidating query embedding cache")
+                self._reset()
+            if self.dimension is None:
+                self.dimension = len(vector)
+                self._set_meta("dimension", str(self.dimension))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO vectors (query, vector) VALUES (?, ?)",
+                (query, array("f", vector).tobytes())
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "path": str(self.path),
+            "model": self.model,
+            "dimension": self.dimension,
+            "entries": count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Embeddings wrapper that memoizes embed_query through an EmbeddingStore.
+
+    Vectors are cached under the canonical query text but computed from the
+    original text of the first query to miss, so the cache changes latency
+    and not what the model sees. Document embeddings pass straight through.
+    """
+
+    def __init__(self, base: Embeddings, store: EmbeddingStore):
+        self.base = base
+        self.store = store
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vector = self.store.get(key)
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self.store.put(key, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, sending all cache misses in one batched call"""
+        keys = [normalize_query(text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+        for key in keys:
+            if key not in vectors:
+                vector = self.store.get(key)
+                if vector is not None:
+                    vectors[key] = vector
+        # First original text per missing key
+        misses: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                misses.setdefault(key, text)
+        if misses:
+            for key, vector in zip(misses, self.base.embed_documents(list(misses.values()))):
+                self.store.put(key, vector)
+                vectors[key] = vector
+        return [vectors[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
@@ -0,0 +1,202 @@
+"""
+Background bulk ingestion jobs.
+
+POST /ingest streams an NDJSON upload (one chorus object per line) into a
+spool file and returns a job ID as soon as the upload is complete, so a
+large import never holds an HTTP call open for the whole embedding run.
+Jobs are then processed one at a time in bounded batches; their progress and
+per-line errors can be polled or followed as server-sent events.
+
+Admission is bounded (too many queued jobs is a 429), and the spool keeps
+memory use flat however large the upload is.
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+FINISHED = (COMPLETED, FAILED)
+
+# Per-line errors kept on a job; the rest are only counted
+MAX_ERRORS = 50
+
+
+class IngestJob:
+    """Progress of one NDJSON upload, updated on the event loop"""
+
+    def __init__(self, spool_max_memory: int):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Lines received, counting blank ones so numbers match the upload
+        self.lines = 0
+        self.upserted = 0
+        self.failed = 0
+        self.batches = 0
+        self.failed_batches = 0
+        # Every line up to here has been upserted or recorded as failed
+        self.lines_done = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.spool = tempfile.SpooledTemporaryFile(max_size=spool_max_memory)
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    def record_error(self, line: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def notify(self) -> None:
+        """Wake followers waiting in changes()"""
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self.spool.close()
+        self.notify()
+
+    def snapshot(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "lines": self.lines,
+            "lines_done": self.lines_done,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "errors": list(self.errors),
+            "error": self.error,
+            "created_at": self.created_at,
+            "elapsed_s": round(end - (self.started_at or end), 3),
+        }
+
+    async def changes(self, heartbeat: float = 15.0) -> AsyncIterator[Dict[str, Any]]:
+        """Snapshots as the job progresses, ending with the finished one"""
+        while True:
+            changed = self._changed
+            yield self.snapshot()
+            if self.status in FINISHED:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                pass
+
+    def batches_of(self, size: int) -> Iterator[List[Tuple[int, bytes]]]:
+        """(line number, line) batches read back from the spool"""
+        self.spool.seek(0)
+        batch = []
+        for number, line in enumerate(self.spool, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            batch.append((number, line))
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+async def spool_ndjson(chunks: AsyncIterator[bytes], job: IngestJob) -> None:
+    """Copy an NDJSON body into the job's spool, counting its lines"""
+    tail = b""
+    async for chunk in chunks:
+        job.spool.write(chunk)
+        job.lines += chunk.count(b"\n")
+        tail = chunk.rsplit(b"\n", 1)[-1] if b"\n" in chunk else tail + chunk
+    if tail.strip():
+        job.spool.write(b"\n")
+        job.lines += 1
+
+
+def parse_line(line: bytes) -> Dict[str, Any]:
+    """One NDJSON chorus object; raises ValueError for anything else"""
+    doc = orjson.loads(line)
+    if not isinstance(doc, dict):
+        raise ValueError(f"expected a JSON object, got {type(doc).__name__}")
+    if not doc.get("text") and not doc.get("name"):
+        raise ValueError("chorus needs a name or text")
+    return doc
+
+
+class IngestJobStore:
+    """Queued, running and recently finished jobs, run one at a time in FIFO order"""
+
+    def __init__(self, max_pending: int = 8, keep_finished: int = 50,
+                 batch_size: int = 64, spool_max_memory: int = 8 * 1024 * 1024):
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self.batch_size = batch_size
+        self.spool_max_memory = spool_max_memory
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._queue: "asyncio.Queue[IngestJob]" = asyncio.Queue()
+
+    @classmethod
+    def from_env(cls) -> "IngestJobStore":
+        return cls(
+            max_pending=int(os.getenv("INGEST_MAX_PENDING_JOBS", "8")),
+            keep_finished=int(os.getenv("INGEST_JOBS_KEEP", "50")),
+            batch_size=int(os.getenv("INGEST_BATCH_SIZE", "64")),
+            spool_max_memory=int(os.getenv("INGEST_SPOOL_MEMORY", str(8 * 1024 * 1024))),
+        )
+
+    def pending(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status not in FINISHED)
+
+    def create(self) -> Optional[IngestJob]:
+        """A new job, or None when max_pending jobs are already queued or running"""
+        if self.pending() >= self.max_pending:
+            return None
+        job = IngestJob(self.spool_max_memory)
+        self._jobs[job.id] = job
+        self._prune()
+        return job
+
+    def discard(self, job: IngestJob) -> None:
+        """Forget a job whose upload never completed"""
+        job.spool.close()
+        self._jobs.pop(job.id, None)
+
+    def submit(self, job: IngestJob) -> None:
+        self._queue.put_nowait(job)
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    async def next(self) -> IngestJob:
+        return await self._queue.get()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"jobs": counts, "max_pending": self.max_pending, "batch_size": self.batch_size}
@@ -0,0 +1,175 @@
+"""
+In-process BM25 index over chorus titles and lyrics.
+
+Built from the chorus-vectors payloads at startup and kept up to date as
+documents are added. Used alongside vector search: results are fused by
+reciprocal-rank fusion, and a strong lexical hit (an exact title or a
+remembered lyric line) is answered without an embedding call at all.
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from chorus_payload import SEARCH_FIELDS, payload_to_document
+from embedding_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Diacritic-folded, lowercased word tokens"""
+    return _TOKEN.findall(normalize_query(text or ""))
+
+
+def document_key(metadata: Dict) -> str:
+    """Chorus ID used to match lexical and vector hits"""
+    return str(metadata.get("Id") or metadata.get("id") or "")
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists; scores are scaled so rank 1 in every list is 1.0"""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    best_possible = len(rankings) / (k + 1) if rankings else 1.0
+    return sorted(
+        ((doc_id, score / best_possible) for doc_id, score in fused.items()),
+        key=lambda item: item[1],
+        reverse=True
+    )
+
+
+class LexicalIndex:
+    """Field-weighted BM25 over chorus Name and ChorusText"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, title_weight: int = 2,
+                 phrase_min_words: int = 4):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.phrase_min_words = phrase_min_words
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._terms: Dict[str, Counter] = {}
+        self._titles: Dict[str, str] = {}
+        self._texts: Dict[str, str] = {}
+        self._documents: Dict[str, Document] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def upsert(self, doc: Document) -> Optional[str]:
+        """Index (or re-index) one chorus document; returns its ID"""
+        doc_id = document_key(doc.metadata)
+        if not doc_id:
+            return None
+        name = doc.metadata.get("Name") or doc.metadata.get("name") or doc.metadata.get("title") or ""
+        text = doc.metadata.get("chorusText") or doc.metadata.get("ChorusText") or doc.page_content or ""
+        title_tokens = tokenize(name)
+        text_tokens = tokenize(text)
+        terms = Counter(text_tokens)
+        for token in title_tokens:
+            terms[token] += self.title_weight
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            length = len(text_tokens) + self.title_weight * len(title_tokens)
+            self._terms[doc_id] = terms
+            self._lengths[doc_id] = length
+            self._total_length += length
+            self._titles[doc_id] = " ".join(title_tokens)
+            self._texts[doc_id] = " " + " ".join(text_tokens) + " "
+            self._documents[doc_id] = doc
+        return doc_id
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        terms = self._terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id, 0)
+        self._titles.pop(doc_id, None)
+        self._texts.pop(doc_id, None)
+        self._documents.pop(doc_id, None)
+
+    def document(self, doc_id: str) -> Optional[Document]:
+        return self._documents.get(doc_id)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (doc ID, BM25 score) pairs for a query"""
+        query_terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._documents)
+            if not n or not query_terms:
+                return []
+            avg_length = self._total_length / n or 1.0
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def strong_match(self, query: str, hits: List[Tuple[str, float]]) -> Optional[str]:
+        """ID of a chorus the query unambiguously names, if any.
+
+        That is an exact (folded) title match, or a lyric line of at least
+        phrase_min_words words that appears verbatim in a chorus.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        phrase = " ".join(tokens)
+        for doc_id, _ in hits:
+            if self._titles.get(doc_id) == phrase:
+                return doc_id
+        if len(tokens) >= self.phrase_min_words:
+            for doc_id, _ in hits:
+                if f" {phrase} " in self._texts.get(doc_id, ""):
+                    return doc_id
+        return None
+
+    def load_from_qdrant(self, client, collection_name: str) -> int:
+        """Index every chorus payload stored in a Qdrant collection"""
+        offset = None
+        count = 0
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=SEARCH_FIELDS,
+                with_vectors=False
+            )
+            for point in points:
+                if self.upsert(payload_to_document(point.payload, point.id)):
+                    count += 1
+            if offset is None:
+                break
+        logger.info(f"Lexical index built from '{collection_name}': {count} choruses, {len(self._postings)} terms")
+        return count
@@ -1,21 +1,40 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import asyncio
-import json
+import functools
 import logging
 import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from sse_starlette.sse import EventSourceResponse
 
 from langchain_community.vectorstores import Qdrant
 from langchain_ollama import OllamaEmbeddings
 from langchain_ollama import OllamaLLM as Ollama
-from qdrant_client import QdrantClient
+from qdrant_client import models as qdrant_models
 from langchain.schema import Document
-from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
+
+from cache_snapshot import QueryLog, collection_fingerprint, load_snapshot, save_snapshot
+from chorus_payload import SEARCH_FIELDS, chorus_fields, document_to_payload, payload_to_document, point_id_for
+from embedding_batcher import BATCH_SIZE_BUCKETS, EmbeddingBatcher
+from embedding_cache import CachedQueryEmbeddings, EmbeddingStore, normalize_query
+from ingest_jobs import COMPLETED as JOB_COMPLETED, FAILED as JOB_FAILED, FINISHED as JOB_FINISHED, RUNNING as JOB_RUNNING
+from ingest_jobs import IngestJobStore, parse_line, spool_ndjson
+from lexical_index import LexicalIndex, document_key, reciprocal_rank_fusion
+from metrics import MetricsRegistry, RequestMetricsMiddleware
+from qdrant_connection import get_qdrant_client
+from query_terms import expand_locally
+from readiness import DISABLED, FAILED, READY, RETRYING, STARTING, Readiness
+from result_cache import ResultCache
+from result_fragments import FragmentCache, Raw, close_object, dumps, json_array, open_object
+from single_flight import SingleFlight
+from vector_index import LocalVectorIndex
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,17 +44,190 @@ logger = logging.getLogger(__name__)
 vector_store = None
 llm = None
 embeddings = None
-qa_chain = None
+embedding_store = None
+embedding_batcher = None
 qdrant_client = None
 
-# Simple in-memory cache (for demo; use Redis for production)
-search_cache = {}
-cache_timestamp = 0  # Add timestamp for cache invalidation
+# Directory for on-disk caches (query embeddings, ...)
+cache_dir = os.getenv("CACHE_DIR", "./cache")
+
+# Bounded LRU/TTL result cache, sized via SEARCH_CACHE_* environment variables
+search_cache = ResultCache.from_env()
+# Coalesces identical in-flight cache misses into one computation
+inflight = SingleFlight()
+# Per-chorus JSON fragments that search responses are spliced together from
+fragment_cache = FragmentCache.from_env()
+# Decayed request counts per cache key, used to pick what to snapshot and prewarm
+query_log = QueryLog.from_env()
+
+# Hottest cache entries are saved on shutdown and restored on startup
+cache_snapshot_enabled = os.getenv("CACHE_SNAPSHOT", "true").lower() == "true"
+cache_snapshot_path = os.getenv("CACHE_SNAPSHOT_PATH") or os.path.join(cache_dir, "search_cache_snapshot.json")
+cache_snapshot_max_entries = int(os.getenv("CACHE_SNAPSHOT_MAX_ENTRIES", "500"))
+# Most frequent /search queries recomputed on startup when not restored from the snapshot
+prewarm_queries = int(os.getenv("PREWARM_QUERIES", "100"))
+prewarm_concurrency = int(os.getenv("PREWARM_CONCURRENCY", "2"))
+prewarm_timeout = float(os.getenv("PREWARM_TIMEOUT", "60"))
+
+# BM25 index over chorus titles and lyrics, fused with vector results in /search
+lexical_index = LexicalIndex()
+hybrid_search_enabled = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+
+# Verse-level collection populated by vectorize_bible.py
+bible_collection = os.getenv("BIBLE_COLLECTION", "bible-verses")
+
+# Upper bound on queries accepted by /search_batch
+search_batch_max = int(os.getenv("SEARCH_BATCH_MAX", "64"))
+
+# Startup state of each dependency, reported by /ready
+readiness = Readiness(["qdrant", "embeddings", "llm", "lexical_index", "local_vector_index", "prewarm"])
+# Dependencies that must be up before /ready reports ready; prewarming is reported but not waited for
+ready_requires = ("qdrant", "embeddings")
+
+# Strong references to fire-and-forget tasks so they are not garbage collected
+background_tasks = set()
+
+# Exact in-process vector index; falls back to Qdrant above LOCAL_VECTOR_INDEX_MAX_POINTS
+local_vector_index = None
+if os.getenv("LOCAL_VECTOR_INDEX", "true").lower() == "true":
+    local_vector_index = LocalVectorIndex(
+        max_points=int(os.getenv("LOCAL_VECTOR_INDEX_MAX_POINTS", "20000")),
+        snapshot_path=os.getenv("LOCAL_VECTOR_INDEX_PATH") or None
+    )
+
+# Re-run popular /search queries evicted by a chorus change, in the background
+cache_refresh_enabled = os.getenv("CACHE_REFRESH_POPULAR", "true").lower() == "true"
+cache_refresh_min_hits = int(os.getenv("CACHE_REFRESH_MIN_HITS", "2"))
+cache_refresh_max = int(os.getenv("CACHE_REFRESH_MAX", "20"))
+
+# Separate bounded thread pools for the blocking Qdrant/embedding and LLM clients,
+# so a slow Mistral generation never queues a cheap vector search behind it
+search_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SEARCH_WORKERS", "8")),
+    thread_name_prefix="search"
+)
+llm_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_WORKERS", "2")),
+    thread_name_prefix="llm"
+)
+# Bulk ingestion embeds and upserts on its own pool, so imports never take search threads
+ingest_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("INGEST_WORKERS", "1")),
+    thread_name_prefix="ingest"
+)
+
+# NDJSON bulk ingestion jobs (POST /ingest), processed one at a time in batches
+ingest_jobs = IngestJobStore.from_env()
+# Longest a batch is held back while query embeddings are waiting
+ingest_yield_max = float(os.getenv("INGEST_YIELD_MAX_MS", "1000")) / 1000
+
+# Prometheus metrics served by /metrics
+metrics = MetricsRegistry()
+requests_total = metrics.counter("chap2_requests_total", "HTTP requests by endpoint and status code", ["endpoint", "status"])
+requests_in_flight = metrics.gauge("chap2_requests_in_flight", "HTTP requests currently being served", ["endpoint"])
+request_latency = metrics.histogram("chap2_request_duration_seconds", "HTTP request latency, including the whole body of streamed responses", ["endpoint"])
+# Stages: embed, vector_search, lexical, dedup, llm_terms, llm_analysis, llm_analysis_first_token, serialize
+stage_latency = metrics.histogram("chap2_stage_duration_seconds", "Latency of individual search pipeline stages", ["stage"])
+pool_in_flight = metrics.gauge("chap2_pool_tasks_in_flight", "Blocking calls queued or running on each thread pool", ["pool"])
+embed_batch_size = metrics.histogram("chap2_embedding_batch_size", "Distinct queries per batched Ollama embedding call", buckets=BATCH_SIZE_BUCKETS)
+embed_queue_wait = metrics.histogram("chap2_embedding_queue_wait_seconds", "Time a query embedding waited to be sent in a batch")
+ingested_total = metrics.counter("chap2_ingest_documents_total", "Choruses processed by bulk ingestion jobs", ["result"])
+
+@metrics.collector
+def collect_cache_metrics():
+    """Cache and single-flight counters, read from their owners at scrape time"""
+    results = search_cache.stats()
+    namespaces = results["namespaces"]
+    lookups = []
+    for name, ns in namespaces.items():
+        lookups.append(({"cache": name, "result": "hit"}, ns.get("hits", 0)))
+        lookups.append(({"cache": name, "result": "miss"}, ns.get("misses", 0)))
+    fragments = fragment_cache.stats()
+    lookups.append(({"cache": "fragment", "result": "hit"}, fragments["hits"]))
+    lookups.append(({"cache": "fragment", "result": "miss"}, fragments["misses"]))
+    if embedding_store is not None:
+        embedding_stats = embedding_store.stats()
+        lookups.append(({"cache": "embedding", "result": "hit"}, embedding_stats["hits"]))
+        lookups.append(({"cache": "embedding", "result": "miss"}, embedding_stats["misses"]))
+    flights = inflight.stats()
+    return [
+        ("chap2_cache_lookups_total", "counter", "Cache lookups by cache and result", lookups),
+        ("chap2_cache_entries", "gauge", "Entries held in the result cache", [({"cache": name}, ns["entries"]) for name, ns in namespaces.items()]),
+        ("chap2_cache_bytes", "gauge", "Approximate bytes held in the result cache", [({}, results["bytes"])]),
+        ("chap2_cache_evictions_total", "counter", "Result cache evictions", [({"reason": "capacity"}, results["evictions"]), ({"reason": "expired"}, results["expirations"]), ({"reason": "invalidated"}, results["invalidations"])]),
+        ("chap2_single_flight_in_flight", "gauge", "Distinct computations currently in flight", [({}, flights["in_flight"])]),
+        ("chap2_single_flight_requests_total", "counter", "Cache misses that led or joined a computation", [({"role": "leader"}, flights["leaders"]), ({"role": "coalesced"}, flights["coalesced"])]),
+    ]
+
+async def run_search(func, *args, **kwargs):
+    """Run a blocking embedding/Qdrant call on the search pool"""
+    loop = asyncio.get_running_loop()
+    pool_in_flight.inc("search")
+    try:
+        return await loop.run_in_executor(search_executor, functools.partial(func, *args, **kwargs))
+    finally:
+        pool_in_flight.dec("search")
+
+def points_to_hits(points):
+    """(Document, score) pairs from scored Qdrant points"""
+    return [(payload_to_document(point.payload, point.id), point.score) for point in points]
+
+def vector_search(query: str, k: int):
+    """(Document, score) pairs from the local index when loaded, otherwise Qdrant"""
+    with stage_latency.time("embed"):
+        vector = embeddings.embed_query(query)
+    with stage_latency.time("vector_search"):
+        if local_vector_index is not None and local_vector_index.ready:
+            return local_vector_index.search(vector, k)
+        # Straight to the shared client (REST or gRPC), skipping the LangChain wrapper
+        return points_to_hits(qdrant_client.search(
+            collection_name="chorus-vectors",
+            query_vector=vector,
+            limit=k,
+            with_payload=SEARCH_FIELDS
+        ))
+
+def vector_search_many(queries: List[str], limits: List[int]):
+    """Vector hits for several queries using one embedding call and one batched search"""
+    with stage_latency.time("embed"):
+        vectors = embeddings.embed_queries(queries)
+    with stage_latency.time("vector_search"):
+        if local_vector_index is not None and local_vector_index.ready:
+            return [local_vector_index.search(vector, limit) for vector, limit in zip(vectors, limits)]
+        responses = qdrant_client.search_batch(
+            collection_name="chorus-vectors",
+            requests=[
+                qdrant_models.SearchRequest(vector=vector, limit=limit, with_payload=SEARCH_FIELDS)
+                for vector, limit in zip(vectors, limits)
+            ]
+        )
+    return [points_to_hits(response) for response in responses]
+
+async def run_ingest(func, *args, **kwargs):
+    """Run a blocking embedding/Qdrant call for bulk ingestion on the ingest pool"""
+    loop = asyncio.get_running_loop()
+    pool_in_flight.inc("ingest")
+    try:
+        return await loop.run_in_executor(ingest_executor, functools.partial(func, *args, **kwargs))
+    finally:
+        pool_in_flight.dec("ingest")
+
+async def run_llm(func, *args, **kwargs):
+    """Run a blocking LLM call on the LLM pool"""
+    loop = asyncio.get_running_loop()
+    pool_in_flight.inc("llm")
+    try:
+        return await loop.run_in_executor(llm_executor, functools.partial(func, *args, **kwargs))
+    finally:
+        pool_in_flight.dec("llm")
 
 class SearchRequest(BaseModel):
     query: str
     k: int = 5
 
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchRequest]
+
 class IntelligentSearchRequest(BaseModel):
     query: str
     k: int = 5
@@ -52,86 +244,71 @@ class SearchResult(BaseModel):
     updatedAt: Optional[str] = None  # Update date
     metadata: Optional[Dict[str, Any]] = None  # Additional metadata
     domainEvents: Optional[List[Any]] = None  # Domain events
-    score: float  # Search relevance score
+    score: float  # Relevance within this response; cosine similarity only without hybrid search
     explanation: Optional[str] = None  # AI explanation
 
+class BibleSearchRequest(BaseModel):
+    query: str
+    k: int = 10
+    book: Optional[str] = None  # Restrict to one book ID, e.g. "psalms"
+
+class BibleSearchResult(BaseModel):
+    reference: str  # e.g. "Psalms 23:1" or "Psalms 23:1-3"
+    bookId: str
+    bookName: str
+    chapter: int
+    verseStart: int
+    verseEnd: int
+    text: str
+    translation: Optional[str] = None
+    score: float
+
+class CacheInvalidationRequest(BaseModel):
+    chorus_ids: List[str] = []
+    change: str = "updated"  # created, updated or deleted
+    collections: List[str] = []  # Other collections whose points changed, e.g. the Bible verses
+
 class IntelligentSearchResult(BaseModel):
     search_results: List[SearchResult]
     ai_analysis: Optional[str] = None
     query_understanding: Optional[str] = None
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    global vector_store, llm, embeddings, qa_chain, qdrant_client
-    logger.info("Initializing LangChain services...")
+def require_ready(*names: str) -> None:
+    """503 until the named dependencies have come up"""
+    missing = readiness.not_ready(*names)
+    if missing:
+        raise HTTPException(status_code=503, detail=f"Service is starting; not ready yet: {', '.join(missing)}")
 
-    # Get Ollama URL from environment variable
-    ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
-    
-    # Initialize Ollama embeddings
-    embeddings = OllamaEmbeddings(
-        model="nomic-embed-text",  # Use original model which generates 768-dimensional embeddings
-        base_url=ollama_url
-    )
-    # Initialize Ollama LLM with GPU acceleration and optimized settings
-    logger.info(f"Initializing Ollama LLM with URL: {ollama_url}")
-    try:
-        llm = Ollama(
-            model="mistral",
-            base_url=ollama_url,
-            timeout=600,  # 10 minutes timeout
-            temperature=0.7,
-            num_gpu=1,  # Use GPU acceleration
-            num_thread=4,  # Limit CPU threads to reduce CPU usage
-            num_ctx=2048,  # Limit context window for faster processing
-            repeat_penalty=1.1,  # Reduce repetition for faster generation
-            top_k=40,  # Limit top-k for faster generation
-            top_p=0.9  # Use nucleus sampling for faster generation
-        )
-        # Test the connection
-        logger.info("Testing Ollama connection...")
-        test_response = llm.invoke("Hello")
-        logger.info(f"Ollama connection test successful: {test_response[:50]}...")
-    except Exception as e:
-        logger.error(f"Failed to initialize Ollama LLM: {type(e).__name__}: {e}")
-        logger.error(f"Ollama URL being used: {ollama_url}")
-        logger.error("Please ensure Ollama is running on the host machine")
-        raise
-    # Initialize Qdrant client with retry
-    qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
-    logger.info(f"Connecting to Qdrant at: {qdrant_url}")
-    
-    # Retry connection to Qdrant
-    max_retries = 5
-    client = None
-    logger.info("Starting Qdrant connection attempts...")
-    for attempt in range(max_retries):
+async def initialize(name: str, step, retry_delay: float = 2.0, max_delay: float = 30.0) -> None:
+    """Run a startup step until it succeeds, backing off between attempts"""
+    delay = retry_delay
+    while True:
         try:
-            logger.info(f"Attempting to connect to Qdrant (attempt {attempt + 1}/{max_retries})...")
-            logger.info(f"Creating QdrantClient with URL: {qdrant_url}")
-            client = QdrantClient(qdrant_url)
-            logger.info("QdrantClient created successfully, testing connection...")
-            # Test the connection
-            collections = client.get_collections()
-            logger.info(f"Qdrant client initialized successfully. Found {len(collections.collections)} collections.")
-            break
+            await step()
         except Exception as e:
-            logger.error(f"Exception during Qdrant connection (attempt {attempt + 1}/{max_retries}): {type(e).__name__}: {e}")
-            if attempt < max_retries - 1:
-                logger.warning(f"Failed to connect to Qdrant (attempt {attempt + 1}/{max_retries}): {e}")
-                import time
-                time.sleep(2)
-            else:
-                logger.error(f"Failed to connect to Qdrant after {max_retries} attempts: {e}")
-                raise
+            readiness.set(name, RETRYING, f"{type(e).__name__}: {e}")
+            logger.warning(f"{name} not ready ({type(e).__name__}: {e}), retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+            continue
+        readiness.set(name, READY)
+        logger.info(f"{name} ready")
+        return
+
+async def connect_qdrant(qdrant_url: str) -> None:
+    global qdrant_client, vector_store
+    logger.info(f"Connecting to Qdrant at: {qdrant_url}")
+    client = get_qdrant_client(qdrant_url)
+    collections = await run_search(client.get_collections)
+    logger.info(f"Qdrant client initialized successfully. Found {len(collections.collections)} collections.")
     # Ensure collection exists
     try:
-        logger.info("Checking if collection 'chorus-vectors' exists...")
-        client.get_collection("chorus-vectors")
+        await run_search(client.get_collection, "chorus-vectors")
         logger.info("Collection 'chorus-vectors' already exists")
     except Exception as e:
         logger.info(f"Collection 'chorus-vectors' does not exist, creating it... Error: {e}")
-        client.create_collection(
+        await run_search(
+            client.create_collection,
             collection_name="chorus-vectors",
             vectors_config={
                 "size": 768,  # nomic-embed-text embedding size
@@ -139,49 +316,220 @@ async def lifespan(app: FastAPI):
             }
         )
         logger.info("Collection 'chorus-vectors' created successfully")
-    
     qdrant_client = client
-    # Initialize vector store
     vector_store = Qdrant(
         client=client,
         collection_name="chorus-vectors",
         embeddings=embeddings,
     )
-    # System prompt template for RAG
-    system_prompt = PromptTemplate(
-        input_variables=["context", "question"],
-        template="""
-You are a helpful assistant for religious chorus search. Your task is to analyze the provided choruses and give meaningful insights about them.
 
-Context (choruses found):
-{context}
+async def start_qdrant(qdrant_url: str) -> None:
+    await initialize("qdrant", lambda: connect_qdrant(qdrant_url))
+    # The indexes only accelerate /search, which uses Qdrant until they are loaded
+    await asyncio.gather(load_lexical_index(qdrant_client), load_local_vector_index(qdrant_client))
+
+async def load_lexical_index(client) -> None:
+    """Build the lexical index from the stored chorus payloads"""
+    global lexical_index
+    if not hybrid_search_enabled:
+        readiness.set("lexical_index", DISABLED)
+        return
+    try:
+        # Built off to the side and swapped in, so searches never see a half-built index
+        index = LexicalIndex()
+        await run_search(index.load_from_qdrant, client, "chorus-vectors")
+        lexical_index = index
+        readiness.set("lexical_index", READY)
+    except Exception as e:
+        logger.error(f"Failed to build lexical index, /search will use vectors only: {e}")
+        readiness.set("lexical_index", FAILED, str(e))
+
+async def load_local_vector_index(client) -> None:
+    """Load the in-process vector index for small collections"""
+    if local_vector_index is None:
+        readiness.set("local_vector_index", DISABLED)
+        return
+    try:
+        await run_search(local_vector_index.load, client, "chorus-vectors")
+        readiness.set("local_vector_index", READY if local_vector_index.ready else DISABLED)
+    except Exception as e:
+        logger.error(f"Failed to load local vector index, using Qdrant for vector search: {e}")
+        readiness.set("local_vector_index", FAILED, str(e))
 
-Question: {question}
+async def warm_embeddings() -> None:
+    """One uncached embedding call, which also loads the model into Ollama"""
+    await run_search(embeddings.base.embed_documents, ["warm-up"])
 
-Please provide a thoughtful analysis that includes:
-1. A summary of the choruses that match the query
-2. Key themes or messages found in these choruses
-3. How these choruses relate to the user's search query
-4. Any notable patterns or insights about the music or lyrics
+async def warm_llm() -> None:
+    """Load Mistral into Ollama so the first analysis does not pay for it"""
+    logger.info("Testing Ollama connection...")
+    test_response = await run_llm(llm.invoke, "Hello")
+    logger.info(f"Ollama connection test successful: {test_response[:50]}...")
 
-Keep your analysis concise but insightful. Focus on providing value to someone searching for religious choruses.
-"""
+def restore_cache_entries(entries, generation) -> int:
+    """Put snapshot entries back into the result cache with their remaining TTL"""
+    restored = 0
+    for entry in entries:
+        if entry["ttl"] <= 0:
+            continue
+        # Snapshot tags predate this process, so they are stored at its current generation
+        search_cache.set(entry["key"], entry["value"], tags=entry["tags"], generation=generation, ttl=entry["ttl"])
+        restored += 1
+    return restored
+
+async def prewarm_cache(snapshot, dependencies) -> None:
+    """Restore the cache snapshot and recompute the most frequent searches, bounded in time.
+
+    Search terms do not depend on the collection and are restored at once; search
+    results are restored only if the collection generation still matches the
+    snapshot, and otherwise recomputed from the query log like any missing entry.
+    """
+    progress = {"restored": 0, "discarded": 0, "recomputed": 0, "planned": 0, "failed": 0}
+    generation = search_cache.generation
+    entries = snapshot["entries"] if snapshot else []
+    # Wall-clock expiry, since monotonic time does not survive a restart
+    for entry in entries:
+        entry["ttl"] = entry.pop("expires_at") - time.time()
+    terms = [entry for entry in entries if ResultCache.namespace_of(entry["key"]) == "terms"]
+    progress["restored"] = restore_cache_entries(terms, generation)
+    readiness.set("prewarm", STARTING, dict(progress, phase="waiting for dependencies"))
+    
+    await asyncio.wait(dependencies)
+    results = [entry for entry in entries if ResultCache.namespace_of(entry["key"]) != "terms"]
+    if results:
+        try:
+            current = await run_search(collection_fingerprint, qdrant_client, "chorus-vectors")
+        except Exception as e:
+            logger.warning(f"Could not fingerprint 'chorus-vectors', discarding snapshot results: {e}")
+            current = None
+        if current is not None and current == snapshot.get("generation"):
+            progress["restored"] += restore_cache_entries(results, generation)
+        else:
+            progress["discarded"] = len(results)
+            logger.info(f"Discarding {len(results)} snapshot results: collection generation changed")
+    
+    keys = [key for key in query_log.top(prewarm_queries, "search|") if key not in search_cache]
+    progress["planned"] = len(keys)
+    readiness.set("prewarm", STARTING, dict(progress, phase="recomputing"))
+    semaphore = asyncio.Semaphore(prewarm_concurrency)
+    
+    async def recompute(cache_key: str) -> None:
+        async with semaphore:
+            try:
+                await recompute_search(cache_key)
+                progress["recomputed"] += 1
+            except Exception as e:
+                progress["failed"] += 1
+                logger.warning(f"Prewarming {cache_key} failed: {e}")
+            readiness.set("prewarm", STARTING, dict(progress, phase="recomputing"))
+    
+    tasks = [asyncio.create_task(recompute(key)) for key in keys]
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=prewarm_timeout)
+        for task in pending:
+            task.cancel()
+        progress["timed_out"] = len(pending)
+    readiness.set("prewarm", READY, progress)
+    logger.info(f"Search cache prewarmed: {progress}")
+
+async def save_cache_snapshot() -> None:
+    """Write the hottest cache entries and the query log for the next start"""
+    namespaces = ["terms"]
+    generation = None
+    if readiness.ready("qdrant"):
+        try:
+            generation = await run_search(collection_fingerprint, qdrant_client, "chorus-vectors")
+            namespaces += ["search", "rag"]
+        except Exception as e:
+            logger.warning(f"Could not fingerprint 'chorus-vectors', snapshotting search terms only: {e}")
+    entries = search_cache.export(cache_snapshot_max_entries, namespaces=namespaces, rank=query_log.score)
+    now = time.time()
+    for entry in entries:
+        entry["expires_at"] = now + entry.pop("ttl")
+    await run_search(save_snapshot, cache_snapshot_path, generation, entries, query_log.to_dict())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global llm, embeddings, embedding_store, embedding_batcher
+    logger.info("Initializing LangChain services...")
+
+    # Get Ollama URL from environment variable
+    ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
+    
+    # Initialize Ollama embeddings, with query vectors memoized on disk
+    embedding_model = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")  # 768-dimensional embeddings
+    embedding_store = EmbeddingStore(
+        os.path.join(cache_dir, "query_embeddings.sqlite3"),
+        model=embedding_model
     )
-    # Build the RAG chain
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=llm,
-        retriever=vector_store.as_retriever(search_kwargs={"k": 12}),  # Increased from 8 to 12 for better context
-        chain_type_kwargs={"prompt": system_prompt}
+    query_embeddings = OllamaEmbeddings(model=embedding_model, base_url=ollama_url)
+    # Cache misses from concurrent searches are coalesced into batched Ollama calls
+    if os.getenv("EMBED_BATCH", "true").lower() == "true":
+        embedding_batcher = EmbeddingBatcher(
+            query_embeddings,
+            max_batch=int(os.getenv("EMBED_BATCH_MAX", "32")),
+            window=float(os.getenv("EMBED_BATCH_WINDOW_MS", "2")) / 1000,
+            concurrency=int(os.getenv("EMBED_BATCH_CONCURRENCY", "2")),
+            batch_size=embed_batch_size,
+            queue_wait=embed_queue_wait
+        )
+        query_embeddings = embedding_batcher
+    embeddings = CachedQueryEmbeddings(query_embeddings, embedding_store)
+    # The LLM client is lazy; Mistral itself is loaded by the background warm-up
+    logger.info(f"Initializing Ollama LLM with URL: {ollama_url}")
+    llm = Ollama(
+        model="mistral",
+        base_url=ollama_url,
+        timeout=600,  # 10 minutes timeout
+        temperature=0.7,
+        num_gpu=1,  # Use GPU acceleration
+        num_thread=4,  # Limit CPU threads to reduce CPU usage
+        num_ctx=2048,  # Limit context window for faster processing
+        repeat_penalty=1.1,  # Reduce repetition for faster generation
+        top_k=40,  # Limit top-k for faster generation
+        top_p=0.9  # Use nucleus sampling for faster generation
     )
-    logger.info("LangChain services initialized successfully")
+    
+    # Bring Qdrant, the embedding model and the LLM up concurrently in the background:
+    # /live answers at once and /search serves as soon as Qdrant and embeddings are ready
+    qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
+    startup_tasks = [
+        asyncio.create_task(start_qdrant(qdrant_url)),
+        asyncio.create_task(initialize("embeddings", warm_embeddings)),
+        asyncio.create_task(initialize("llm", warm_llm))
+    ]
+    if cache_snapshot_enabled:
+        snapshot = load_snapshot(cache_snapshot_path)
+        if snapshot:
+            query_log.load(snapshot.get("query_log", {}))
+        # Prewarming waits for Qdrant (and its indexes) and embeddings, but not the LLM
+        startup_tasks.append(asyncio.create_task(prewarm_cache(snapshot, startup_tasks[:2])))
+    else:
+        readiness.set("prewarm", DISABLED)
+    startup_tasks.append(asyncio.create_task(run_ingest_jobs()))
+    logger.info("LangChain services starting in the background; see /ready")
     yield
     logger.info("Shutting down LangChain services...")
+    for task in startup_tasks:
+        task.cancel()
+    if cache_snapshot_enabled:
+        try:
+            await save_cache_snapshot()
+        except Exception as e:
+            logger.error(f"Failed to save search cache snapshot: {e}")
+    search_executor.shutdown(wait=False, cancel_futures=True)
+    llm_executor.shutdown(wait=False, cancel_futures=True)
+    ingest_executor.shutdown(wait=False, cancel_futures=True)
+    if embedding_batcher is not None:
+        embedding_batcher.close()
+    embedding_store.close()
 
 app = FastAPI(
     title="LangChain Search Service",
     description="Search service using LangChain with Ollama and Qdrant (RAG, cache, chaining)",
     version="1.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -191,78 +539,328 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    RequestMetricsMiddleware,
+    requests_total=requests_total,
+    in_flight=requests_in_flight,
+    latency=request_latency,
+    endpoints=lambda: [route.path for route in app.routes]
+)
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "services": {
         "vector_store": vector_store is not None,
         "llm": llm is not None,
-        "embeddings": embeddings is not None,
-        "qa_chain": qa_chain is not None
+        "embeddings": embeddings is not None
     }}
 
+@app.get("/live")
+async def live():
+    """Liveness: the process is up and serving HTTP"""
+    return {"status": "alive"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once Qdrant and embeddings are up, with per-dependency status"""
+    is_ready = readiness.ready(*ready_requires)
+    return ORJSONResponse(
+        {"ready": is_ready, "requires": list(ready_requires), "dependencies": readiness.snapshot()},
+        status_code=200 if is_ready else 503
+    )
+
+def build_search_result(doc, score, i: int) -> SearchResult:
+    """Map a Qdrant hit onto the SearchResult shape the portal expects"""
+    try:
+        chorus_id = doc.metadata.get("id", "")
+        # Handle empty IDs
+        if not chorus_id:
+            chorus_id = f"unknown_{i}"
+            logger.warning(f"Found document with empty ID, using generated ID: {chorus_id}")
+        
+        result = SearchResult(
+            id=chorus_id,
+            name=doc.metadata.get('name', ''),
+            chorusText=doc.metadata.get('chorusText', ''),
+            key=doc.metadata.get('key', 0),
+            type=doc.metadata.get('type', 0),
+            timeSignature=doc.metadata.get('timeSignature', 0),
+            createdAt=doc.metadata.get('createdAt', ''),
+            updatedAt=doc.metadata.get('updatedAt', ''),
+            metadata=doc.metadata.get('extra', {}),
+            domainEvents=doc.metadata.get('domainEvents', []),
+            score=float(score),
+            explanation=None
+        )
+        logger.debug(f"Added search result with ID: {chorus_id}")
+        return result
+    except Exception as e:
+        logger.error(f"Error creating search result for document {i}: {e}")
+        # Create a fallback result
+        fallback_id = f"error_{i}"
+        logger.warning(f"Created fallback search result with ID: {fallback_id}")
+        return SearchResult(
+            id=fallback_id,
+            name='',
+            chorusText=doc.page_content if hasattr(doc, 'page_content') else "Error loading content",
+            key=0,
+            type=0,
+            timeSignature=0,
+            score=float(score) if score is not None else 0.0,
+            metadata=doc.metadata if hasattr(doc, 'metadata') else {}
+        )
+
+def chorus_fragment(doc, i: int) -> bytes:
+    """A hit's SearchResult JSON without score and explanation, as an open object"""
+    def build():
+        result = build_search_result(doc, 0.0, i)
+        return open_object(result.model_dump(mode="json", exclude={"score", "explanation"}))
+    chorus_id = doc.metadata.get("id") if hasattr(doc, "metadata") else None
+    if not chorus_id:
+        # Placeholder IDs depend on the hit's position, so they are not cached
+        return build()
+    return fragment_cache.get(chorus_id, doc.metadata, build)
+
+def search_results_json(docs) -> bytes:
+    """Encoded List[SearchResult] for (doc, score) pairs, spliced from cached fragments"""
+    return json_array(
+        close_object(chorus_fragment(doc, i), score=float(score), explanation=None)
+        for i, (doc, score) in enumerate(docs)
+    )
+
+def json_response(body: bytes) -> Response:
+    """Response for a body that is already encoded JSON"""
+    return Response(content=body, media_type="application/json")
+
+def sse_data(payload) -> str:
+    """One SSE data message; bytes are sent as already encoded JSON"""
+    body = payload if isinstance(payload, bytes) else dumps(payload)
+    return f"data: {body.decode('utf-8')}\n\n"
+
 @app.post("/search", response_model=List[SearchResult])
 async def search(request: SearchRequest):
     cache_key = f"search|{request.query.lower()}|{request.k}"
-    if cache_key in search_cache:
+    query_log.record(cache_key)
+    cached = search_cache.get(cache_key)
+    if cached is not None:
         logger.info(f"Cache hit for query: {request.query}")
-        return search_cache[cache_key]
+        return json_response(cached)
     logger.info(f"Cache miss for query: {request.query}")
-    # Retrieve from Qdrant
-    docs = vector_store.similarity_search_with_score(request.query, k=request.k)
+    require_ready("qdrant", "embeddings")
+    # Identical concurrent misses share one embedding + Qdrant round-trip
+    return json_response(await inflight.do(cache_key, lambda: compute_search(request.query, request.k, cache_key)))
+
+async def compute_search(query: str, k: int, cache_key: str) -> bytes:
+    generation = search_cache.generation
+    if hybrid_search_enabled and len(lexical_index):
+        with stage_latency.time("lexical"):
+            lexical_hits, docs = lexical_shortcut(query, k)
+        if docs is None:
+            vector_hits = await run_search(vector_search, query, k=candidate_count(k))
+            docs = fuse_hits(k, lexical_hits, vector_hits)
+    else:
+        # Retrieve from Qdrant
+        docs = await run_search(vector_search, query, k=k)
+    with stage_latency.time("serialize"):
+        results = search_results_json(docs)
+    search_cache.set(cache_key, results, tags=chorus_tags(docs), generation=generation)
+    return results
+
+def chorus_tags(docs) -> List[str]:
+    """Cache tags for the choruses behind a list of (doc, score) hits"""
+    return [point_id_for(doc_id) for doc_id in (document_key(doc.metadata) for doc, _ in docs) if doc_id]
+
+def candidate_count(k: int) -> int:
+    """How many hits to take from each retriever before fusing down to k"""
+    return max(k * 2, 10)
+
+def lexical_shortcut(query: str, k: int):
+    """Lexical hits for a query, plus final (doc, score) pairs if a strong match answers it"""
+    lexical_hits = lexical_index.search(query, k=candidate_count(k))
+    
+    # An exact title or verbatim lyric line needs no embedding round-trip
+    strong_id = lexical_index.strong_match(query, lexical_hits)
+    if not strong_id:
+        return lexical_hits, None
+    logger.info(f"Strong lexical match for query '{query}': {strong_id}")
+    ranked = [strong_id] + [doc_id for doc_id, _ in lexical_hits if doc_id != strong_id]
+    top_score = lexical_hits[0][1] if lexical_hits else 1.0
+    lexical_scores = dict(lexical_hits)
+    return lexical_hits, [
+        (lexical_index.document(doc_id), 1.0 if doc_id == strong_id else min(1.0, lexical_scores[doc_id] / top_score))
+        for doc_id in ranked[:k]
+    ]
+
+def fuse_hits(k: int, lexical_hits, vector_hits):
+    """Lexical + vector hits fused by reciprocal rank, as (doc, score) pairs"""
+    docs_by_id = {}
+    vector_ranking = []
+    for i, (doc, _) in enumerate(vector_hits):
+        doc_id = document_key(doc.metadata) or f"unknown_{i}"
+        if doc_id not in docs_by_id:
+            docs_by_id[doc_id] = doc
+            vector_ranking.append(doc_id)
+    for doc_id, _ in lexical_hits:
+        docs_by_id.setdefault(doc_id, lexical_index.document(doc_id))
+    fused = reciprocal_rank_fusion([vector_ranking, [doc_id for doc_id, _ in lexical_hits]])
+    return [(docs_by_id[doc_id], score) for doc_id, score in fused[:k]]
+
+@app.post("/search_batch", response_model=List[List[SearchResult]])
+async def search_batch(request: BatchSearchRequest):
+    if len(request.queries) > search_batch_max:
+        raise HTTPException(status_code=400, detail=f"At most {search_batch_max} queries per batch")
+    results: List[Optional[bytes]] = [None] * len(request.queries)
+    generation = search_cache.generation
+    hybrid = hybrid_search_enabled and len(lexical_index)
+    
+    # Serve cache hits and strong lexical matches; group the rest by cache key
+    pending: Dict[str, Dict[str, Any]] = {}
+    for position, item in enumerate(request.queries):
+        cache_key = f"search|{item.query.lower()}|{item.k}"
+        query_log.record(cache_key)
+        if cache_key in pending:
+            pending[cache_key]["positions"].append(position)
+            continue
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            results[position] = cached
+            continue
+        lexical_hits, docs = lexical_shortcut(item.query, item.k) if hybrid else ([], None)
+        if docs is not None:
+            results[position] = search_results_json(docs)
+            search_cache.set(cache_key, results[position], tags=chorus_tags(docs), generation=generation)
+            continue
+        pending[cache_key] = {"item": item, "lexical_hits": lexical_hits, "positions": [position]}
+    logger.info(f"Batch search: {len(request.queries)} queries, {len(pending)} need vector search")
+    
+    if pending:
+        require_ready("qdrant", "embeddings")
+        entries = list(pending.items())
+        queries = [entry["item"].query for _, entry in entries]
+        limits = [candidate_count(entry["item"].k) if hybrid else entry["item"].k for _, entry in entries]
+        # One embedding call for the misses and one batched vector search
+        all_hits = await run_search(vector_search_many, queries, limits)
+        for (cache_key, entry), vector_hits in zip(entries, all_hits):
+            k = entry["item"].k
+            docs = fuse_hits(k, entry["lexical_hits"], vector_hits) if hybrid else vector_hits
+            with stage_latency.time("serialize"):
+                batch_results = search_results_json(docs)
+            search_cache.set(cache_key, batch_results, tags=chorus_tags(docs), generation=generation)
+            for position in entry["positions"]:
+                results[position] = batch_results
+    
+    return json_response(json_array(results))
+
+def collection_tag(collection_name: str) -> str:
+    """Cache tag for results read from a whole collection rather than from known choruses"""
+    return f"collection:{collection_name}"
+
+def bible_vector_search(query: str, k: int, book: Optional[str]):
+    query_filter = None
+    if book:
+        query_filter = qdrant_models.Filter(must=[
+            qdrant_models.FieldCondition(key="bookId", match=qdrant_models.MatchValue(value=book))
+        ])
+    with stage_latency.time("embed"):
+        vector = embeddings.embed_query(query)
+    with stage_latency.time("vector_search"):
+        return qdrant_client.search(
+            collection_name=bible_collection,
+            query_vector=vector,
+            query_filter=query_filter,
+            limit=k,
+            with_payload=True
+        )
+
+@app.post("/bible/search", response_model=List[BibleSearchResult])
+async def bible_search(request: BibleSearchRequest):
+    cache_key = f"bible|{request.query.lower()}|{request.k}|{request.book or ''}"
+    generation = search_cache.generation
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Cache hit for Bible query: {request.query}")
+        return cached
+    require_ready("qdrant", "embeddings")
+    try:
+        hits = await run_search(bible_vector_search, request.query, request.k, request.book)
+    except Exception as e:
+        logger.error(f"Bible search failed: {type(e).__name__}: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Bible search unavailable; has '{bible_collection}' been populated with vectorize_bible.py? ({e})"
+        )
     results = []
-    for i, (doc, score) in enumerate(docs):
-        try:
-            chorus_id = doc.metadata.get("id", "")
-            # Handle empty IDs
-            if not chorus_id:
-                chorus_id = f"unknown_{i}"
-                logger.warning(f"Found document with empty ID in regular search, using generated ID: {chorus_id}")
-            
-            result = SearchResult(
-                id=doc.metadata.get('Id', chorus_id),
-                name=doc.metadata.get('Name', ''),
-                chorusText=doc.metadata.get('ChorusText', ''),
-                key=doc.metadata.get('Key', 0),
-                type=doc.metadata.get('Type', 0),
-                timeSignature=doc.metadata.get('TimeSignature', 0),
-                createdAt=doc.metadata.get('CreatedAt', ''),
-                updatedAt=doc.metadata.get('UpdatedAt', ''),
-                metadata=doc.metadata.get('Metadata', {}),
-                domainEvents=doc.metadata.get('DomainEvents', []),
-                score=float(score),
-                explanation=None
-            )
-            results.append(result)
-            logger.debug(f"Added search result with ID: {chorus_id}")
-        except Exception as e:
-            logger.error(f"Error creating search result for document {i}: {e}")
-            # Create a fallback result
-            fallback_id = f"error_{i}"
-            result = SearchResult(
-                id=fallback_id,
-                text=doc.page_content if hasattr(doc, 'page_content') else "Error loading content",
-                score=float(score) if score is not None else 0.0,
-                metadata=doc.metadata if hasattr(doc, 'metadata') else {}
-            )
-            results.append(result)
-            logger.warning(f"Created fallback search result with ID: {fallback_id}")
-    search_cache[cache_key] = results
+    for hit in hits:
+        payload = hit.payload or {}
+        results.append(BibleSearchResult(
+            reference=payload.get("reference", ""),
+            bookId=payload.get("bookId", ""),
+            bookName=payload.get("bookName", ""),
+            chapter=payload.get("chapter", 0),
+            verseStart=payload.get("verseStart", 0),
+            verseEnd=payload.get("verseEnd", payload.get("verseStart", 0)),
+            text=payload.get("text", ""),
+            translation=payload.get("translation"),
+            score=float(hit.score)
+        ))
+    search_cache.set(cache_key, results, tags=[collection_tag(bible_collection)], generation=generation)
     return results
 
 @app.post("/search_intelligent", response_model=IntelligentSearchResult)
 async def search_intelligent(request: IntelligentSearchRequest):
-    # Use timestamp-based cache key to prevent stale cache
-    cache_key = f"rag|{request.query.lower()}|{request.k}|{cache_timestamp}"
-    if cache_key in search_cache:
+    # Entries are tagged with their choruses and evicted when one changes, so the key needs no timestamp
+    cache_key = f"rag|{request.query.lower()}|{request.k}"
+    query_log.record(cache_key)
+    cached = search_cache.get(cache_key)
+    if cached is not None:
         logger.info(f"Cache hit for RAG query: {request.query}")
-        return search_cache[cache_key]
+        return json_response(cached)
     logger.info(f"Cache miss for RAG query: {request.query}")
+    require_ready("qdrant", "embeddings")
+    # Identical concurrent misses share one retrieval and one Mistral generation
+    return json_response(await inflight.do(cache_key, lambda: compute_intelligent_search(request.query, request.k, cache_key)))
+
+def build_analysis_prompt(query: str, unique_docs) -> str:
+    """Prompt asking the LLM to analyse the top unique choruses for a query"""
+    # Create a more detailed context for analysis using unique results
+    context_parts = []
+    for i, (doc, score) in enumerate(unique_docs[:8]):  # Use top 8 unique results for analysis
+        context_parts.append(f"Chorus {i+1} (Score: {score:.3f}):\nTitle: {doc.metadata.get('name', 'Unknown')}\nText: {doc.page_content}\n")
     
+    context = "\n".join(context_parts)
+    
+    # Create an enhanced prompt for better analysis
+    return f"""
+You are an expert musicologist and religious scholar helping someone find meaningful choruses. The user searched for: "{query}"
+
+Here are the most relevant choruses found:
+
+{context}
+
+IMPORTANT: Provide a detailed, insightful analysis that includes ALL of the following sections:
+
+1. **Summary**: What specific choruses were found and why they match this query? Mention specific titles and key themes.
+
+2. **Musical & Spiritual Insights**: What musical elements (key, tempo, style) and spiritual themes are prominent in these choruses?
+
+3. **Relevance to Query**: How do these choruses specifically address what the user is looking for? Be specific about lyrics, themes, or musical characteristics.
+
+4. **Practical Value**: What makes these choruses particularly suitable for someone searching with this query? Consider worship context, emotional impact, or theological depth.
+
+5. **Notable Patterns**: Are there recurring musical patterns, lyrical themes, or spiritual messages across these choruses?
+
+DO NOT give generic responses like "This chorus was selected based on relevance to your search query." Instead, provide concrete, actionable insights that help the user understand why these choruses are relevant and valuable for their search. Be specific about musical details, lyrical content, and spiritual significance.
+
+Your response should be comprehensive and detailed, covering all the sections above.
+"""
+
+async def compute_intelligent_search(query: str, k: int, cache_key: str) -> bytes:
+    generation = search_cache.generation
     # Get more documents for better context (k=12 instead of 8)
-    docs = vector_store.similarity_search_with_score(request.query, k=12)
+    docs = await run_search(vector_search, query, k=12)
     
     # Deduplicate results based on chorus ID before analysis with better error handling
+    dedup_started = time.perf_counter()
     unique_docs = []
     seen_ids = set()
     for i, (doc, score) in enumerate(docs):
@@ -286,122 +884,135 @@ async def search_intelligent(request: IntelligentSearchRequest):
             unique_docs.append((doc, score))
             seen_ids.add(generated_id)
             logger.warning(f"Added document with generated ID due to error: {generated_id}")
+    stage_latency.observe(time.perf_counter() - dedup_started, "dedup")
     
     logger.info(f"Found {len(docs)} total results, {len(unique_docs)} unique choruses")
     
-    # Create a more detailed context for analysis using unique results
-    context_parts = []
-    for i, (doc, score) in enumerate(unique_docs[:8]):  # Use top 8 unique results for analysis
-        context_parts.append(f"Chorus {i+1} (Score: {score:.3f}):\nTitle: {doc.metadata.get('name', 'Unknown')}\nText: {doc.page_content}\n")
+    analysis_prompt = build_analysis_prompt(query, unique_docs)
     
-    context = "\n".join(context_parts)
+    # Use LLM directly with enhanced prompt for better analysis
+    with stage_latency.time("llm_analysis"):
+        answer = await run_llm(llm.invoke, analysis_prompt)
     
-    # Create an enhanced prompt for better analysis
-    analysis_prompt = f"""
-You are an expert musicologist and religious scholar helping someone find meaningful choruses. The user searched for: "{request.query}"
-
-Here are the most relevant choruses found:
-
-{context}
-
-IMPORTANT: Provide a detailed, insightful analysis that includes ALL of the following sections:
-
-1. **Summary**: What specific choruses were found and why they match this query? Mention specific titles and key themes.
+    # Return the deduplicated search results, limited to requested k
+    # Encoded IntelligentSearchResult
+    with stage_latency.time("serialize"):
+        result = close_object(
+            b'{"search_results":' + search_results_json(unique_docs[:k]),
+            ai_analysis=answer,
+            query_understanding=query
+        )
+    # The analysis covers every unique chorus in the prompt, not only the k returned
+    search_cache.set(cache_key, result, tags=chorus_tags(unique_docs), generation=generation)
+    return result
 
-2. **Musical & Spiritual Insights**: What musical elements (key, tempo, style) and spiritual themes are prominent in these choruses?
+async def generate_search_terms(query: str) -> str:
+    """Ask the LLM for 3-5 Afrikaans/English search terms for a user query"""
+    search_terms_prompt = f"""Query: "{query}"
 
-3. **Relevance to Query**: How do these choruses specifically address what the user is looking for? Be specific about lyrics, themes, or musical characteristics.
+Generate 3-5 single-word search terms in Afrikaans and English. Return only comma-separated terms.
+Example: "liefde,love, aanbidding,worship, lof,praise"
 
-4. **Practical Value**: What makes these choruses particularly suitable for someone searching with this query? Consider worship context, emotional impact, or theological depth.
+Terms:"""
+    
+    logger.info(f"Sending prompt to Ollama: {search_terms_prompt[:100]}...")
+    with stage_latency.time("llm_terms"):
+        search_terms_response = await run_llm(llm.invoke, search_terms_prompt)
+    search_terms = search_terms_response.strip()
+    
+    # Clean up the response to ensure it's just the search terms
+    if search_terms.startswith('"') and search_terms.endswith('"'):
+        search_terms = search_terms[1:-1]
+    return search_terms
 
-5. **Notable Patterns**: Are there recurring musical patterns, lyrical themes, or spiritual messages across these choruses?
+async def resolve_search_terms(query: str):
+    """Search terms for a query and where they came from: dictionary, cache or llm"""
+    local_terms = expand_locally(query)
+    if local_terms:
+        return local_terms, "dictionary"
+    cache_key = f"terms|{normalize_query(query)}"
+    query_log.record(cache_key)
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return cached, "cache"
+    
+    async def generate_and_cache():
+        search_terms = await generate_search_terms(query)
+        search_cache.set(cache_key, search_terms)
+        return search_terms
+    
+    # Identical concurrent streams share one search-term generation
+    return await inflight.do(cache_key, generate_and_cache), "llm"
 
-DO NOT give generic responses like "This chorus was selected based on relevance to your search query." Instead, provide concrete, actionable insights that help the user understand why these choruses are relevant and valuable for their search. Be specific about musical details, lyrical content, and spiritual significance.
+async def stream_llm(prompt: str):
+    """Yield LLM output chunks as they are generated.
 
-Your response should be comprehensive and detailed, covering all the sections above.
-"""
+    The blocking llm.stream iterator runs on the LLM pool and hands chunks
+    back to the event loop through a queue.
+    """
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    cancelled = threading.Event()
     
-    # Use LLM directly with enhanced prompt for better analysis
-    answer = llm.invoke(analysis_prompt)
+    def hand_off(item):
+        try:
+            loop.call_soon_threadsafe(chunks.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed; nobody is listening anymore
+            cancelled.set()
     
-    # Return the deduplicated search results with better error handling
-    search_results = []
-    for i, (doc, score) in enumerate(unique_docs[:request.k]):  # Limit to requested k
+    def produce():
         try:
-            chorus_id = doc.metadata.get("id", "")
-            # Handle empty IDs
-            if not chorus_id:
-                chorus_id = f"unknown_{i}"
-                logger.warning(f"Found document with empty ID in non-streaming search results, using generated ID: {chorus_id}")
-            
-            search_results.append(SearchResult(
-                id=chorus_id,
-                text=doc.page_content,
-                score=float(score),
-                metadata=doc.metadata
-            ))
-            logger.debug(f"Added search result with ID: {chorus_id}")
+            for chunk in llm.stream(prompt):
+                if cancelled.is_set():
+                    break
+                hand_off(chunk)
         except Exception as e:
-            logger.error(f"Error creating search result for document {i}: {e}")
-            # Create a fallback result
-            fallback_id = f"error_{i}"
-            search_results.append(SearchResult(
-                id=fallback_id,
-                text=doc.page_content if hasattr(doc, 'page_content') else "Error loading content",
-                score=float(score) if score is not None else 0.0,
-                metadata=doc.metadata if hasattr(doc, 'metadata') else {}
-            ))
-            logger.warning(f"Created fallback search result with ID: {fallback_id}")
+            hand_off(e)
+        finally:
+            hand_off(finished)
     
-    result = IntelligentSearchResult(
-        search_results=search_results,
-        ai_analysis=answer,
-        query_understanding=request.query
-    )
-    search_cache[cache_key] = result
-    return result
+    loop.run_in_executor(llm_executor, produce)
+    try:
+        while True:
+            item = await chunks.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Stop generating if the client disconnected mid-stream
+        cancelled.set()
 
 @app.post("/search_intelligent_stream")
 async def search_intelligent_stream(request: IntelligentSearchRequest):
+    require_ready("qdrant", "embeddings")
     async def generate_stream():
         try:
             logger.info(f"Starting streaming intelligent search for query: {request.query}")
             
             # Step 1: Generate search terms from user's query using Ollama
             logger.info("Step 1: Generating search terms from user query...")
-            search_terms_prompt = f"""Query: "{request.query}"
-
-Generate 3-5 single-word search terms in Afrikaans and English. Return only comma-separated terms.
-Example: "liefde,love, aanbidding,worship, lof,praise"
-
-Terms:"""
-            
             try:
-                logger.info(f"Sending prompt to Ollama: {search_terms_prompt[:100]}...")
-                search_terms_response = llm.invoke(search_terms_prompt)
-                search_terms = search_terms_response.strip()
-                logger.info(f"Generated search terms: {search_terms}")
+                search_terms, terms_source = await resolve_search_terms(request.query)
+                logger.info(f"Generated search terms ({terms_source}): {search_terms}")
             except Exception as e:
                 logger.error(f"Error generating search terms: {type(e).__name__}: {e}")
                 logger.error(f"Ollama URL: {os.getenv('OLLAMA_URL', 'http://localhost:11434')}")
                 error_message = f"Failed to generate search terms: {str(e)}. Please ensure Ollama is running and accessible."
-                yield f"data: {json.dumps({'type': 'error', 'error': error_message})}\n\n"
+                yield sse_data({'type': 'error', 'error': error_message})
                 return
             
-            # Clean up the response to ensure it's just the search terms
-            if search_terms.startswith('"') and search_terms.endswith('"'):
-                search_terms = search_terms[1:-1]
-            
-            logger.info(f"Generated search terms: {search_terms}")
-            
             # Step 2: Send query understanding (the generated search terms)
             logger.info("Step 2: Sending query understanding")
-            yield f"data: {json.dumps({'type': 'queryUnderstanding', 'queryUnderstanding': search_terms})}\n\n"
+            yield sse_data({'type': 'queryUnderstanding', 'queryUnderstanding': search_terms, 'source': terms_source})
             
             # Step 3: Use the generated search terms to search the vector database
             logger.info("Step 3: Performing search with generated terms...")
             try:
-                docs = vector_store.similarity_search_with_score(search_terms, k=request.k)
+                docs = await run_search(vector_search, search_terms, k=request.k)
                 logger.info(f"Vector search returned {len(docs)} documents")
             except Exception as e:
                 logger.error(f"Error during vector search: {e}")
@@ -409,12 +1020,13 @@ Terms:"""
                 logger.error(f"Error details: {str(e)}")
                 # Check if it's a Qdrant-specific error
                 if "duplicate" in str(e).lower() or "key" in str(e).lower():
-                    yield f"data: {json.dumps({'type': 'error', 'error': 'Database contains duplicate entries. Please contact support.'})}\n\n"
+                    yield sse_data({'type': 'error', 'error': 'Database contains duplicate entries. Please contact support.'})
                 else:
-                    yield f"data: {json.dumps({'type': 'error', 'error': 'Vector search failed. Please try again.'})}\n\n"
+                    yield sse_data({'type': 'error', 'error': 'Vector search failed. Please try again.'})
                 return
             
             # Deduplicate results with better error handling
+            dedup_started = time.perf_counter()
             unique_docs = []
             seen_ids = set()
             logger.info(f"Processing {len(docs)} documents for deduplication")
@@ -443,111 +1055,325 @@ Terms:"""
                     unique_docs.append((doc, score))
                     seen_ids.add(generated_id)
                     logger.warning(f"Added document with generated ID due to error: {generated_id}")
+            stage_latency.observe(time.perf_counter() - dedup_started, "dedup")
             
             logger.info(f"Deduplication complete: {len(unique_docs)} unique documents from {len(docs)} total")
             
-            search_results = []
-            for i, (doc, score) in enumerate(unique_docs):
-                try:
-                    chorus_id = doc.metadata.get("id", "")
-                    # Handle empty IDs
-                    if not chorus_id:
-                        chorus_id = f"unknown_{i}"
-                        logger.warning(f"Found document with empty ID in search results, using generated ID: {chorus_id}")
-                    
-                    search_results.append({
-                        "id": doc.metadata.get('Id', chorus_id),
-                        "name": doc.metadata.get('Name', ''),
-                        "chorusText": doc.metadata.get('ChorusText', ''),
-                        "key": doc.metadata.get('Key', 0),
-                        "type": doc.metadata.get('Type', 0),
-                        "timeSignature": doc.metadata.get('TimeSignature', 0),
-                        "createdAt": doc.metadata.get('CreatedAt', ''),
-                        "updatedAt": doc.metadata.get('UpdatedAt', ''),
-                        "metadata": doc.metadata.get('Metadata', {}),
-                        "domainEvents": doc.metadata.get('DomainEvents', []),
-                        "score": float(score)
-                    })
-                    logger.debug(f"Added search result with ID: {chorus_id}")
-                except Exception as e:
-                    logger.error(f"Error creating search result for document {i}: {e}")
-                    # Create a fallback result
-                    fallback_id = f"error_{i}"
-                    search_results.append({
-                        "id": fallback_id,
-                        "text": doc.page_content if hasattr(doc, 'page_content') else "Error loading content",
-                        "score": float(score) if score is not None else 0.0,
-                        "metadata": doc.metadata if hasattr(doc, 'metadata') else {}
-                    })
-                    logger.warning(f"Created fallback search result with ID: {fallback_id}")
-            
+            serialize_started = time.perf_counter()
+            # The portal's stream results are SearchResults without the explanation field
+            search_results = [
+                close_object(chorus_fragment(doc, i), score=float(score))
+                for i, (doc, score) in enumerate(unique_docs)
+            ]
             logger.info(f"Step 3: Found {len(search_results)} unique results")
             
-            # Send individual search results as they're processed
-            for i, result in enumerate(search_results):
-                logger.info(f"Sending individual search result {i+1}/{len(search_results)}: {result['name']}")
-                yield f"data: {json.dumps({'type': 'searchResult', 'index': i, 'searchResult': result})}\n\n"
-            
+            # Encode every result event up front so the serialize stage excludes time spent waiting on the client
+            result_events = [
+                sse_data(close_object(open_object({"type": "searchResult", "index": i}), searchResult=Raw(result)))
+                for i, result in enumerate(search_results)
+            ]
             # Also send the complete results array for compatibility
-            yield f"data: {json.dumps({'type': 'searchResults', 'searchResults': search_results})}\n\n"
+            result_events.append(sse_data(close_object(open_object({"type": "searchResults"}), searchResults=Raw(json_array(search_results)))))
+            stage_latency.observe(time.perf_counter() - serialize_started, "serialize")
+            
+            # Send individual search results as they're processed
+            for i, event in enumerate(result_events[:-1]):
+                logger.debug(f"Sending individual search result {i+1}/{len(search_results)}: {unique_docs[i][0].metadata.get('name', '')}")
+                yield event
+            yield result_events[-1]
             
             # Step 4: Skipping individual reasons generation for performance
             logger.info("Step 4: Skipping individual reasons generation for performance")
             
-            # Step 5: Skipping overall analysis generation for performance
-            logger.info("Step 5: Skipping overall analysis generation for performance")
+            # Step 5: Stream the overall analysis token by token
+            if request.include_analysis and unique_docs:
+                logger.info("Step 5: Streaming overall analysis...")
+                yield sse_data({'type': 'analysisStart'})
+                analysis_parts = []
+                started = time.perf_counter()
+                time_to_first_token_ms = None
+                try:
+                    async for chunk in stream_llm(build_analysis_prompt(request.query, unique_docs)):
+                        if time_to_first_token_ms is None:
+                            stage_latency.observe(time.perf_counter() - started, "llm_analysis_first_token")
+                            time_to_first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+                            logger.info(f"Analysis time to first token: {time_to_first_token_ms}ms")
+                            yield sse_data({'type': 'analysisTiming', 'timeToFirstTokenMs': time_to_first_token_ms})
+                        analysis_parts.append(chunk)
+                        yield sse_data({'type': 'analysisChunk', 'chunk': chunk})
+                except Exception as e:
+                    logger.error(f"Error streaming analysis: {type(e).__name__}: {e}")
+                    yield sse_data({'type': 'error', 'error': f'Analysis generation failed: {e}'})
+                else:
+                    stage_latency.observe(time.perf_counter() - started, "llm_analysis")
+                    total_ms = round((time.perf_counter() - started) * 1000, 1)
+                    logger.info(f"Analysis streamed in {total_ms}ms ({len(analysis_parts)} chunks)")
+                    # Full text for clients that only render the final analysis
+                    yield sse_data({'type': 'aiAnalysis', 'analysis': ''.join(analysis_parts), 'timeToFirstTokenMs': time_to_first_token_ms, 'totalMs': total_ms})
+            else:
+                logger.info("Step 5: Skipping overall analysis generation")
             
             # Step 6: Send completion
-            yield f"data: {json.dumps({'type': 'complete', 'status': 'completed'})}\n\n"
+            yield sse_data({'type': 'complete', 'status': 'completed'})
             
         except Exception as e:
             logger.error(f"Error in streaming search: {e}")
-            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+            yield sse_data({'type': 'error', 'error': str(e)})
     
     return EventSourceResponse(generate_stream())
 
 @app.post("/clear_cache")
 async def clear_cache():
-    global search_cache, cache_timestamp
     search_cache.clear()
-    cache_timestamp += 1
-    logger.info("Cache cleared and timestamp incremented")
+    fragment_cache.invalidate()
+    logger.info(f"Cache cleared (generation {search_cache.generation})")
     return {"message": "Cache cleared successfully"}
 
+@app.post("/invalidate_cache")
+async def invalidate_cache(request: CacheInvalidationRequest):
+    """Evict cached results built from the given choruses or collections, e.g. after an edit in the CHAP2 API"""
+    report = invalidate_choruses(request.chorus_ids)
+    logger.info(f"Chorus {request.change}: {request.chorus_ids} evicted {report['evicted']} cached results, refreshing {report['refreshing']}")
+    if request.collections:
+        evicted = search_cache.invalidate(collection_tag(name) for name in request.collections)
+        logger.info(f"Collections {request.collections} changed: evicted {len(evicted)} cached results")
+        report["evicted"] += len(evicted)
+        report["generation"] = search_cache.generation
+    if request.chorus_ids and readiness.ready("qdrant"):
+        # The points may have been changed outside this process, e.g. by vectorize_data.py;
+        # the indexes are reloaded and the choruses evicted again once they serve them
+        choruses_changed(request.chorus_ids)
+    return report
+
+def invalidate_choruses(chorus_ids: List[str]) -> Dict[str, Any]:
+    """Evict the cached results and fragments for changed choruses; re-run popular searches"""
+    fragment_cache.invalidate(chorus_ids)
+    evicted = search_cache.invalidate(point_id_for(chorus_id) for chorus_id in chorus_ids)
+    popular = sorted(
+        ((hits, key) for key, hits in evicted if key.startswith("search|") and hits >= cache_refresh_min_hits),
+        reverse=True
+    )[:cache_refresh_max] if cache_refresh_enabled else []
+    if popular:
+        task = asyncio.create_task(refresh_searches([key for _, key in popular]))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+    return {"evicted": len(evicted), "refreshing": len(popular), "generation": search_cache.generation}
+
+async def refresh_searches(cache_keys: List[str]) -> None:
+    """Recompute evicted /search entries one at a time so live traffic keeps the pool"""
+    for cache_key in cache_keys:
+        if readiness.not_ready("qdrant", "embeddings"):
+            return
+        try:
+            await recompute_search(cache_key)
+        except Exception as e:
+            logger.warning(f"Background refresh of {cache_key} failed: {e}")
+
+async def recompute_search(cache_key: str) -> bytes:
+    """Run the /search behind a "search|query|k" cache key and cache the result"""
+    query, k = cache_key.split("|", 1)[1].rsplit("|", 1)
+    return await inflight.do(cache_key, lambda: compute_search(query, int(k), cache_key))
+
+@app.get("/cache_stats")
+async def cache_stats():
+    return {
+        "results": search_cache.stats(),
+        "embeddings": embedding_store.stats() if embedding_store else None,
+        "embedding_batches": embedding_batcher.stats() if embedding_batcher else None,
+        "fragments": fragment_cache.stats(),
+        "single_flight": inflight.stats(),
+        "ingest": ingest_jobs.stats(),
+        "query_log": len(query_log)
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Starlette appends "; charset=utf-8" to text/* media types
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def chorus_document(doc: Dict[str, Any]) -> Document:
+    """Document for a chorus posted to /add_documents or /ingest"""
+    fields = chorus_fields(doc.get("id") or str(uuid.uuid4()), {
+        "name": doc.get("name", ""),
+        "chorusText": doc.get("text", ""),
+        "key": doc.get("key", 0),
+        "type": doc.get("type", 0),
+        "metadata": {"word_positions": doc["word_positions"]} if doc.get("word_positions") else {}
+    }, source="api")
+    return Document(page_content=doc.get("text", ""), metadata=fields)
+
+async def upsert_documents(docs: List[Document], run=run_search) -> None:
+    """Embed and upsert documents, keeping the lexical index in step"""
+    # Stable point IDs, so re-adding a chorus replaces it instead of duplicating it
+    vectors = await run(embeddings.embed_documents, [doc.page_content for doc in docs])
+    points = [
+        qdrant_models.PointStruct(id=point_id_for(doc.metadata["id"]), vector=vector, payload=document_to_payload(doc))
+        for doc, vector in zip(docs, vectors)
+    ]
+    await run(qdrant_client.upsert, collection_name="chorus-vectors", points=points)
+    for doc in docs:
+        lexical_index.upsert(doc)
+
+def choruses_changed(chorus_ids: List[str]) -> None:
+    """Bring the in-process indexes and caches up to date after an upsert"""
+    if local_vector_index is not None or hybrid_search_enabled:
+        # Invalidate once the indexes serve the new choruses, so refreshed entries see them
+        task = asyncio.create_task(reload_indexes(chorus_ids))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+    else:
+        invalidate_choruses(chorus_ids)
+
 @app.post("/add_documents")
 async def add_documents(documents: List[Dict[str, Any]]):
-    if not vector_store:
-        raise HTTPException(status_code=503, detail="Vector store not initialized")
-    # Debug: test Qdrant connection before proceeding
-    try:
-        logger.info(f"Testing Qdrant connection in /add_documents: {qdrant_client}")
-        collections = qdrant_client.get_collections()
-        logger.info(f"Qdrant connection OK in /add_documents. Found {len(collections.collections)} collections.")
-    except Exception as e:
-        logger.error(f"Qdrant connection failed in /add_documents: {e}")
-        raise HTTPException(status_code=500, detail=f"Qdrant connection failed: {e}")
-    docs = []
-    for doc in documents:
-        langchain_doc = Document(
-            page_content=doc.get("text", ""),
-            metadata={
-                "id": doc.get("id", ""),
-                "name": doc.get("name", ""),
-                "key": doc.get("key", ""),
-                "type": doc.get("type", ""),
-                "word_positions": doc.get("word_positions", {})
-            }
-        )
-        docs.append(langchain_doc)
+    """Add a small list of choruses synchronously; use /ingest for bulk imports"""
+    require_ready("qdrant", "embeddings")
+    docs = [chorus_document(doc) for doc in documents]
     try:
-        vector_store.add_documents(docs)
+        await upsert_documents(docs)
     except Exception as e:
         logger.error(f"Error during add_documents: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"add_documents failed: {e}")
+    choruses_changed([doc.metadata["id"] for doc in docs])
     return {"message": f"Added {len(docs)} documents to vector store"}
 
+@app.post("/ingest", status_code=202)
+async def ingest(request: Request):
+    """Start a bulk ingestion job from an NDJSON body, one chorus object per line"""
+    require_ready("qdrant", "embeddings")
+    job = ingest_jobs.create()
+    if job is None:
+        raise HTTPException(
+            status_code=429,
+            detail=f"{ingest_jobs.max_pending} ingestion jobs already pending; retry later",
+            headers={"Retry-After": "30"}
+        )
+    try:
+        await spool_ndjson(request.stream(), job)
+    except BaseException:
+        ingest_jobs.discard(job)
+        raise
+    ingest_jobs.submit(job)
+    logger.info(f"Ingestion job {job.id} queued with {job.lines} lines")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "lines": job.lines,
+        "status_url": f"/ingest/{job.id}",
+        "events_url": f"/ingest/{job.id}/events"
+    }
+
+def get_ingest_job(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job {job_id}")
+    return job
+
+@app.get("/ingest/{job_id}")
+async def ingest_status(job_id: str):
+    """Progress and per-line errors of an ingestion job"""
+    return get_ingest_job(job_id).snapshot()
+
+@app.get("/ingest/{job_id}/events")
+async def ingest_events(job_id: str):
+    """Ingestion job progress as server-sent events, ending when the job finishes"""
+    job = get_ingest_job(job_id)
+    
+    async def generate_events():
+        async for snapshot in job.changes():
+            event_type = snapshot["status"] if snapshot["status"] in JOB_FINISHED else "progress"
+            yield sse_data({"type": event_type, **snapshot})
+    
+    return EventSourceResponse(generate_events())
+
+async def run_ingest_jobs() -> None:
+    """Process queued ingestion jobs one at a time"""
+    while True:
+        job = await ingest_jobs.next()
+        try:
+            await process_ingest_job(job)
+        except asyncio.CancelledError:
+            job.finish(JOB_FAILED, "Service shut down before the job finished")
+            raise
+        except Exception as e:
+            logger.error(f"Ingestion job {job.id} failed: {e}", exc_info=True)
+            job.finish(JOB_FAILED, f"{type(e).__name__}: {e}")
+
+async def process_ingest_job(job) -> None:
+    """Embed and upsert a job's spooled lines in batches, recording per-line errors"""
+    job.status = JOB_RUNNING
+    job.started_at = time.time()
+    job.notify()
+    chorus_ids = []
+    batches = job.batches_of(ingest_jobs.batch_size)
+    try:
+        # The spool may be on disk, so it is read on the ingest pool rather than the event loop
+        while True:
+            batch = await run_ingest(next, batches, None)
+            if batch is None:
+                break
+            docs, doc_lines = [], []
+            for line_number, line in batch:
+                try:
+                    docs.append(chorus_document(parse_line(line)))
+                    doc_lines.append(line_number)
+                except (ValueError, TypeError) as e:
+                    job.record_error(line_number, str(e))
+                    ingested_total.inc("invalid")
+            if docs:
+                await yield_to_queries()
+                try:
+                    await upsert_documents(docs, run=run_ingest)
+                except Exception as e:
+                    # The batch failed as a whole; later batches may still succeed
+                    logger.warning(f"Ingestion job {job.id} batch ending at line {batch[-1][0]} failed: {e}")
+                    for line_number in doc_lines:
+                        job.record_error(line_number, f"{type(e).__name__}: {e}")
+                    job.failed_batches += 1
+                    ingested_total.inc("failed", amount=len(docs))
+                else:
+                    job.upserted += len(docs)
+                    chorus_ids.extend(doc.metadata["id"] for doc in docs)
+                    ingested_total.inc("upserted", amount=len(docs))
+            job.batches += 1
+            job.lines_done = batch[-1][0]
+            job.notify()
+    finally:
+        if chorus_ids:
+            choruses_changed(chorus_ids)
+    job.lines_done = job.lines
+    if job.failed and not job.upserted:
+        job.finish(JOB_FAILED, f"No chorus was upserted: {job.failed} lines failed, {job.failed_batches} of {job.batches} batches failed")
+    elif job.failed:
+        # Partial success: the job completed, and error says how much of it did not
+        job.finish(JOB_COMPLETED, f"{job.failed} lines failed, {job.failed_batches} of {job.batches} batches failed")
+    else:
+        job.finish(JOB_COMPLETED)
+    logger.info(f"Ingestion job {job.id} {job.status}: {job.upserted} upserted, {job.failed} failed in {job.snapshot()['elapsed_s']}s")
+
+async def yield_to_queries() -> None:
+    """Hold an ingestion batch back while query embeddings are waiting, up to INGEST_YIELD_MAX_MS"""
+    if embedding_batcher is None:
+        return
+    deadline = time.monotonic() + ingest_yield_max
+    while embedding_batcher.backlog() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+async def reload_indexes(changed_ids: List[str] = ()):
+    """Reload the local vector and lexical indexes from Qdrant, then evict the changed choruses"""
+    if local_vector_index is not None:
+        try:
+            await run_search(local_vector_index.load, qdrant_client, "chorus-vectors", refresh=True)
+        except Exception as e:
+            logger.error(f"Failed to reload local vector index: {e}")
+    if hybrid_search_enabled:
+        # Rebuilt rather than patched, so choruses deleted or edited by vectorize_data.py drop out
+        await load_lexical_index(qdrant_client)
+    if changed_ids:
+        invalidate_choruses(changed_ids)
+
 @app.post("/test_qdrant")
-async def test_qdrant():
+def test_qdrant():
     info = {}
     try:
         info['client_type'] = str(type(qdrant_client))
@@ -0,0 +1,67 @@
+"""
+Qdrant client construction shared by the service and the ingestion scripts.
+
+Transport, connection pool and timeout come from the environment, so
+main.py, vectorize_data.py and vectorize_bible.py all talk to Qdrant the
+same way. One client is kept per URL and reused: it is thread-safe and
+owns an HTTP connection pool (REST) or a multiplexed channel (gRPC) that a
+client-per-call would throw away.
+
+    QDRANT_PREFER_GRPC=true   points/search traffic over gRPC (port QDRANT_GRPC_PORT)
+    QDRANT_POOL_SIZE=16       pooled keep-alive REST connections
+    QDRANT_TIMEOUT=30         request timeout in seconds
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict
+
+import httpx
+from qdrant_client import QdrantClient
+
+logger = logging.getLogger(__name__)
+
+_clients: Dict[str, QdrantClient] = {}
+_lock = threading.Lock()
+
+
+def client_options() -> Dict[str, Any]:
+    """QdrantClient keyword arguments from the QDRANT_* environment variables"""
+    pool_size = int(os.getenv("QDRANT_POOL_SIZE", "16"))
+    options: Dict[str, Any] = {
+        "prefer_grpc": os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true",
+        "grpc_port": int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+        # qdrant-client disables keep-alive for localhost by default; reuse connections instead
+        "limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+    }
+    timeout = os.getenv("QDRANT_TIMEOUT")
+    if timeout:
+        options["timeout"] = int(timeout)
+    if options["prefer_grpc"]:
+        options["grpc_options"] = {
+            "grpc.keepalive_time_ms": 30000,
+            "grpc.max_receive_message_length": 64 * 1024 * 1024,
+        }
+    return options
+
+
+def create_qdrant_client(url: str, **overrides: Any) -> QdrantClient:
+    """New client for url configured from the environment; overrides win"""
+    if url == ":memory:":
+        # Local mode has no transport to tune
+        return QdrantClient(url)
+    options = client_options()
+    options.update(overrides)
+    transport = f"gRPC on port {options['grpc_port']}" if options["prefer_grpc"] else "REST"
+    logger.info(f"Creating Qdrant client for {url} over {transport} (pool={options['limits'].max_connections}, timeout={options.get('timeout', 'default')})")
+    return QdrantClient(url, **options)
+
+
+def get_qdrant_client(url: str) -> QdrantClient:
+    """The process-wide client for url, created on first use"""
+    with _lock:
+        client = _clients.get(url)
+        if client is None:
+            client = _clients[url] = create_qdrant_client(url)
+        return client
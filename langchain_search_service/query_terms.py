@@ -0,0 +1,110 @@
+"""
+Local bilingual expansion of short worship queries into search terms.
+
+Short queries made up of common worship vocabulary ("liefde", "praise the
+Lord", "genade en vrede") are expanded from a fixed Afrikaans/English
+dictionary instead of asking the LLM for search terms.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+from embedding_cache import normalize_query
+
+# (Afrikaans, English) pairs of common worship vocabulary
+WORSHIP_TERMS = [
+    ("liefde", "love"),
+    ("lof", "praise"),
+    ("aanbidding", "worship"),
+    ("genade", "grace"),
+    ("vrede", "peace"),
+    ("vreugde", "joy"),
+    ("blydskap", "gladness"),
+    ("hoop", "hope"),
+    ("geloof", "faith"),
+    ("vertroue", "trust"),
+    ("trou", "faithfulness"),
+    ("kruis", "cross"),
+    ("bloed", "blood"),
+    ("redding", "salvation"),
+    ("verlossing", "redemption"),
+    ("vergifnis", "forgiveness"),
+    ("genesing", "healing"),
+    ("opstanding", "resurrection"),
+    ("oorwinning", "victory"),
+    ("Here", "Lord"),
+    ("Heer", "Lord"),
+    ("God", "God"),
+    ("Jesus", "Jesus"),
+    ("Christus", "Christ"),
+    ("Gees", "Spirit"),
+    ("Vader", "Father"),
+    ("Lam", "Lamb"),
+    ("Koning", "King"),
+    ("Herder", "Shepherd"),
+    ("Rots", "Rock"),
+    ("heilig", "holy"),
+    ("heerlikheid", "glory"),
+    ("eer", "honour"),
+    ("krag", "power"),
+    ("lig", "light"),
+    ("lewe", "life"),
+    ("ewig", "eternal"),
+    ("hemel", "heaven"),
+    ("wêreld", "world"),
+    ("naam", "name"),
+    ("troon", "throne"),
+    ("woord", "word"),
+    ("waarheid", "truth"),
+    ("gebed", "prayer"),
+    ("dank", "thanks"),
+    ("danksegging", "thanksgiving"),
+    ("seën", "blessing"),
+    ("troos", "comfort"),
+    ("sing", "sing"),
+    ("halleluja", "hallelujah"),
+    ("hosanna", "hosanna"),
+    ("Kersfees", "Christmas"),
+    ("Paasfees", "Easter"),
+]
+
+# Words that carry no search meaning on their own in either language
+STOPWORDS = {
+    "die", "en", "van", "vir", "my", "ons", "jou", "n", "is", "in", "tot", "aan",
+    "the", "and", "of", "for", "our", "your", "a", "an", "to", "is", "in", "about",
+}
+
+LOCAL_TERMS_MAX_WORDS = int(os.getenv("LOCAL_TERMS_MAX_WORDS", "3"))
+
+
+def _build_lookup() -> Dict[str, Tuple[str, str]]:
+    lookup: Dict[str, Tuple[str, str]] = {}
+    for afrikaans, english in WORSHIP_TERMS:
+        pair = (afrikaans.lower(), english.lower())
+        lookup.setdefault(normalize_query(afrikaans), pair)
+        lookup.setdefault(normalize_query(english), pair)
+    return lookup
+
+
+_LOOKUP = _build_lookup()
+
+
+def expand_locally(query: str, max_words: int = LOCAL_TERMS_MAX_WORDS) -> Optional[str]:
+    """Expand a short query from the worship dictionary.
+
+    Returns comma-separated Afrikaans/English terms in the same shape the
+    LLM produces, or None when the query is too long or contains a word the
+    dictionary does not know.
+    """
+    words = [w for w in normalize_query(query).replace(",", " ").split() if w not in STOPWORDS]
+    if not words or len(words) > max_words:
+        return None
+    terms: List[str] = []
+    for word in words:
+        pair = _LOOKUP.get(word)
+        if pair is None:
+            return None
+        for term in pair:
+            if term not in terms:
+                terms.append(term)
+    return ",".join(terms)
@@ -0,0 +1,55 @@
+"""
+Startup state of the service's dependencies.
+
+The service starts accepting requests before Qdrant, the embedding model and
+the LLM are reachable; each is brought up by a background task that records
+its progress here. /ready reports the snapshot, and endpoints check only the
+dependencies they actually use.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List
+
+STARTING = "starting"
+READY = "ready"
+RETRYING = "retrying"
+FAILED = "failed"
+DISABLED = "disabled"
+
+
+class Readiness:
+    """Thread-safe status per named dependency"""
+
+    def __init__(self, names: Iterable[str]):
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {
+            name: {"status": STARTING, "detail": None, "attempts": 0, "ready_after_s": None}
+            for name in names
+        }
+
+    def set(self, name: str, status: str, detail: Any = None) -> None:
+        with self._lock:
+            state = self._state.setdefault(name, {"status": STARTING, "detail": None, "attempts": 0, "ready_after_s": None})
+            state["status"] = status
+            state["detail"] = detail
+            if status in (READY, RETRYING, FAILED):
+                state["attempts"] += 1
+            if status == READY:
+                state["ready_after_s"] = round(time.monotonic() - self._started, 3)
+
+    def status(self, name: str) -> str:
+        with self._lock:
+            return self._state.get(name, {}).get("status", STARTING)
+
+    def ready(self, *names: str) -> bool:
+        return not self.not_ready(*names)
+
+    def not_ready(self, *names: str) -> List[str]:
+        with self._lock:
+            return [name for name in names if self._state.get(name, {}).get("status") != READY]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(state) for name, state in self._state.items()}
@@ -0,0 +1,252 @@
+"""
+Bounded in-memory result cache for the search endpoints.
+
+Entries are kept in LRU order and evicted when either the entry count or the
+approximate byte budget is exceeded. Each entry belongs to a namespace
+("search", "rag", ...) which carries its own TTL.
+
+Entries can be tagged with the chorus IDs they were built from. invalidate()
+evicts only the entries carrying a changed ID and advances the cache
+generation; a result computed from an older generation that references a
+chorus changed since then is not stored, so a search racing an update cannot
+put the old version back.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory footprint of a cached value by its JSON size"""
+    if isinstance(value, BaseModel):
+        return len(value.model_dump_json())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value) + 2
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 64
+
+
+class _CacheEntry:
+    __slots__ = ("value", "size", "expires_at", "tags", "generation", "hits")
+
+    def __init__(self, value: Any, size: int, expires_at: float, tags: frozenset, generation: int):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.tags = tags
+        self.generation = generation
+        self.hits = 0
+
+
+class ResultCache:
+    """LRU cache with an entry limit, a byte budget and per-namespace TTLs"""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024,
+                 default_ttl: float = 3600.0, ttls: Optional[Dict[str, float]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_rejections = 0
+        # namespace -> [hits, misses]
+        self._lookups: Dict[str, list] = {}
+        # Bumped by every invalidate() and clear()
+        self.generation = 0
+        # tag -> keys of the entries carrying it
+        self._tagged: Dict[str, set] = {}
+        # tag -> generation at which it last changed
+        self._changed_at: Dict[str, int] = {}
+        self._cleared_at = 0
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        """Build a cache sized from SEARCH_CACHE_* environment variables"""
+        return cls(
+            max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000")),
+            max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            default_ttl=float(os.getenv("SEARCH_CACHE_TTL", "3600")),
+            ttls={
+                "search": float(os.getenv("SEARCH_CACHE_TTL_SEARCH", "3600")),
+                "rag": float(os.getenv("SEARCH_CACHE_TTL_INTELLIGENT", "21600")),
+                "terms": float(os.getenv("SEARCH_CACHE_TTL_TERMS", "86400")),
+                # Short, since Bible results are only evicted when vectorize_bible.py is given --service-url
+                "bible": float(os.getenv("SEARCH_CACHE_TTL_BIBLE", "600")),
+            },
+        )
+
+    @staticmethod
+    def namespace_of(key: str) -> str:
+        return key.split("|", 1)[0]
+
+    def ttl_for(self, key: str) -> float:
+        return self.ttls.get(self.namespace_of(key), self.default_ttl)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            lookups = self._lookups.get(self.namespace_of(key))
+            if lookups is None:
+                lookups = self._lookups[self.namespace_of(key)] = [0, 0]
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                lookups[1] += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                lookups[1] += 1
+                return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            lookups[0] += 1
+            return entry.value
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = (), generation: Optional[int] = None,
+            ttl: Optional[float] = None) -> None:
+        """Store value under key, evicting least recently used entries as needed.
+
+        tags are the chorus IDs the value was built from and generation the
+        cache generation read before building it (defaults to the current one).
+        ttl overrides the namespace TTL, e.g. for entries restored from a snapshot.
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            logger.warning(f"Not caching {key}: {size} bytes exceeds cache budget of {self.max_bytes}")
+            return
+        expires_at = time.monotonic() + (self.ttl_for(key) if ttl is None else ttl)
+        tags = frozenset(tags)
+        with self._lock:
+            if generation is None:
+                generation = self.generation
+            elif generation < self._cleared_at or any(self._changed_at.get(tag, -1) > generation for tag in tags):
+                # Built before an invalidation of a chorus it references
+                self.stale_rejections += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(value, size, expires_at, tags, generation)
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+            self._bytes = 0
+            self.generation += 1
+            self._cleared_at = self.generation
+
+    def invalidate(self, tags: Iterable[str]) -> List[Tuple[str, int]]:
+        """Evict the entries built from any of tags; returns (key, hits) per evicted entry"""
+        with self._lock:
+            self.generation += 1
+            keys = set()
+            for tag in tags:
+                self._changed_at[tag] = self.generation
+                keys.update(self._tagged.get(tag, ()))
+            evicted = []
+            for key in keys:
+                evicted.append((key, self._entries[key].hits))
+                self._remove(key)
+            self.invalidations += len(evicted)
+            return evicted
+
+    def export(self, limit: int, namespaces: Optional[Iterable[str]] = None,
+               rank: Optional[Callable[[str], float]] = None) -> List[Dict[str, Any]]:
+        """The limit hottest live entries, ranked by rank(key) and then by hits.
+
+        Each entry is a dict with key, value, tags, hits and ttl (seconds left),
+        suitable for set(key, value, tags, ttl=ttl) in another process.
+        """
+        now = time.monotonic()
+        namespaces = set(namespaces) if namespaces is not None else None
+        with self._lock:
+            live = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry.expires_at > now and (namespaces is None or self.namespace_of(key) in namespaces)
+            ]
+        live.sort(key=lambda item: ((rank(item[0]) if rank else 0.0), item[1].hits), reverse=True)
+        return [
+            {"key": key, "value": entry.value, "tags": sorted(entry.tags), "hits": entry.hits,
+             "ttl": entry.expires_at - now}
+            for key, entry in live[:limit]
+        ]
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expires_at > time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            namespaces: Dict[str, Dict[str, int]] = {}
+            for key, entry in self._entries.items():
+                ns = namespaces.setdefault(self.namespace_of(key), {"entries": 0, "bytes": 0})
+                ns["entries"] += 1
+                ns["bytes"] += entry.size
+            for name, (hits, misses) in self._lookups.items():
+                ns = namespaces.setdefault(name, {"entries": 0, "bytes": 0})
+                ns["hits"] = hits
+                ns["misses"] = misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_rejections": self.stale_rejections,
+                "generation": self.generation,
+                "ttls": {"default": self.default_ttl, **self.ttls},
+                "namespaces": namespaces,
+            }
@@ -0,0 +1,114 @@
+"""
+Pre-serialized per-chorus JSON for search responses.
+
+Everything in a SearchResult except score and explanation depends only on
+the chorus, so each chorus is encoded once and the open JSON object (no
+closing brace) is kept. A response is then spliced together from those
+fragments and the per-query scores, skipping pydantic validation and
+encoding on every request.
+
+A fragment is reused only while the chorus's metadata compares equal to the
+metadata it was built from, so an update made anywhere (/add_documents, a
+vectorize_data.py sync) yields a fresh fragment on the next hit without any
+explicit invalidation.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import orjson
+
+
+class Raw(bytes):
+    """Already-encoded JSON, spliced in as is by close_object()"""
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON, accepting pydantic models and numpy scalars"""
+    return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _default(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def open_object(fields: Dict[str, Any]) -> bytes:
+    """JSON object for fields with its closing brace left off, ready for more keys"""
+    return dumps(fields)[:-1]
+
+
+# Encoded ',"name":' prefixes, keyed by field name
+_keys: Dict[str, bytes] = {}
+
+
+def close_object(fragment: bytes, **fields: Any) -> bytes:
+    """Append fields (in order) to an open object fragment and close it"""
+    parts = [fragment]
+    for name, value in fields.items():
+        key = _keys.get(name)
+        if key is None:
+            key = _keys[name] = b"," + dumps(name) + b":"
+        parts.append(key)
+        parts.append(value if isinstance(value, Raw) else dumps(value))
+    parts.append(b"}")
+    return b"".join(parts)
+
+
+def json_array(items: Iterable[bytes]) -> bytes:
+    """JSON array from already-encoded items"""
+    return b"[" + b",".join(items) + b"]"
+
+
+class FragmentCache:
+    """Bounded LRU of open JSON fragments keyed by chorus ID"""
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        # chorus ID -> (metadata the fragment was built from, fragment)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "FragmentCache":
+        return cls(max_entries=int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", "20000")))
+
+    def get(self, chorus_id: str, metadata: Dict[str, Any], build: Callable[[], bytes]) -> bytes:
+        """Fragment for a chorus, rebuilt when its metadata has changed"""
+        with self._lock:
+            entry = self._entries.get(chorus_id)
+            if entry is not None and entry[0] == metadata:
+                self._entries.move_to_end(chorus_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        fragment = build()
+        with self._lock:
+            self._entries[chorus_id] = (dict(metadata), fragment)
+            self._entries.move_to_end(chorus_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragment
+
+    def invalidate(self, chorus_ids: Optional[Iterable[str]] = None) -> None:
+        """Drop the fragments for chorus_ids, or all of them"""
+        with self._lock:
+            if chorus_ids is None:
+                self._entries.clear()
+                return
+            for chorus_id in chorus_ids:
+                self._entries.pop(chorus_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,69 @@
+"""
+Fixtures for the service tests.
+
+The service runs against the deterministic fake Ollama from benchmarks/ and
+an in-memory Qdrant seeded with a few choruses from data/, so the tests need
+neither a GPU nor network access.
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+for path in (SERVICE_DIR, SERVICE_DIR / "benchmarks"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from fake_ollama import FakeOllama, FakeOllamaConfig  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def fake_ollama():
+    with FakeOllama(FakeOllamaConfig(embed_latency=0.0, embed_item_latency=0.0, ttft=0.0, tokens=5)) as fake:
+        yield fake
+
+
+@pytest.fixture(scope="session")
+def service(fake_ollama, tmp_path_factory):
+    """The main module, configured for and seeded into an in-memory Qdrant"""
+    data_dir = tmp_path_factory.mktemp("data")
+    for source in sorted((SERVICE_DIR / "data").glob("*.json"))[:40]:
+        shutil.copy(source, data_dir)
+    os.environ.update(
+        OLLAMA_URL=fake_ollama.url,
+        QDRANT_URL=":memory:",
+        CACHE_DIR=str(tmp_path_factory.mktemp("cache")),
+        CACHE_SNAPSHOT="false",
+    )
+    import vectorize_data
+    vectorize_data.vectorize_and_store(str(data_dir), qdrant_url=":memory:")
+    import main
+    return main
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def client(service):
+    """Client for the app once Qdrant, embeddings and the LLM are up.
+
+    The lifespan runs once per session: shutting it down closes the thread pools.
+    """
+    async with service.lifespan(service.app):
+        deadline = time.monotonic() + 60
+        while not service.readiness.ready("qdrant", "embeddings", "llm"):
+            assert time.monotonic() < deadline, f"service not ready: {service.readiness.snapshot()}"
+            await asyncio.sleep(0.05)
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            yield client
@@ -0,0 +1,49 @@
+"""
+Cached /bible/search results must not outlive a vectorize_bible.py run that
+replaced the passages they point to.
+"""
+
+import pytest
+
+
+def passage_points(service, references):
+    vectors = service.embeddings.embed_documents(references)
+    return [
+        service.qdrant_models.PointStruct(id=i, vector=vector, payload={
+            "reference": reference, "bookId": "GEN", "translation": "aov", "text": reference
+        })
+        for i, (reference, vector) in enumerate(zip(references, vectors), start=1)
+    ]
+
+
+def create_collection(service, collection):
+    service.qdrant_client.delete_collection(collection)
+    service.qdrant_client.create_collection(
+        collection, vectors_config=service.qdrant_models.VectorParams(size=768, distance="Cosine")
+    )
+
+
+@pytest.mark.anyio
+async def test_collection_invalidation_evicts_bible_results(service, client):
+    collection = service.bible_collection
+    create_collection(service, collection)
+    try:
+        service.qdrant_client.upsert(collection, points=passage_points(service, ["Genesis 1:1", "Genesis 1:2"]))
+        query = {"query": "in die begin", "k": 5}
+        first = await client.post("/bible/search", json=query)
+        assert first.status_code == 200
+        assert {hit["reference"] for hit in first.json()} == {"Genesis 1:1", "Genesis 1:2"}
+
+        # What vectorize_bible.py --window does: replace the passages, then report the collection
+        create_collection(service, collection)
+        service.qdrant_client.upsert(collection, points=passage_points(service, ["Genesis 1:1-3"]))
+        assert (await client.post("/bible/search", json=query)).json() == first.json()
+
+        response = await client.post("/invalidate_cache", json={"collections": [collection]})
+        assert response.status_code == 200
+        assert response.json()["evicted"] == 1
+
+        second = await client.post("/bible/search", json=query)
+        assert [hit["reference"] for hit in second.json()] == ["Genesis 1:1-3"]
+    finally:
+        service.qdrant_client.delete_collection(collection)
@@ -0,0 +1,58 @@
+"""
+/search must not queue behind LLM work: Qdrant and embedding calls run on
+the search pool, and LLM calls on their own pool.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+
+class BlockingLLM:
+    """LLM stand-in whose calls block until released"""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def invoke(self, prompt, *args, **kwargs):
+        self.entered.set()
+        assert self.release.wait(timeout=30), "LLM was never released"
+        return "liefde,love"
+
+    def stream(self, prompt, *args, **kwargs):
+        self.entered.set()
+        assert self.release.wait(timeout=30), "LLM was never released"
+        yield "analysis"
+
+
+async def wait_until(condition, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("endpoint", ["/search_intelligent", "/search_intelligent_stream"])
+async def test_search_completes_while_llm_call_in_flight(service, client, monkeypatch, endpoint):
+    llm = BlockingLLM()
+    monkeypatch.setattr(service, "llm", llm)
+    # Longer than LOCAL_TERMS_MAX_WORDS, so the stream asks the LLM for search terms too
+    slow = asyncio.create_task(client.post(endpoint, json={"query": f"genade en liefde vir almal {endpoint}", "k": 3}))
+    try:
+        await wait_until(llm.entered.is_set)
+        
+        # Queued behind the LLM, /search would wait for the release below and time out
+        response = await asyncio.wait_for(
+            client.post("/search", json={"query": f"jesus loves me {endpoint}", "k": 3}), timeout=5
+        )
+        
+        assert response.status_code == 200
+        assert response.json()
+        assert not slow.done(), "the LLM request finished before /search was measured"
+    finally:
+        llm.release.set()
+    assert (await slow).status_code == 200
@@ -0,0 +1,42 @@
+"""
+The query embedding cache keys on folded text but must embed what was typed.
+"""
+
+from typing import List
+
+from embedding_cache import CachedQueryEmbeddings, EmbeddingStore
+from langchain_core.embeddings import Embeddings
+
+
+class RecordingEmbeddings(Embeddings):
+    def __init__(self):
+        self.seen: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.seen.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def cached(tmp_path):
+    base = RecordingEmbeddings()
+    return base, CachedQueryEmbeddings(base, EmbeddingStore(str(tmp_path / "embeddings.db"), "test"))
+
+
+def test_embed_query_sends_original_text_and_caches_on_folded_key(tmp_path):
+    base, embeddings = cached(tmp_path)
+    vector = embeddings.embed_query("Hy sê môre")
+    assert base.seen == ["Hy sê môre"]
+    assert embeddings.embed_query("hy se  more") == vector
+    assert base.seen == ["Hy sê môre"]
+
+
+def test_embed_queries_sends_first_original_text_per_key(tmp_path):
+    base, embeddings = cached(tmp_path)
+    vectors = embeddings.embed_queries(["Wêreld", "wereld ", "Môre"])
+    assert base.seen == ["Wêreld", "Môre"]
+    assert vectors[0] == vectors[1]
+    assert embeddings.embed_queries(["WÊRELD"]) == [vectors[0]]
+    assert base.seen == ["Wêreld", "Môre"]
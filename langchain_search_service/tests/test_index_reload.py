@@ -0,0 +1,42 @@
+"""
+Choruses changed outside the service (e.g. by vectorize_data.py) must drop
+out of the in-process indexes once /invalidate_cache reports them.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from chorus_payload import point_id_for
+
+
+async def wait_until(condition, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+@pytest.mark.anyio
+async def test_deleted_chorus_leaves_lexical_index_after_invalidation(service, client):
+    await wait_until(lambda: len(service.lexical_index) > 0)
+    chorus_id, doc = next(iter(service.lexical_index._documents.items()))
+    title = doc.metadata["name"]
+    point_id = point_id_for(chorus_id)
+    point = service.qdrant_client.retrieve("chorus-vectors", [point_id], with_payload=True, with_vectors=True)[0]
+    service.qdrant_client.delete("chorus-vectors", points_selector=[point_id])
+    try:
+        response = await client.post("/invalidate_cache", json={"chorus_ids": [chorus_id], "change": "deleted"})
+        assert response.status_code == 200
+        await wait_until(lambda: service.lexical_index.document(chorus_id) is None)
+
+        response = await client.post("/search", json={"query": title, "k": 5})
+        assert response.status_code == 200
+        assert chorus_id not in [hit["id"] for hit in response.json()]
+    finally:
+        service.qdrant_client.upsert("chorus-vectors", points=[
+            service.qdrant_models.PointStruct(id=point.id, vector=point.vector, payload=point.payload)
+        ])
+        await client.post("/invalidate_cache", json={"chorus_ids": [chorus_id], "change": "created"})
+        await wait_until(lambda: service.lexical_index.document(chorus_id) is not None)
@@ -0,0 +1,56 @@
+"""
+An ingestion job reports failed when nothing was upserted, and completed
+with an error summary when only part of the upload went in.
+"""
+
+import asyncio
+import time
+
+import orjson
+import pytest
+
+
+async def run_job(client, lines):
+    body = b"".join(line + b"\n" for line in lines)
+    response = await client.post("/ingest", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 202
+    status_url = response.json()["status_url"]
+    deadline = time.monotonic() + 30
+    while True:
+        job = (await client.get(status_url)).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        assert time.monotonic() < deadline, f"job did not finish: {job}"
+        await asyncio.sleep(0.05)
+
+
+def chorus_line(number):
+    return orjson.dumps({"id": f"ingest-test-{number}", "name": f"Ingest test {number}", "text": "Halleluja amen"})
+
+
+@pytest.mark.anyio
+async def test_job_with_only_invalid_lines_fails(client):
+    job = await run_job(client, [b"not json", b"[1, 2]"])
+    assert job["status"] == "failed"
+    assert job["upserted"] == 0
+    assert job["failed"] == 2
+
+
+@pytest.mark.anyio
+async def test_job_whose_batches_all_fail_fails(service, client, monkeypatch):
+    async def failing_upsert(docs, run=None):
+        raise ConnectionError("qdrant unavailable")
+
+    monkeypatch.setattr(service, "upsert_documents", failing_upsert)
+    job = await run_job(client, [chorus_line(1), chorus_line(2)])
+    assert job["status"] == "failed"
+    assert job["failed_batches"] == job["batches"] == 1
+    assert "No chorus was upserted" in job["error"]
+
+
+@pytest.mark.anyio
+async def test_partly_invalid_job_completes_with_error_summary(client):
+    job = await run_job(client, [chorus_line(3), b"not json"])
+    assert job["status"] == "completed"
+    assert job["upserted"] == 1
+    assert job["error"] == "1 lines failed, 0 of 1 batches failed"
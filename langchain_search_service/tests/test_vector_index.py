@@ -0,0 +1,76 @@
+"""
+The local vector index snapshot must be rewritten safely and never trusted
+after the collection changed, even when its point count did not.
+"""
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient
+from qdrant_client import models as qdrant_models
+
+from chorus_payload import chorus_fields, document_to_payload, point_id_for
+from vector_index import LocalVectorIndex
+
+COLLECTION = "snapshot-test"
+
+
+def chorus_point(number: int, name: str) -> qdrant_models.PointStruct:
+    chorus_id = f"chorus-{number}"
+    doc = Document(page_content=name, metadata=chorus_fields(chorus_id, {"name": name, "chorusText": name}))
+    vector = [0.0] * 4
+    vector[number % 4] = 1.0
+    return qdrant_models.PointStruct(id=point_id_for(chorus_id), vector=vector, payload=document_to_payload(doc))
+
+
+@pytest.fixture
+def collection():
+    client = QdrantClient(":memory:")
+    client.create_collection(COLLECTION, vectors_config=qdrant_models.VectorParams(size=4, distance="Cosine"))
+    client.upsert(COLLECTION, points=[chorus_point(i, f"chorus {i}") for i in range(3)])
+    return client
+
+
+def names(index: LocalVectorIndex):
+    return sorted(doc.metadata["name"] for doc, _ in index.search([1.0, 1.0, 1.0, 1.0], k=10))
+
+
+def test_snapshot_reloaded_when_collection_changes_at_same_count(collection, tmp_path):
+    path = tmp_path / "vectors.npy"
+    LocalVectorIndex(snapshot_path=str(path)).load(collection, COLLECTION)
+    assert path.exists()
+
+    collection.upsert(COLLECTION, points=[chorus_point(1, "renamed")])
+    index = LocalVectorIndex(snapshot_path=str(path))
+    index.load(collection, COLLECTION)
+
+    assert names(index) == ["chorus 0", "chorus 2", "renamed"]
+    assert not isinstance(index._matrix, np.memmap)
+
+
+def test_snapshot_memory_mapped_when_collection_unchanged(collection, tmp_path):
+    path = tmp_path / "vectors.npy"
+    LocalVectorIndex(snapshot_path=str(path)).load(collection, COLLECTION)
+
+    index = LocalVectorIndex(snapshot_path=str(path))
+    index.load(collection, COLLECTION)
+
+    assert isinstance(index._matrix, np.memmap)
+    assert names(index) == ["chorus 0", "chorus 1", "chorus 2"]
+
+
+def test_refresh_leaves_memory_mapped_matrix_readable(collection, tmp_path):
+    path = tmp_path / "vectors.npy"
+    LocalVectorIndex(snapshot_path=str(path)).load(collection, COLLECTION)
+    index = LocalVectorIndex(snapshot_path=str(path))
+    index.load(collection, COLLECTION)
+    mapped = index._matrix
+    before = np.array(mapped)
+
+    collection.upsert(COLLECTION, points=[chorus_point(i, f"chorus {i}") for i in range(3, 40)])
+    index.load(collection, COLLECTION, refresh=True)
+
+    # The old mapping still reads the file it was opened on
+    assert np.array_equal(np.array(mapped), before)
+    assert len(index) == 40
+    assert not list(tmp_path.glob("*.tmp"))
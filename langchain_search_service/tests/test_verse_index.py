@@ -0,0 +1,39 @@
+"""
+The verse index built by data/bible/_tools/verse_index.py must return what a
+brute-force scan of the chapter JSON returns.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).resolve().parents[2] / "data" / "bible" / "_tools"
+AOV_DIR = TOOLS_DIR.parent / "aov"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import verse_index  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def aov(tmp_path_factory):
+    path = tmp_path_factory.mktemp("index") / verse_index.INDEX_FILE
+    verse_index.index_directory(AOV_DIR, path)
+    verse_tokens = [verse_index.tokenize(text) for _, _, _, text in verse_index.iter_verses(AOV_DIR)]
+    with verse_index.VerseIndex(path) as index:
+        yield index, verse_tokens
+
+
+def test_skip_block_edges_match_scan(aov):
+    index, verse_tokens = aov
+    queries = verse_index.boundary_queries(index, verse_tokens)
+    assert verse_index.check(index, verse_tokens, queries) == []
+
+
+@pytest.mark.parametrize("query", ["hemel aarde geskape begin", "begin die", "In die begin het God"])
+def test_queries_starting_at_genesis_1_1_match_scan(aov, query):
+    index, verse_tokens = aov
+    expected_all, expected_phrase = verse_index.scan(verse_tokens, verse_index.tokenize(query))
+    assert 0 in expected_all
+    assert index.search_all(query) == expected_all
+    assert index.search_phrase(query) == expected_phrase
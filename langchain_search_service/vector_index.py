@@ -0,0 +1,162 @@
+"""
+In-process exact vector index for small collections.
+
+The chorus corpus is a few hundred 768-dim vectors (~1.3 MB as float32), so
+an exact top-k via one matrix-vector product is cheaper than an HTTP
+round-trip to Qdrant. Vectors are loaded from the Qdrant collection, or from
+a memory-mapped .npy snapshot (with a JSON sidecar of payloads) when the
+sidecar records the collection's current fingerprint. Collections larger
+than max_points are left to Qdrant.
+
+Both snapshot files are written to temporary files and renamed into place,
+the .npy first: a search still reading the old memory-mapped matrix keeps
+the old file, and the sidecar only names a fingerprint once its vectors are
+in place.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from cache_snapshot import collection_fingerprint
+from chorus_payload import SEARCH_FIELDS, document_to_payload, payload_to_document
+
+logger = logging.getLogger(__name__)
+
+
+class LocalVectorIndex:
+    """Cosine top-k over an in-memory float32 matrix"""
+
+    def __init__(self, max_points: int = 20000, snapshot_path: Optional[str] = None):
+        self.max_points = max_points
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self._matrix: Optional[np.ndarray] = None
+        self._documents: List[Document] = []
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._matrix is not None
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _sidecar(self) -> Path:
+        return self.snapshot_path.with_suffix(".payloads.json")
+
+    def _install(self, matrix: np.ndarray, documents: List[Document]) -> None:
+        with self._lock:
+            self._matrix = matrix
+            self._documents = documents
+
+    def load(self, client, collection_name: str, refresh: bool = False) -> bool:
+        """Load from the snapshot if it is current, otherwise from Qdrant.
+
+        The snapshot is trusted when its fingerprint matches the collection's;
+        pass refresh=True to skip that check after a write made by this process.
+
+        Returns False (and leaves the index disabled) when the collection is
+        larger than max_points.
+        """
+        points_count = client.get_collection(collection_name).points_count or 0
+        if points_count > self.max_points:
+            logger.info(f"Collection '{collection_name}' has {points_count} points (> {self.max_points}), using Qdrant for vector search")
+            self._install(None, [])
+            return False
+        # Taken before the vectors are read, so a write racing the load makes the snapshot stale, not wrong
+        fingerprint = collection_fingerprint(client, collection_name) if self.snapshot_path else None
+        if self.snapshot_path and not refresh and self._load_snapshot(fingerprint):
+            return True
+        self._load_from_qdrant(client, collection_name)
+        if self.snapshot_path and self.ready:
+            self._save_snapshot(fingerprint)
+        return True
+
+    def _load_snapshot(self, fingerprint: str) -> bool:
+        if not self.snapshot_path.exists() or not self._sidecar().exists():
+            return False
+        try:
+            sidecar = json.loads(self._sidecar().read_text(encoding="utf-8"))
+            if not isinstance(sidecar, dict) or sidecar.get("fingerprint") != fingerprint:
+                logger.info(f"Vector snapshot {self.snapshot_path} does not match the collection; reloading")
+                return False
+            matrix = np.load(self.snapshot_path, mmap_mode="r")
+            if matrix.shape[0] != len(sidecar["payloads"]):
+                logger.info(f"Vector snapshot {self.snapshot_path} has {matrix.shape[0]} rows for {len(sidecar['payloads'])} payloads; reloading")
+                return False
+            documents = [payload_to_document(p) for p in sidecar["payloads"]]
+        except Exception as e:
+            logger.warning(f"Could not read vector snapshot {self.snapshot_path}: {e}")
+            return False
+        self._install(matrix, documents)
+        logger.info(f"Local vector index memory-mapped from {self.snapshot_path}: {matrix.shape[0]} x {matrix.shape[1]}")
+        return True
+
+    def _load_from_qdrant(self, client, collection_name: str) -> None:
+        vectors = []
+        documents = []
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=SEARCH_FIELDS,
+                with_vectors=True
+            )
+            for point in points:
+                if point.vector is None:
+                    continue
+                vectors.append(point.vector)
+                documents.append(payload_to_document(point.payload, point.id))
+            if offset is None:
+                break
+        if not vectors:
+            logger.info(f"Collection '{collection_name}' has no vectors yet, using Qdrant for vector search")
+            self._install(None, [])
+            return
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._install(matrix / norms, documents)
+        logger.info(f"Local vector index loaded from '{collection_name}': {matrix.shape[0]} x {matrix.shape[1]}")
+
+    def _save_snapshot(self, fingerprint: str) -> None:
+        with self._lock:
+            matrix = self._matrix
+            documents = self._documents
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.ascontiguousarray(matrix))
+            os.replace(tmp_path, self.snapshot_path)
+            sidecar = {"fingerprint": fingerprint, "payloads": [document_to_payload(d) for d in documents]}
+            tmp_sidecar = self._sidecar().with_name(f"{self._sidecar().name}.tmp")
+            tmp_sidecar.write_text(json.dumps(sidecar, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_sidecar, self._sidecar())
+        except Exception as e:
+            logger.warning(f"Could not write vector snapshot {self.snapshot_path}: {e}")
+
+    def search(self, query_vector: List[float], k: int) -> List[Tuple[Document, float]]:
+        """Top-k (Document, cosine similarity) pairs, best first"""
+        with self._lock:
+            matrix = self._matrix
+            documents = self._documents
+        if matrix is None or not len(documents) or k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = matrix @ query
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(documents[i], float(scores[i])) for i in top]
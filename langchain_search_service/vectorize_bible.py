@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Vectorize the imported AOV Bible into a verse-level Qdrant collection.
+
+Reads data/bible/aov/_books.json and the per-chapter JSON files written by
+data/bible/_tools/import-aov.py, embeds single verses (or sliding
+multi-verse windows) in concurrent batches and upserts them into a separate
+collection. Progress is recorded per chapter, so an interrupted run resumes
+where it stopped.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+import urllib.request
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from qdrant_client.models import FieldCondition, Filter, FilterSelector, MatchAny, PayloadSchemaType, PointStruct
+from langchain_ollama import OllamaEmbeddings
+
+from qdrant_connection import get_qdrant_client
+from vectorize_data import EMBEDDING_MODEL, StageStats
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BIBLE_DIR = Path(__file__).resolve().parents[1] / "data" / "bible" / "aov"
+BIBLE_COLLECTION = os.getenv("BIBLE_COLLECTION", "bible-verses")
+
+
+def verse_reference(book_name, chapter, verse_start, verse_end):
+    if verse_start == verse_end:
+        return f"{book_name} {chapter}:{verse_start}"
+    return f"{book_name} {chapter}:{verse_start}-{verse_end}"
+
+
+def iter_chapters(bible_dir):
+    """Yield (book, chapter document) for every chapter in canonical order"""
+    bible_path = Path(bible_dir)
+    books = json.loads((bible_path / "_books.json").read_text(encoding="utf-8"))
+    for book in sorted(books, key=lambda b: b["ordinal"]):
+        for chapter_file in sorted((bible_path / book["directory"]).glob("*.json")):
+            yield book, json.loads(chapter_file.read_text(encoding="utf-8"))
+
+
+def chapter_passages(translation, book, chapter_doc, window=1, stride=1):
+    """Split a chapter into single verses or sliding windows of `window` verses"""
+    verses = [v for v in chapter_doc["verses"] if v["text"].strip()]
+    passages = []
+    start = 0
+    while start < len(verses):
+        span = verses[start:start + window]
+        verse_start, verse_end = span[0]["verse"], span[-1]["verse"]
+        chapter = chapter_doc["chapter"]
+        passages.append({
+            "id": str(uuid.uuid5(
+                uuid.NAMESPACE_URL,
+                f"chap2:bible:{translation}:{book['ordinal']}:{chapter}:{verse_start}-{verse_end}"
+            )),
+            "payload": {
+                "translation": translation,
+                "bookId": book["id"],
+                "bookName": book["name"],
+                "englishName": book.get("englishName", ""),
+                "ordinal": book["ordinal"],
+                "chapter": chapter,
+                "verseStart": verse_start,
+                "verseEnd": verse_end,
+                "reference": verse_reference(book["name"], chapter, verse_start, verse_end),
+                "text": " ".join(" ".join(v["text"].split()) for v in span)
+            }
+        })
+        if start + window >= len(verses):
+            break
+        start += stride
+    return passages
+
+
+def signature_translation(signature):
+    return signature.split("|", 1)[0]
+
+
+class ProgressLog:
+    """Append-only record of finished chapters, tied to one run configuration.
+
+    resumed is False when the run starts over; previous is then the signature
+    of the configuration it replaces, if there was one.
+    """
+
+    def __init__(self, path, signature, restart=False):
+        self.path = Path(path)
+        self.signature = signature
+        self.done = set()
+        self.resumed = False
+        self.previous = None
+        if self.path.exists():
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+            self.previous = lines[0] if lines else None
+            if lines and lines[0] == signature and not restart:
+                self.done = set(lines[1:])
+                self.resumed = True
+                logger.info(f"Resuming: {len(self.done)} chapters already vectorized")
+            else:
+                logger.info("Progress file is for a different configuration or --restart was given, starting over")
+                self.path.unlink()
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(signature + "\n", encoding="utf-8")
+        self._handle = open(self.path, "a", encoding="utf-8")
+
+    def mark(self, key):
+        self.done.add(key)
+        self._handle.write(key + "\n")
+        self._handle.flush()
+
+    def close(self):
+        self._handle.close()
+
+
+def notify_search_service(service_url, collection_name):
+    """Ask the search service to evict its cached results for the collection"""
+    request = urllib.request.Request(
+        f"{service_url.rstrip('/')}/invalidate_cache",
+        data=json.dumps({"collections": [collection_name]}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            logger.info(f"Search service cache invalidated for '{collection_name}': {response.read().decode('utf-8')}")
+    except OSError as e:
+        logger.warning(f"Could not invalidate the search service cache at {service_url}; cached Bible results expire by TTL: {e}")
+
+
+def vectorize_bible(bible_dir, qdrant_url="http://qdrant:6333", collection_name=BIBLE_COLLECTION,
+                    translation="aov", window=1, stride=1, batch_size=64, embed_workers=3,
+                    progress_path=None, restart=False, service_url=None):
+    """Embed every chapter not yet recorded in the progress log and upsert it.
+
+    If service_url is given, the search service is told to drop its cached
+    /bible/search results once the run has changed the collection.
+    """
+    logger.info(f"Connecting to Qdrant at {qdrant_url}")
+    client = get_qdrant_client(qdrant_url)
+    embeddings = OllamaEmbeddings(
+        model=EMBEDDING_MODEL,
+        base_url=os.getenv("OLLAMA_URL", "http://host.docker.internal:11434")
+    )
+
+    try:
+        client.get_collection(collection_name)
+        logger.info(f"Collection '{collection_name}' already exists")
+    except Exception:
+        logger.info(f"Creating collection '{collection_name}'...")
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config={
+                "size": 768,  # nomic-embed-text embedding size
+                "distance": "Cosine"
+            }
+        )
+
+    # /bible/search filters on bookId
+    client.create_payload_index(collection_name, field_name="bookId", field_schema=PayloadSchemaType.KEYWORD)
+    client.create_payload_index(collection_name, field_name="translation", field_schema=PayloadSchemaType.KEYWORD)
+
+    progress_path = progress_path or os.path.join(os.getenv("CACHE_DIR", "./cache"), f"{collection_name}.progress")
+    progress = ProgressLog(progress_path, f"{translation}|{EMBEDDING_MODEL}|window={window}|stride={stride}", restart=restart)
+    changed = not progress.resumed
+    if not progress.resumed:
+        # Passage IDs depend on the window, so points from another configuration would not be
+        # overwritten; drop them rather than serve single-verse and window hits side by side
+        stale = {translation}
+        if progress.previous:
+            stale.add(signature_translation(progress.previous))
+        logger.info(f"Deleting existing '{', '.join(sorted(stale))}' points from '{collection_name}'")
+        client.delete(
+            collection_name=collection_name,
+            points_selector=FilterSelector(filter=Filter(must=[
+                FieldCondition(key="translation", match=MatchAny(any=sorted(stale)))
+            ]))
+        )
+    stats = {name: StageStats(name) for name in ("embed", "upsert")}
+    started = time.perf_counter()
+    chapters_done = 0
+
+    def embed_chapter(key, passages):
+        vectors = []
+        for i in range(0, len(passages), batch_size):
+            batch = passages[i:i + batch_size]
+            batch_started = time.perf_counter()
+            vectors.extend(embeddings.embed_documents([p["payload"]["text"] for p in batch]))
+            stats["embed"].record(len(batch), time.perf_counter() - batch_started)
+        return key, passages, vectors
+
+    def upsert_finished(finished):
+        nonlocal chapters_done
+        for future in finished:
+            key, passages, vectors = future.result()
+            upsert_started = time.perf_counter()
+            client.upsert(
+                collection_name=collection_name,
+                points=[PointStruct(id=p["id"], vector=v, payload=p["payload"]) for p, v in zip(passages, vectors)]
+            )
+            stats["upsert"].record(len(passages), time.perf_counter() - upsert_started)
+            progress.mark(key)
+            chapters_done += 1
+            if chapters_done % 50 == 0:
+                logger.info(f"Vectorized {chapters_done} chapters ({stats['upsert'].docs} passages)")
+
+    try:
+        # Keep a bounded number of chapters in flight so memory stays flat
+        with ThreadPoolExecutor(max_workers=embed_workers, thread_name_prefix="embed") as executor:
+            in_flight = set()
+            for book, chapter_doc in iter_chapters(bible_dir):
+                key = f"{book['ordinal']}:{chapter_doc['chapter']}"
+                if key in progress.done:
+                    continue
+                passages = chapter_passages(translation, book, chapter_doc, window=window, stride=stride)
+                in_flight.add(executor.submit(embed_chapter, key, passages))
+                if len(in_flight) >= embed_workers * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    upsert_finished(finished)
+            finished, _ = wait(in_flight)
+            upsert_finished(finished)
+    finally:
+        progress.close()
+        if service_url and (changed or chapters_done):
+            notify_search_service(service_url, collection_name)
+
+    wall = time.perf_counter() - started
+    logger.info(f"Bible vectorization complete: {chapters_done} chapters this run, {len(progress.done)} total, {wall:.1f}s")
+    for stage in stats.values():
+        logger.info(f"Stage report: {json.dumps(stage.summary(wall))}")
+    return True
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Vectorize Bible verses into Qdrant")
+    parser.add_argument("--bible-dir", default=str(DEFAULT_BIBLE_DIR), help="Translation directory containing _books.json")
+    parser.add_argument("--translation", default="aov", help="Translation code stored on each point")
+    parser.add_argument("--qdrant-url", default="http://qdrant:6333", help="Qdrant URL")
+    parser.add_argument("--collection", default=BIBLE_COLLECTION, help="Target Qdrant collection")
+    parser.add_argument("--window", type=int, default=1, help="Verses per passage (1 = single verses)")
+    parser.add_argument("--stride", type=int, default=1, help="Verses to advance between windows")
+    parser.add_argument("--batch-size", type=int, default=64, help="Passages per embedding call")
+    parser.add_argument("--embed-workers", type=int, default=3, help="Chapters embedding concurrently")
+    parser.add_argument("--progress-file", default=None, help="Resume log (default: $CACHE_DIR/<collection>.progress)")
+    parser.add_argument("--restart", action="store_true", help="Ignore previous progress and re-embed everything")
+    parser.add_argument("--service-url", default=os.getenv("SEARCH_SERVICE_URL"),
+                        help="Search service whose cached Bible results to evict after the run (default: $SEARCH_SERVICE_URL)")
+    args = parser.parse_args()
+
+    try:
+        return vectorize_bible(
+            args.bible_dir,
+            qdrant_url=args.qdrant_url,
+            collection_name=args.collection,
+            translation=args.translation,
+            window=max(1, args.window),
+            stride=max(1, args.stride),
+            batch_size=args.batch_size,
+            embed_workers=args.embed_workers,
+            progress_path=args.progress_file,
+            restart=args.restart,
+            service_url=args.service_url
+        )
+    except Exception as e:
+        logger.error(f"Bible vectorization failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -3,132 +3,262 @@
 Vectorize chorus data and populate Qdrant database
 """
 
+import argparse
+import hashlib
 import json
 import os
 import logging
+import queue
+import threading
+import time
 from pathlib import Path
-from qdrant_client import QdrantClient
+from qdrant_client.models import PointIdsList, PointStruct
 from langchain_ollama import OllamaEmbeddings
 from langchain.schema import Document
 
+from chorus_payload import chorus_fields, document_to_payload, fields_hash, is_current, migrate_payload, point_id_for
+from qdrant_connection import get_qdrant_client
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def load_chorus_data(data_dir):
-    """Load all chorus JSON files from the data directory"""
-    chorus_data = []
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+
+def iter_chorus_data(data_dir, failures=None):
+    """Yield chorus records one file at a time from the data directory.
+    
+    Files that cannot be loaded are logged and skipped; pass a list as
+    failures to collect (path, error) for each of them.
+    """
     data_path = Path(data_dir)
     
     if not data_path.exists():
         logger.error(f"Data directory {data_dir} does not exist")
-        return []
+        if failures is not None:
+            failures.append((str(data_path), "directory does not exist"))
+        return
     
-    json_files = list(data_path.glob("*.json"))
-    logger.info(f"Found {len(json_files)} JSON files")
-    
-    for json_file in json_files:
+    for json_file in sorted(data_path.glob("*.json")):
         try:
             with open(json_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                chorus_data.append({
-                    'id': data.get('id', json_file.stem),  # Use GUID from JSON, fallback to filename
-                    'data': data
-                })
+            yield {
+                'id': data.get('id', json_file.stem),  # Use GUID from JSON, fallback to filename
+                'data': data
+            }
         except Exception as e:
             logger.error(f"Error loading {json_file}: {e}")
-    
+            if failures is not None:
+                failures.append((str(json_file), str(e)))
+
+def load_chorus_data(data_dir):
+    """Load all chorus JSON files from the data directory"""
+    chorus_data = list(iter_chorus_data(data_dir))
     logger.info(f"Successfully loaded {len(chorus_data)} chorus records")
     return chorus_data
 
+def create_document(chorus):
+    """Convert one chorus record to a LangChain document"""
+    data = chorus['data']
+    
+    # Create text content for vectorization
+    text_parts = []
+    
+    # Add title/name if available
+    if 'name' in data:
+        text_parts.append(f"Title: {data['name']}")
+    elif 'title' in data:
+        text_parts.append(f"Title: {data['title']}")
+    
+    # Add chorus text if available
+    if 'chorusText' in data:
+        text_parts.append(f"Chorus: {data['chorusText']}")
+    elif 'lyrics' in data:
+        text_parts.append(f"Lyrics: {data['lyrics']}")
+    
+    # Add composer if available
+    if 'composer' in data:
+        text_parts.append(f"Composer: {data['composer']}")
+    elif 'author' in data:
+        text_parts.append(f"Author: {data['author']}")
+    
+    # Add key if available
+    if 'key' in data:
+        text_parts.append(f"Key: {data['key']}")
+    
+    # Add time signature if available
+    if 'timeSignature' in data:
+        text_parts.append(f"Time Signature: {data['timeSignature']}")
+    
+    # Add chorus type if available
+    if 'type' in data:
+        text_parts.append(f"Type: {data['type']}")
+    elif 'chorusType' in data:
+        text_parts.append(f"Type: {data['chorusType']}")
+    
+    # Combine all text
+    text = " ".join(text_parts)
+    
+    # Create LangChain document; metadata holds the compact payload fields (see chorus_payload.py)
+    return Document(
+        page_content=text,
+        metadata=chorus_fields(chorus['id'], data)
+    )
+
 def create_documents(chorus_data):
     """Convert chorus data to LangChain documents"""
     documents = []
     
     for chorus in chorus_data:
         try:
-            data = chorus['data']
-            
-            # Create text content for vectorization
-            text_parts = []
-            
-            # Add title/name if available
-            if 'name' in data:
-                text_parts.append(f"Title: {data['name']}")
-            elif 'title' in data:
-                text_parts.append(f"Title: {data['title']}")
-            
-            # Add chorus text if available
-            if 'chorusText' in data:
-                text_parts.append(f"Chorus: {data['chorusText']}")
-            elif 'lyrics' in data:
-                text_parts.append(f"Lyrics: {data['lyrics']}")
-            
-            # Add composer if available
-            if 'composer' in data:
-                text_parts.append(f"Composer: {data['composer']}")
-            elif 'author' in data:
-                text_parts.append(f"Author: {data['author']}")
-            
-            # Add key if available
-            if 'key' in data:
-                text_parts.append(f"Key: {data['key']}")
-            
-            # Add time signature if available
-            if 'timeSignature' in data:
-                text_parts.append(f"Time Signature: {data['timeSignature']}")
-            
-            # Add chorus type if available
-            if 'type' in data:
-                text_parts.append(f"Type: {data['type']}")
-            elif 'chorusType' in data:
-                text_parts.append(f"Type: {data['chorusType']}")
-            
-            # Combine all text
-            text = " ".join(text_parts)
-            
-            # Create metadata matching portal's expected structure
-            metadata = {
-                'Id': chorus['id'],  # GUID as string
-                'Name': data.get('name', data.get('title', '')),
-                'ChorusText': data.get('chorusText', ''),
-                'Key': data.get('key', 0),
-                'Type': data.get('type', 0),
-                'TimeSignature': data.get('timeSignature', 0),
-                'CreatedAt': data.get('createdAt', ''),
-                'UpdatedAt': data.get('updatedAt', ''),
-                'Metadata': data.get('metadata', {}),
-                'DomainEvents': data.get('domainEvents', []),
-                # Keep original fields for backward compatibility
-                'id': chorus['id'],
-                'title': data.get('name', data.get('title', '')),
-                'composer': data.get('composer', data.get('author', '')),
-                'key': data.get('key', 0),
-                'timeSignature': data.get('timeSignature', 0),
-                'chorusType': data.get('type', 0),
-                'source': 'json_file'
-            }
-            
-            # Create LangChain document
-            doc = Document(
-                page_content=text,
-                metadata=metadata
-            )
-            
-            documents.append(doc)
-            
+            documents.append(create_document(chorus))
         except Exception as e:
             logger.error(f"Error processing chorus {chorus['id']}: {e}")
     
     logger.info(f"Created {len(documents)} documents for vectorization")
     return documents
 
-def vectorize_and_store(documents, qdrant_url="http://qdrant:6333"):
-    """Vectorize documents and store in Qdrant"""
+def content_hash(doc, model=EMBEDDING_MODEL):
+    """Hash of the text that gets embedded (and the model embedding it)"""
+    return hashlib.sha256(f"{model}\0{doc.page_content}".encode("utf-8")).hexdigest()
+
+def payload_hash(doc):
+    """Hash of the metadata stored alongside the vector"""
+    return fields_hash(doc.metadata)
+
+def build_payload(doc):
+    return document_to_payload(doc, content_hash(doc))
+
+def fetch_existing_points(client, collection_name):
+    """Map point ID -> (content_hash, payload_hash, source, raw ID) for every stored point"""
+    existing = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=256,
+            offset=offset,
+            with_payload=["content_hash", "payload_hash", "source", "metadata.source"],
+            with_vectors=False
+        )
+        for point in points:
+            payload = point.payload or {}
+            existing[str(point.id)] = (
+                payload.get("content_hash"),
+                payload.get("payload_hash"),
+                payload.get("source") or (payload.get("metadata") or {}).get("source"),
+                point.id
+            )
+        if offset is None:
+            break
+    return existing
+
+def classify_document(doc, existing, full=False):
+    """Decide whether a document needs embedding, a payload rewrite, or nothing.
+
+    Points whose text hash matches are not re-embedded; if only their metadata
+    changed the payload is rewritten in place.
+    """
+    stored = existing.get(point_id_for(doc.metadata["id"]))
+    if full or stored is None or stored[0] != content_hash(doc):
+        return "embed"
+    if stored[1] != payload_hash(doc):
+        return "payload"
+    return "unchanged"
+
+def stale_point_ids(existing, wanted):
+    """Raw IDs of json_file points (including legacy integer IDs) with no backing chorus"""
+    return [
+        raw_id for point_id, (_, _, source, raw_id) in existing.items()
+        if point_id not in wanted and source == "json_file"
+    ]
+
+class StageStats:
+    """Docs processed and busy time for one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.docs = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, docs, seconds):
+        with self._lock:
+            self.docs += docs
+            self.busy += seconds
+
+    def summary(self, wall):
+        return {
+            "stage": self.name,
+            "docs": self.docs,
+            "busy_s": round(self.busy, 3),
+            "docs_per_s_busy": round(self.docs / self.busy, 1) if self.busy else None,
+            "docs_per_s_wall": round(self.docs / wall, 1) if wall else None
+        }
+
+class BatchSizer:
+    """Embedding batch size, optionally adapted toward the best observed docs/sec"""
+
+    def __init__(self, initial, maximum, adaptive=False):
+        self.size = initial
+        self.maximum = max(initial, maximum)
+        self.adaptive = adaptive
+        self.best_rate = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, docs, seconds):
+        if not self.adaptive or seconds <= 0:
+            return
+        rate = docs / seconds
+        with self._lock:
+            if rate > self.best_rate * 1.05:
+                # Bigger batches are still paying off - keep growing
+                self.best_rate = rate
+                self.size = min(self.maximum, max(self.size + 1, int(self.size * 1.5)))
+            elif rate < self.best_rate * 0.8 and self.size > 1:
+                # Overshot: Ollama is slower per doc at this size
+                self.size = max(1, int(self.size * 0.75))
+
+_DONE = object()
+
+def _put(q, item, stop):
+    """Blocking put that gives up when the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q, stop):
+    """Blocking get that returns _DONE when the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+def vectorize_and_store(data_dir, qdrant_url="http://qdrant:6333", full=False,
+                        batch_size=10, max_batch_size=64, adaptive=False,
+                        embed_workers=3, queue_size=64):
+    """Stream chorus files through a load -> document -> embed -> upsert pipeline.
+
+    Stages are joined by bounded queues, so loading never runs far ahead of
+    Ollama and several embedding batches are in flight while earlier ones are
+    being upserted. Runs incrementally by default: only new or changed
+    choruses are embedded and points for removed chorus files are deleted.
+    Pass full=True to re-embed everything.
+    
+    Returns a report of the sync (counts, wall time, per-stage throughput),
+    or False on failure.
+    """
     try:
         # Initialize Qdrant client
         logger.info(f"Connecting to Qdrant at {qdrant_url}")
-        client = QdrantClient(qdrant_url)
+        client = get_qdrant_client(qdrant_url)
         
         # Test connection
         collections = client.get_collections()
@@ -137,14 +267,10 @@ def vectorize_and_store(documents, qdrant_url="http://qdrant:6333"):
         # Initialize embeddings
         logger.info("Initializing Ollama embeddings...")
         embeddings = OllamaEmbeddings(
-            model="nomic-embed-text",
-            base_url="http://host.docker.internal:11434"
+            model=EMBEDDING_MODEL,
+            base_url=os.getenv("OLLAMA_URL", "http://host.docker.internal:11434")
         )
         
-        # Test embeddings
-        test_embedding = embeddings.embed_query("test")
-        logger.info(f"Embeddings initialized. Vector size: {len(test_embedding)}")
-        
         # Check if collection exists
         collection_name = "chorus-vectors"
         try:
@@ -161,73 +287,250 @@ def vectorize_and_store(documents, qdrant_url="http://qdrant:6333"):
             )
             logger.info(f"Collection '{collection_name}' created successfully")
         
-        # Vectorize and store documents
-        logger.info("Starting vectorization and storage...")
-        
-        batch_size = 10
-        total_docs = len(documents)
-        
-        for i in range(0, total_docs, batch_size):
-            batch = documents[i:i + batch_size]
-            logger.info(f"Processing batch {i//batch_size + 1}/{(total_docs + batch_size - 1)//batch_size} ({len(batch)} documents)")
-            
-            # Get embeddings for batch
-            texts = [doc.page_content for doc in batch]
-            embeddings_list = embeddings.embed_documents(texts)
-            
-            # Prepare points for Qdrant
-            points = []
-            for j, (doc, embedding) in enumerate(zip(batch, embeddings_list)):
-                point = {
-                    "id": i + j,  # Use integer ID
-                    "vector": embedding,
-                    "payload": {
-                        "page_content": doc.page_content,  # LangChain expects this field name
-                        "metadata": doc.metadata
-                    }
-                }
-                points.append(point)
-            
-            # Upload to Qdrant
-            client.upsert(
+        # Snapshot what is already stored so unchanged choruses can be skipped
+        existing = fetch_existing_points(client, collection_name)
+        logger.info(f"Found {len(existing)} existing points")
+        
+        stats = {name: StageStats(name) for name in ("load", "documents", "embed", "upsert")}
+        counts = {"embed": 0, "payload": 0, "unchanged": 0}
+        wanted = set()
+        sizer = BatchSizer(batch_size, max_batch_size, adaptive)
+        loaded_q = queue.Queue(maxsize=queue_size)
+        embed_q = queue.Queue(maxsize=max(1, embed_workers * 2))
+        upsert_q = queue.Queue(maxsize=max(1, embed_workers * 2))
+        stop = threading.Event()
+        errors = []
+        load_failures = []
+        
+        def fail(stage, e):
+            logger.error(f"Error in {stage} stage: {e}")
+            errors.append(e)
+            stop.set()
+        
+        def load_stage():
+            try:
+                chorus_iter = iter_chorus_data(data_dir, load_failures)
+                while True:
+                    started = time.perf_counter()
+                    chorus = next(chorus_iter, None)
+                    if chorus is None:
+                        break
+                    stats["load"].record(1, time.perf_counter() - started)
+                    if not _put(loaded_q, chorus, stop):
+                        return
+            except Exception as e:
+                fail("load", e)
+            finally:
+                _put(loaded_q, _DONE, stop)
+        
+        def document_stage():
+            batch = []
+            try:
+                while True:
+                    chorus = _get(loaded_q, stop)
+                    if chorus is _DONE:
+                        break
+                    started = time.perf_counter()
+                    point_id = point_id_for(chorus['id'])
+                    wanted.add(point_id)
+                    try:
+                        doc = create_document(chorus)
+                    except Exception as e:
+                        logger.error(f"Error processing chorus {chorus['id']}: {e}")
+                        continue
+                    action = classify_document(doc, existing, full=full)
+                    counts[action] += 1
+                    stats["documents"].record(1, time.perf_counter() - started)
+                    if action == "embed":
+                        batch.append((point_id, doc))
+                        if len(batch) >= sizer.size:
+                            if not _put(embed_q, batch, stop):
+                                return
+                            batch = []
+                    elif action == "payload":
+                        if not _put(upsert_q, ("payload", [(point_id, doc)]), stop):
+                            return
+                if batch:
+                    _put(embed_q, batch, stop)
+            except Exception as e:
+                fail("documents", e)
+            finally:
+                for _ in range(embed_workers):
+                    _put(embed_q, _DONE, stop)
+        
+        def embed_stage():
+            try:
+                while True:
+                    batch = _get(embed_q, stop)
+                    if batch is _DONE:
+                        break
+                    started = time.perf_counter()
+                    vectors = embeddings.embed_documents([doc.page_content for _, doc in batch])
+                    elapsed = time.perf_counter() - started
+                    stats["embed"].record(len(batch), elapsed)
+                    sizer.record(len(batch), elapsed)
+                    points = [
+                        PointStruct(id=point_id, vector=vector, payload=build_payload(doc))
+                        for (point_id, doc), vector in zip(batch, vectors)
+                    ]
+                    if not _put(upsert_q, ("points", points), stop):
+                        return
+            except Exception as e:
+                fail("embed", e)
+            finally:
+                _put(upsert_q, (_DONE, None), stop)
+        
+        wall_started = time.perf_counter()
+        threads = [threading.Thread(target=load_stage, name="load", daemon=True),
+                   threading.Thread(target=document_stage, name="documents", daemon=True)]
+        threads += [threading.Thread(target=embed_stage, name=f"embed-{n}", daemon=True)
+                    for n in range(embed_workers)]
+        for thread in threads:
+            thread.start()
+        
+        # Upsert on this thread until every embed worker has finished
+        finished_workers = 0
+        while finished_workers < embed_workers:
+            item = _get(upsert_q, stop)
+            if item is _DONE:
+                break
+            kind, items = item
+            if kind is _DONE:
+                finished_workers += 1
+                continue
+            started = time.perf_counter()
+            try:
+                if kind == "points":
+                    client.upsert(collection_name=collection_name, points=items)
+                else:
+                    # Rewrite payloads whose metadata changed without touching the vector
+                    for point_id, doc in items:
+                        client.overwrite_payload(
+                            collection_name=collection_name,
+                            payload=build_payload(doc),
+                            points=[point_id]
+                        )
+            except Exception as e:
+                fail("upsert", e)
+                break
+            stats["upsert"].record(len(items), time.perf_counter() - started)
+        
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        wall = time.perf_counter() - wall_started
+        
+        # A missing or unreadable file would otherwise look like a deleted chorus
+        if not wanted:
+            logger.error("No chorus data found. Exiting.")
+            return False
+        if load_failures:
+            logger.error(
+                f"{len(load_failures)} chorus files failed to load; "
+                f"not deleting stale points until every file loads"
+            )
+            return False
+        
+        # Drop points for choruses that no longer exist
+        to_delete = stale_point_ids(existing, wanted)
+        if to_delete:
+            client.delete(
                 collection_name=collection_name,
-                points=points
+                points_selector=PointIdsList(points=to_delete)
             )
-            
-            logger.info(f"Uploaded batch {i//batch_size + 1} to Qdrant")
+        
+        logger.info(
+            f"Sync complete: {counts['embed']} embedded, {counts['payload']} payload-only updates, "
+            f"{counts['unchanged']} unchanged, {len(to_delete)} deleted in {wall:.2f}s"
+        )
+        for stage in stats.values():
+            logger.info(f"Stage report: {json.dumps(stage.summary(wall))}")
+        if adaptive:
+            logger.info(f"Final adaptive batch size: {sizer.size}")
         
         # Verify upload
         collection_info = client.get_collection(collection_name)
-        vector_count = collection_info.vectors_count
-        logger.info(f"Vectorization complete! Total vectors in collection: {vector_count}")
+        vector_count = collection_info.points_count
+        logger.info(f"Vectorization complete! Total points in collection: {vector_count}")
         
-        return True
+        return {
+            "embedded": counts["embed"],
+            "payload_only": counts["payload"],
+            "unchanged": counts["unchanged"],
+            "deleted": len(to_delete),
+            "points": vector_count,
+            "wall_s": round(wall, 3),
+            "batch_size": sizer.size,
+            "stages": [stage.summary(wall) for stage in stats.values()]
+        }
         
     except Exception as e:
         logger.error(f"Error during vectorization: {e}")
         return False
 
+def migrate_payloads(qdrant_url="http://qdrant:6333", collection_name="chorus-vectors", batch_size=256):
+    """Rewrite schema-1 payloads in the compact schema without re-embedding.
+    
+    Works from the stored payloads alone, so points that have no chorus file
+    (e.g. added through /add_documents) are migrated too. Returns the number
+    of points rewritten.
+    """
+    client = get_qdrant_client(qdrant_url)
+    migrated = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False
+        )
+        for point in points:
+            if is_current(point.payload or {}):
+                continue
+            client.overwrite_payload(
+                collection_name=collection_name,
+                payload=migrate_payload(point.payload, point.id),
+                points=[point.id]
+            )
+            migrated += 1
+        if offset is None:
+            break
+    logger.info(f"Migrated {migrated} payloads in '{collection_name}' to the compact schema")
+    return migrated
+
 def main():
     """Main function"""
-    logger.info("Starting chorus data vectorization...")
+    parser = argparse.ArgumentParser(description="Vectorize chorus data into Qdrant")
+    parser.add_argument("--data-dir", default="/app/data", help="Directory of chorus JSON files")
+    parser.add_argument("--qdrant-url", default="http://qdrant:6333", help="Qdrant URL")
+    parser.add_argument("--full", action="store_true", help="Re-embed every chorus instead of only changed ones")
+    parser.add_argument("--batch-size", type=int, default=10, help="Initial embedding batch size")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Upper bound for --adaptive batch sizing")
+    parser.add_argument("--adaptive", action="store_true", help="Grow the batch size while docs/sec keeps improving")
+    parser.add_argument("--embed-workers", type=int, default=3, help="Embedding batches in flight at once")
+    parser.add_argument("--queue-size", type=int, default=64, help="Bound on loaded-but-unprocessed choruses")
+    parser.add_argument("--migrate-payloads", action="store_true", help="Only rewrite old-schema payloads in place, without embedding")
+    args = parser.parse_args()
     
-    # Load chorus data
-    data_dir = "/app/data"
-    chorus_data = load_chorus_data(data_dir)
-    
-    if not chorus_data:
-        logger.error("No chorus data found. Exiting.")
-        return False
-    
-    # Create documents
-    documents = create_documents(chorus_data)
+    if args.migrate_payloads:
+        migrate_payloads(args.qdrant_url)
+        return True
     
-    if not documents:
-        logger.error("No documents created. Exiting.")
-        return False
+    logger.info("Starting chorus data vectorization...")
     
-    # Vectorize and store
-    success = vectorize_and_store(documents)
+    success = vectorize_and_store(
+        args.data_dir,
+        qdrant_url=args.qdrant_url,
+        full=args.full,
+        batch_size=args.batch_size,
+        max_batch_size=args.max_batch_size,
+        adaptive=args.adaptive,
+        embed_workers=args.embed_workers,
+        queue_size=args.queue_size
+    )
     
     if success:
         logger.info("Vectorization completed successfully!")